@@ -0,0 +1,81 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+class AsyncModel:
+    """
+    Fachada asíncrona sobre InventarioModel para no bloquear el loop de Flet.
+
+    - `await model.async_<metodo>(...)` ejecuta `<metodo>` del modelo en un hilo de base de datos
+      y devuelve su resultado (las excepciones se propagan igual que en la llamada directa).
+    - Cualquier otro atributo se delega al modelo, así las llamadas síncronas existentes
+      (p.ej. búsquedas en el catálogo en memoria) siguen funcionando sin cambios.
+
+    Hay dos colas con un hilo cada una: los reportes pesados van por la suya, así un
+    reporte largo no deja esperando a register_sale ni al resto de la operación de caja.
+    Cada hilo usa su propia conexión (ver ConnectionManager).
+    """
+
+    REPORT_METHODS = frozenset({
+        "get_financial_report", "get_top_selling_products", "get_sales_in_range",
+        "get_expenses_in_range", "get_sales_page", "get_expenses_page", "get_payments_page",
+        "get_income_events_page", "get_all_income_events", "get_sales_report",
+        "get_expenses_report", "get_payments_report", "verify_client_balances", "rebuild_rollups",
+    })
+
+    def __init__(self, model):
+        self.model = model
+        self._db_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+        self._report_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-reports")
+
+    def __getattr__(self, name):
+        if not name.startswith("async_"):
+            return getattr(self.model, name)
+
+        method_name = name[len("async_"):]
+        getattr(self.model, method_name)  # AttributeError inmediato si el método no existe
+        pool = self._report_pool if method_name in self.REPORT_METHODS else self._db_pool
+
+        async def call(*args, **kwargs):
+            # El método se busca en cada llamada: la instrumentación puede envolverlo después
+            method = getattr(self.model, method_name)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(pool, functools.partial(method, *args, **kwargs))
+
+        call.__name__ = name
+        # Cachear para no volver a pasar por __getattr__
+        setattr(self, name, call)
+        return call
+
+    @contextmanager
+    def exclusive(self):
+        """
+        Espera que terminen las operaciones en curso de ambas colas y retiene las siguientes
+        hasta salir del bloque (p.ej. para restaurar un respaldo sobre la base abierta).
+        """
+        liberar = threading.Event()
+        listos = []
+        for pool in (self._db_pool, self._report_pool):
+            listo = threading.Event()
+            pool.submit(self._hold, listo, liberar)
+            listos.append(listo)
+        try:
+            for listo in listos:
+                listo.wait()
+            yield
+        finally:
+            liberar.set()
+
+    @staticmethod
+    def _hold(listo, liberar):
+        listo.set()
+        liberar.wait()
+
+    def close(self):
+        """Espera las operaciones en curso y cierra las conexiones."""
+        self._db_pool.shutdown(wait=True)
+        self._report_pool.shutdown(wait=True)
+        self.model.close()
@@ -0,0 +1,177 @@
+from collections import namedtuple
+
+IVA_RATE = 0.19  # Los precios de venta ya incluyen IVA
+
+# Foto inmutable del carrito al cobrar: la usan register_sale y el ticket, así el total
+# guardado es exactamente el que vio el cajero (sin volver a sumar).
+SnapshotLine = namedtuple("SnapshotLine", ["product_id", "info", "qty"])
+CartSnapshot = namedtuple("CartSnapshot", [
+    "lines", "subtotal", "discount_percent", "discount_amount", "total", "tax",
+])
+
+
+class CartLine:
+    """Línea del carrito: producto (tupla del catálogo) y cantidad."""
+
+    __slots__ = ("product_id", "info", "qty")
+
+    def __init__(self, product_id, info, qty):
+        self.product_id = product_id
+        self.info = info
+        self.qty = qty
+
+    @property
+    def price(self):
+        return self.info[2]
+
+    @property
+    def amount(self):
+        return self.qty * self.info[2]
+
+
+class Cart:
+    """
+    Carrito del POS con totales incrementales.
+
+    - Cada mutación (add/change/remove) actualiza el subtotal en O(1): subtotal, descuento,
+      total, IVA y cantidad de líneas se leen sin recorrer las líneas.
+    - Las cantidades se cambian solo a través del carrito (así los totales no se desfasan).
+    - snapshot() congela el carrito para el cobro; subtract() quita lo vendido y deja lo
+      que se escaneó mientras se guardaba la venta.
+    """
+
+    def __init__(self, tax_rate=IVA_RATE):
+        self.tax_rate = tax_rate
+        self._lines = {}          # product_id -> CartLine (en orden de llegada)
+        self._subtotal = 0.0
+        self._discount_percent = 0
+
+    @classmethod
+    def from_items(cls, items, discount_percent=0):
+        """Carrito a partir del formato anterior {id: {'info': producto, 'qty': n}}."""
+        cart = cls()
+        for pid, item in items.items():
+            cart._put(pid, item['info'], item['qty'])
+        cart.discount_percent = discount_percent
+        return cart
+
+    # ------------------------------------------
+    # Mutaciones
+    # ------------------------------------------
+    def add(self, info, qty=1.0):
+        """Suma `qty` del producto (nueva línea o existente). Retorna la cantidad resultante."""
+        line = self._lines.get(info[0])
+        if line is None:
+            return self._put(info[0], info, qty).qty
+        self._subtotal += qty * line.info[2]
+        line.qty += qty
+        return line.qty
+
+    def change(self, product_id, delta):
+        """Suma `delta` (puede ser negativo) a una línea; si queda en 0 o menos, se quita."""
+        line = self._lines.get(product_id)
+        if line is None:
+            return 0
+        if line.qty + delta <= 0:
+            self.remove(product_id)
+            return 0
+        self._subtotal += delta * line.info[2]
+        line.qty += delta
+        return line.qty
+
+    def remove(self, product_id):
+        line = self._lines.pop(product_id, None)
+        if line is not None:
+            self._subtotal -= line.amount
+            if not self._lines:
+                self._subtotal = 0.0 # Sin arrastrar residuos de punto flotante
+        return line
+
+    def clear(self):
+        self._lines.clear()
+        self._subtotal = 0.0
+        self._discount_percent = 0
+
+    def subtract(self, snapshot):
+        """Quita del carrito lo vendido en `snapshot` y reinicia el descuento."""
+        for line in snapshot.lines:
+            self.change(line.product_id, -line.qty)
+        self._discount_percent = 0
+
+    def _put(self, product_id, info, qty):
+        line = self._lines[product_id] = CartLine(product_id, info, qty)
+        self._subtotal += line.amount
+        return line
+
+    # ------------------------------------------
+    # Lecturas O(1)
+    # ------------------------------------------
+    def __len__(self):
+        return len(self._lines)
+
+    def __iter__(self):
+        return iter(list(self._lines.values()))
+
+    def __contains__(self, product_id):
+        return product_id in self._lines
+
+    def get(self, product_id):
+        return self._lines.get(product_id)
+
+    def qty(self, product_id):
+        line = self._lines.get(product_id)
+        return line.qty if line is not None else 0
+
+    @property
+    def discount_percent(self):
+        return self._discount_percent
+
+    @discount_percent.setter
+    def discount_percent(self, value):
+        if not 0 <= value <= 100:
+            raise ValueError("El descuento debe estar entre 0 y 100")
+        self._discount_percent = value
+
+    @property
+    def line_count(self):
+        return len(self._lines)
+
+    @property
+    def subtotal(self):
+        return self._subtotal
+
+    @property
+    def discount_amount(self):
+        return self._subtotal * (self._discount_percent / 100.0)
+
+    @property
+    def total(self):
+        return self._subtotal - self.discount_amount
+
+    @property
+    def tax(self):
+        """IVA contenido en el total."""
+        total = self.total
+        return total - total / (1 + self.tax_rate)
+
+    # ------------------------------------------
+    # Cobro
+    # ------------------------------------------
+    def snapshot(self):
+        return CartSnapshot(
+            lines=tuple(SnapshotLine(l.product_id, l.info, l.qty) for l in self._lines.values()),
+            subtotal=self.subtotal,
+            discount_percent=self._discount_percent,
+            discount_amount=self.discount_amount,
+            total=self.total,
+            tax=self.tax,
+        )
+
+
+def as_snapshot(items, discount_percent=0):
+    """Acepta un CartSnapshot, un Cart o el dict {id: {'info', 'qty'}} y retorna el snapshot."""
+    if isinstance(items, CartSnapshot):
+        return items
+    if isinstance(items, Cart):
+        return items.snapshot()
+    return Cart.from_items(items, discount_percent).snapshot()
@@ -0,0 +1,220 @@
+import threading
+from collections import namedtuple
+
+from app.data.search_index import SearchIndex, normalize_text
+
+# Registro compacto de producto. Es una tupla, así que la UI puede seguir
+# indexando p[0]..p[7] como antes: (id, nombre, precio, stock, stock_critico,
+# codigo_barras, categoria, fecha_vencimiento)
+Producto = namedtuple("Producto", [
+    "id", "nombre", "precio", "stock", "stock_critico",
+    "codigo_barras", "categoria", "fecha_vencimiento",
+])
+
+PROMO_CATEGORY = "Promociones"
+
+
+def normalize_barcode(codigo):
+    """Forma canónica de un código de barras (la que se guarda en productos.codigo_norm)."""
+    if codigo is None:
+        return None
+    return str(codigo).strip().lower() or None
+
+
+class ProductCatalog:
+    """
+    Cache en memoria del catálogo de productos.
+
+    Índices:
+    - por id (dict id -> Producto)
+    - por código de barras (normalize_barcode), más los códigos alternativos de
+      producto_codigos: un escaneo se resuelve con un par de dict.get, sin SQL
+    - por categoría (dict categoría -> ids, en orden de id)
+    - índice de búsqueda por nombre/código (ver app/data/search_index.py)
+
+    También guarda los componentes de cada promoción para poder recalcular
+    su stock en memoria cuando cambia el stock de un componente.
+    El InventarioModel es quien lo carga y lo parchea después de cada escritura.
+    `version` aumenta con cada carga o parche: la UI lo usa para recalcular
+    lo derivado del catálogo (p.ej. la alerta de vencimientos) solo si cambió.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.version = 0
+        self._clear()
+
+    def _clear(self):
+        self.version += 1
+        self.loaded = False
+        self._by_id = {}
+        self._by_barcode = {}
+        self._by_alias = {}         # codigo_norm -> producto_id (producto_codigos)
+        self._aliases_of = {}       # producto_id -> [codigo_norm, ...]
+        self._by_category = {}
+        self._search = SearchIndex()
+        self._promo_items = {}      # promo_id -> [(producto_id, cantidad)]
+        self._used_in_promos = {}   # producto_id -> {promo_id, ...}
+
+    # ------------------------------------------
+    # Carga / invalidación
+    # ------------------------------------------
+    def load(self, rows, promo_items, aliases=()):
+        """
+        Carga completa. rows: tuplas de 8 columnas; promo_items: [(promo_id, producto_id, cantidad)];
+        aliases: [(producto_id, codigo_norm)]
+        """
+        with self._lock:
+            self._clear()
+            for promo_id, pid, qty in promo_items:
+                self._promo_items.setdefault(promo_id, []).append((pid, qty))
+                self._used_in_promos.setdefault(pid, set()).add(promo_id)
+            for row in rows:
+                self._put(Producto(*row))
+            for pid, codigo in aliases:
+                self._by_alias[codigo] = pid
+                self._aliases_of.setdefault(pid, []).append(codigo)
+            self.loaded = True
+
+    def invalidate(self):
+        """Descarta todo; el modelo recarga en el próximo acceso."""
+        with self._lock:
+            self._clear()
+
+    # ------------------------------------------
+    # Parches incrementales
+    # ------------------------------------------
+    def upsert(self, row):
+        with self._lock:
+            self._remove_indexes(row[0])
+            self._put(Producto(*row))
+
+    def remove(self, product_id):
+        with self._lock:
+            self._remove_indexes(product_id)
+            self.set_aliases(product_id, [])
+            for comp_pid, _ in self._promo_items.pop(product_id, []):
+                promos = self._used_in_promos.get(comp_pid)
+                if promos:
+                    promos.discard(product_id)
+
+    def set_aliases(self, product_id, codigos):
+        """Reemplaza los códigos alternativos (ya normalizados) de un producto."""
+        with self._lock:
+            for codigo in self._aliases_of.pop(product_id, []):
+                if self._by_alias.get(codigo) == product_id:
+                    del self._by_alias[codigo]
+            if codigos:
+                self._aliases_of[product_id] = list(codigos)
+                for codigo in codigos:
+                    self._by_alias[codigo] = product_id
+
+    def set_promo_items(self, promo_id, componentes):
+        with self._lock:
+            for comp_pid, _ in self._promo_items.get(promo_id, []):
+                self._used_in_promos.get(comp_pid, set()).discard(promo_id)
+            self._promo_items[promo_id] = list(componentes)
+            for comp_pid, _ in componentes:
+                self._used_in_promos.setdefault(comp_pid, set()).add(promo_id)
+
+    def promos_using(self, product_ids):
+        """Ids de promociones que usan alguno de los productos dados."""
+        with self._lock:
+            promos = set()
+            for pid in product_ids:
+                promos.update(self._used_in_promos.get(pid, ()))
+            return promos
+
+    def recompute_promo_stock(self, promo_ids):
+        """Recalcula en memoria el stock de promociones: MIN(stock componente // cantidad)."""
+        with self._lock:
+            for promo_id in promo_ids:
+                promo = self._by_id.get(promo_id)
+                if promo is None or promo.categoria != PROMO_CATEGORY:
+                    continue
+                posibles = []
+                for comp_pid, qty in self._promo_items.get(promo_id, []):
+                    comp = self._by_id.get(comp_pid)
+                    comp_stock = comp.stock if comp else 0
+                    posibles.append(int(comp_stock / qty) if qty else 0)
+                self._by_id[promo_id] = promo._replace(stock=min(posibles) if posibles else 0)
+
+    # ------------------------------------------
+    # Lecturas (sin SQL)
+    # ------------------------------------------
+    def all(self):
+        with self._lock:
+            return [self._by_id[pid] for pid in sorted(self._by_id)]
+
+    def get(self, product_id):
+        return self._by_id.get(product_id)
+
+    def get_by_barcode(self, codigo_barras):
+        """Código principal o alternativo -> Producto (None si no existe)."""
+        key = normalize_barcode(codigo_barras)
+        if key is None:
+            return None
+        with self._lock:
+            pid = self._by_barcode.get(key)
+            if pid is None:
+                pid = self._by_alias.get(key)
+            return self._by_id.get(pid) if pid is not None else None
+
+    def get_by_name(self, nombre):
+        with self._lock:
+            for p in self._by_id.values():
+                if p.nombre == nombre:
+                    return p
+            return None
+
+    def expiring(self, hasta):
+        """Productos con fecha de vencimiento <= hasta (ISO), vencidos incluidos, en orden de id."""
+        with self._lock:
+            return [p for p in self.all() if p.fecha_vencimiento and p.fecha_vencimiento <= hasta]
+
+    def by_category(self, categoria):
+        with self._lock:
+            ids = self._by_category.get(categoria, {})
+            return [self._by_id[pid] for pid in sorted(ids)]
+
+    def search(self, query="", categoria=None, limit=None):
+        """
+        Filtra por texto y categoría. Sin texto, devuelve en orden de id;
+        con texto, ordenado por relevancia (ver SearchIndex).
+        """
+        with self._lock:
+            filtra_categoria = categoria and categoria != "Todas"
+            if not normalize_text(query).strip():
+                productos = self.by_category(categoria) if filtra_categoria else self.all()
+                return productos[:limit] if limit else productos
+            allowed = set(self._by_category.get(categoria, {})) if filtra_categoria else None
+            ids = self._search.search(query, limit=limit, allowed=allowed)
+            return [self._by_id[pid] for pid in ids]
+
+    # ------------------------------------------
+    # Internos
+    # ------------------------------------------
+    def _put(self, producto):
+        self.version += 1
+        self._by_id[producto.id] = producto
+        key = normalize_barcode(producto.codigo_barras)
+        if key is not None:
+            # Ante códigos repetidos (bases anteriores a la v11) gana el id más antiguo,
+            # igual que en la migración
+            self._by_barcode.setdefault(key, producto.id)
+        self._by_category.setdefault(producto.categoria or "General", {})[producto.id] = None
+        self._search.add(producto.id, producto.nombre, producto.codigo_barras)
+
+    def _remove_indexes(self, product_id):
+        old = self._by_id.pop(product_id, None)
+        if old is None:
+            return
+        self.version += 1
+        key = normalize_barcode(old.codigo_barras)
+        if key is not None:
+            if self._by_barcode.get(key) == product_id:
+                del self._by_barcode[key]
+        cat_ids = self._by_category.get(old.categoria or "General")
+        if cat_ids is not None:
+            cat_ids.pop(product_id, None)
+        self._search.remove(product_id)
@@ -0,0 +1,150 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class ConnectionManager:
+    """
+    Administra las conexiones SQLite de un InventarioModel.
+
+    - Una conexión persistente por hilo (sqlite3 no comparte conexiones entre hilos de forma segura).
+      Todas quedan en un registro: close() las cierra todas y las de hilos que ya terminaron
+      se cierran al abrir la siguiente (no quedan archivos abiertos ni el WAL sin truncar).
+    - Cache de sentencias preparadas (cached_statements) para reutilizar los planes compilados.
+    - PRAGMAs afinados para un POS: WAL, synchronous NORMAL, cache y mmap más grandes.
+    - API de transacciones con context manager: `with db.transaction() as cursor: ...`
+    """
+
+    # Valores pensados para equipos modestos (PC de caja antiguos / tablets Android)
+    CACHED_STATEMENTS = 256
+    PRAGMAS = (
+        ("journal_mode", "WAL"),
+        ("synchronous", "NORMAL"),
+        ("cache_size", -8000),        # ~8 MB de cache de páginas
+        ("mmap_size", 67108864),      # 64 MB mapeados en memoria
+        ("temp_store", "MEMORY"),
+        ("busy_timeout", 5000),
+    )
+
+    def __init__(self, db_name):
+        self.db_name = db_name
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []    # [(hilo dueño, conexión)]
+        # Cuenta las transacciones de escritura confirmadas en este proceso
+        # (sirve como "versión de los datos" para caches, ver InventarioModel.get_data_version)
+        self.write_version = 0
+        # Callback de sqlite3 para cada sentencia (lo usa app/data/instrumentation.py; None = apagado)
+        self.trace_callback = None
+
+    # ------------------------------------------
+    # Conexiones
+    # ------------------------------------------
+    def connection(self):
+        """Devuelve la conexión del hilo actual (la crea la primera vez)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def _connect(self):
+        # isolation_level=None: autocommit. Las transacciones se abren explícitamente con BEGIN.
+        conn = sqlite3.connect(
+            self.db_name,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.CACHED_STATEMENTS,
+        )
+        for pragma, value in self.PRAGMAS:
+            try:
+                conn.execute(f"PRAGMA {pragma} = {value}")
+            except sqlite3.DatabaseError as e:
+                # Algunas plataformas (p.ej. :memory: o FS sin mmap) no soportan todos los PRAGMAs
+                print(f"Aviso PRAGMA {pragma}: {e}")
+        with self._lock:
+            if self.trace_callback is not None:
+                conn.set_trace_callback(self.trace_callback)
+            terminadas = [c for hilo, c in self._connections if not hilo.is_alive()]
+            self._connections = [(hilo, c) for hilo, c in self._connections if hilo.is_alive()]
+            self._connections.append((threading.current_thread(), conn))
+        for c in terminadas:
+            self._close_quietly(c)
+        return conn
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def set_trace_callback(self, callback):
+        """Aplica `callback` (o None para quitarlo) a las conexiones abiertas y a las nuevas."""
+        with self._lock:
+            self.trace_callback = callback
+            for _, conn in self._connections:
+                conn.set_trace_callback(callback)
+
+    def release(self):
+        """Cierra la conexión del hilo actual (útil para hilos de corta vida)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            with self._lock:
+                self._connections = [(hilo, c) for hilo, c in self._connections if c is not conn]
+            conn.close()
+
+    def close(self):
+        """Cierra todas las conexiones abiertas por este administrador."""
+        with self._lock:
+            conns = [c for _, c in self._connections]
+            self._connections = []
+        for conn in conns:
+            self._close_quietly(conn)
+        self._local = threading.local()
+
+    # ------------------------------------------
+    # Transacciones
+    # ------------------------------------------
+    @contextmanager
+    def transaction(self, immediate=True):
+        """
+        Abre una transacción en la conexión del hilo y entrega un cursor.
+        Hace COMMIT al salir y ROLLBACK si hay excepción.
+        Si ya hay una transacción abierta en el hilo, se une a ella (el commit lo hace la externa).
+
+        Por defecto usa BEGIN IMMEDIATE: toma el lock de escritura al inicio. Con un BEGIN
+        diferido, una escritura que primero lee (p.ej. update_product) puede fallar con
+        SQLITE_BUSY_SNAPSHOT en WAL si otra conexión escribió entremedio.
+        immediate=False solo para transacciones de solo lectura (foto consistente).
+        """
+        conn = self.connection()
+        cursor = conn.cursor()
+        if conn.in_transaction:
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+            return
+
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield cursor
+            conn.commit()
+            with self._lock:
+                self.write_version += 1
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    @contextmanager
+    def read(self):
+        """Entrega un cursor para lecturas (sin abrir transacción explícita)."""
+        cursor = self.connection().cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
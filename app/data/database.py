@@ -1,14 +1,226 @@
 import sqlite3
 
+from app.data.connection import ConnectionManager
+from app.data.cart import as_snapshot
+from app.data.catalog import ProductCatalog, normalize_barcode
+from app.data.pagination import (Venta, Gasto, Movimiento, Abono, Ingreso, Page,
+                                 DEFAULT_PAGE_SIZE, keyset_page)
+
+# Versión de esquema que dejan las migraciones (run_migrations). Subirla al agregar una.
+SCHEMA_VERSION = 11
+
+# Columnas de producto en el orden que espera la UI:
+# (id, nombre, precio, stock, stock_critico, codigo_barras, categoria, fecha_vencimiento)
+# Para las Promociones el stock se calcula en la misma consulta:
+# MIN(stock_componente / cantidad) de sus componentes (un solo JOIN agregado, sin N+1).
+PRODUCT_SELECT = '''
+    SELECT
+        p.id, p.nombre, p.precio,
+        CASE WHEN p.categoria = 'Promociones' THEN COALESCE(ps.stock_promo, 0) ELSE p.stock END AS stock,
+        p.stock_critico, p.codigo_barras, p.categoria, p.fecha_vencimiento
+    FROM productos p
+    LEFT JOIN (
+        SELECT pi.promocion_id,
+               MIN(CAST(COALESCE(c.stock, 0) / pi.cantidad AS INTEGER)) AS stock_promo
+        FROM promocion_items pi
+        LEFT JOIN productos c ON c.id = pi.producto_id
+        GROUP BY pi.promocion_id
+    ) ps ON ps.promocion_id = p.id
+'''
+
+# Índices de la migración v6. Compuestos/cubrientes según los filtros de cada reporte:
+# - ventas por estado + rango de fechas (reporte financiero, desglose y caja del turno)
+# - movimientos por tipo + fecha (fiados/abonos del período) y por cliente (saldos)
+# - gastos por fecha, detalle por venta/producto, componentes por promoción
+REPORT_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_ventas_estado_fecha ON ventas(estado, fecha, medio_pago, total)",
+    "CREATE INDEX IF NOT EXISTS idx_ventas_fecha ON ventas(fecha)",
+    "CREATE INDEX IF NOT EXISTS idx_movimientos_tipo_fecha ON movimientos_cuenta(tipo, fecha, estado, medio_pago, monto)",
+    "CREATE INDEX IF NOT EXISTS idx_movimientos_cliente ON movimientos_cuenta(cliente_id, tipo, estado, monto)",
+    "CREATE INDEX IF NOT EXISTS idx_movimientos_venta ON movimientos_cuenta(venta_id)",
+    "CREATE INDEX IF NOT EXISTS idx_gastos_fecha ON gastos(fecha, monto)",
+    "CREATE INDEX IF NOT EXISTS idx_detalle_venta ON detalle_ventas(venta_id, producto_id, cantidad)",
+    "CREATE INDEX IF NOT EXISTS idx_detalle_producto ON detalle_ventas(producto_id)",
+    "CREATE INDEX IF NOT EXISTS idx_promocion_items_promo ON promocion_items(promocion_id, producto_id, cantidad)",
+    "CREATE INDEX IF NOT EXISTS idx_turnos_abiertos ON turnos(fecha_fin)",
+)
+
+# Índices de la migración v7: paginación keyset sobre (fecha, id) en los historiales.
+# Con el id explícito en el índice, "ORDER BY fecha DESC, id DESC LIMIT n" se resuelve
+# recorriendo el índice, sin ordenar en un B-tree temporal.
+KEYSET_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_ventas_keyset ON ventas(estado, fecha, id)",
+    "CREATE INDEX IF NOT EXISTS idx_gastos_keyset ON gastos(fecha, id)",
+    "CREATE INDEX IF NOT EXISTS idx_movimientos_tipo_keyset ON movimientos_cuenta(tipo, fecha, id)",
+    "CREATE INDEX IF NOT EXISTS idx_movimientos_cliente_keyset ON movimientos_cuenta(cliente_id, fecha, id)",
+)
+
+# Migración v11: códigos de barras indexables.
+# productos.codigo_norm guarda normalize_barcode(codigo_barras) con índice único (sin LOWER()
+# en el WHERE, que impide usar el índice). Los códigos alternativos de un producto (el
+# proveedor cambió el EAN, otro formato del mismo envase) van en producto_codigos.
+BARCODE_ALIAS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS producto_codigos (
+        codigo_norm TEXT PRIMARY KEY,
+        codigo TEXT NOT NULL,
+        producto_id INTEGER NOT NULL,
+        FOREIGN KEY (producto_id) REFERENCES productos (id)
+    )
+'''
+BARCODE_INDEXES = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_productos_codigo_norm ON productos(codigo_norm) WHERE codigo_norm IS NOT NULL",
+    "CREATE INDEX IF NOT EXISTS idx_producto_codigos_producto ON producto_codigos(producto_id)",
+)
+
+# Totales de cada cliente recalculados desde movimientos_cuenta (solo movimientos no anulados).
+# Lo usa verify_client_balances() para detectar diferencias con los saldos guardados.
+CLIENT_LEDGER_BALANCES = '''
+    SELECT
+        c.id, c.nombre, c.deuda_total, c.pagado_total, c.saldo,
+        COALESCE(SUM(CASE WHEN m.tipo = 'DEUDA' AND COALESCE(m.estado, 'Completada') = 'Completada' THEN m.monto ELSE 0 END), 0),
+        COALESCE(SUM(CASE WHEN m.tipo = 'PAGO' AND COALESCE(m.estado, 'Completada') = 'Completada' THEN m.monto ELSE 0 END), 0)
+    FROM clientes c
+    LEFT JOIN movimientos_cuenta m ON c.id = m.cliente_id
+    GROUP BY c.id
+'''
+
+# Tablas de resumen (migración v9). Se actualizan en la misma transacción que cada
+# venta, gasto, abono/fiado y anulación, así los reportes por rango de días leen
+# unas pocas filas por día en vez de recorrer ventas/detalle/movimientos/gastos.
+# - resumen_diario: por día y medio de pago. Ventas completadas, fiados (DEUDA),
+#   abonos (PAGO) y gastos. Los movimientos anulados no cuentan.
+# - resumen_producto_diario: unidades y subtotal (antes de descuento) por producto y día.
+ROLLUP_TABLES = (
+    '''
+    CREATE TABLE IF NOT EXISTS resumen_diario (
+        dia TEXT NOT NULL,
+        medio_pago TEXT NOT NULL DEFAULT '',
+        ventas_total REAL NOT NULL DEFAULT 0,
+        ventas_n INTEGER NOT NULL DEFAULT 0,
+        fiado_total REAL NOT NULL DEFAULT 0,
+        abonos_total REAL NOT NULL DEFAULT 0,
+        abonos_n INTEGER NOT NULL DEFAULT 0,
+        gastos_total REAL NOT NULL DEFAULT 0,
+        gastos_n INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (dia, medio_pago)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS resumen_producto_diario (
+        dia TEXT NOT NULL,
+        producto_id INTEGER NOT NULL,
+        cantidad REAL NOT NULL DEFAULT 0,
+        total REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (dia, producto_id)
+    )
+    ''',
+)
+
+DAILY_ROLLUP_COLUMNS = ("ventas_total", "ventas_n", "fiado_total", "abonos_total",
+                        "abonos_n", "gastos_total", "gastos_n")
+
+# Motor de métricas (_compute_metrics): una sola consulta por ventana de tiempo.
+# Cada fila es (fuente, medio_pago, cantidad, total) con fuente:
+# V = ventas completadas, P = abonos, D = fiados, G = gastos.
+# Los abonos sin medio de pago (anteriores a la migración v3) se cuentan como EFECTIVO.
+METRICS_DETAIL_SQL = '''
+    SELECT 'V', COALESCE(medio_pago, 'EFECTIVO'), COUNT(*), SUM(total)
+    FROM ventas
+    WHERE estado = 'Completada' AND fecha BETWEEN :inicio AND :fin
+    GROUP BY 2
+    UNION ALL
+    SELECT 'P', COALESCE(medio_pago, 'EFECTIVO'), COUNT(*), SUM(monto)
+    FROM movimientos_cuenta
+    WHERE tipo = 'PAGO' AND fecha BETWEEN :inicio AND :fin AND COALESCE(estado, 'Completada') = 'Completada'
+    GROUP BY 2
+    UNION ALL
+    SELECT 'D', '', COUNT(*), SUM(monto)
+    FROM movimientos_cuenta
+    WHERE tipo = 'DEUDA' AND fecha BETWEEN :inicio AND :fin AND COALESCE(estado, 'Completada') = 'Completada'
+    UNION ALL
+    SELECT 'G', '', COUNT(*), SUM(monto)
+    FROM gastos
+    WHERE fecha BETWEEN :inicio AND :fin
+'''
+
+# Misma forma de filas, leída de resumen_diario (ventanas de días completos)
+METRICS_ROLLUP_SQL = '''
+    SELECT 'V', CASE WHEN medio_pago = '' THEN 'EFECTIVO' ELSE medio_pago END, SUM(ventas_n), SUM(ventas_total)
+    FROM resumen_diario WHERE dia BETWEEN :inicio AND :fin
+    GROUP BY 2 HAVING SUM(ventas_n) != 0
+    UNION ALL
+    SELECT 'P', CASE WHEN medio_pago = '' THEN 'EFECTIVO' ELSE medio_pago END, SUM(abonos_n), SUM(abonos_total)
+    FROM resumen_diario WHERE dia BETWEEN :inicio AND :fin
+    GROUP BY 2 HAVING SUM(abonos_n) != 0
+    UNION ALL
+    SELECT 'D', '', 0, SUM(fiado_total) FROM resumen_diario WHERE dia BETWEEN :inicio AND :fin
+    UNION ALL
+    SELECT 'G', '', SUM(gastos_n), SUM(gastos_total) FROM resumen_diario WHERE dia BETWEEN :inicio AND :fin
+'''
+
 class InventarioModel:
     def __init__(self, db_name='sos_pyme.db'):
         self.db_name = db_name
+        # Conexión persistente por hilo + transacciones (ver app/data/connection.py)
+        self.db = ConnectionManager(db_name)
+        # Catálogo de productos en memoria (se carga en el primer acceso)
+        self.catalog = ProductCatalog()
+        self._config_cache = None  # ver get_config
         self._init_db()
 
+    def close(self):
+        """Cierra todas las conexiones abiertas del modelo."""
+        self.db.close()
+
+    def reload_after_restore(self):
+        """
+        Tras restaurar un respaldo sobre la base abierta: aplica las migraciones que le
+        falten (puede ser de una versión anterior) y descarta los caches en memoria.
+        """
+        from app.utils.printer_helper import invalidate_ticket_template
+
+        self._config_cache = None
+        self.catalog.invalidate()
+        self._init_db()
+        self._config_cache = None
+        invalidate_ticket_template()  # Cabecera/pie del ticket salen de la config restaurada
+
+    def get_data_version(self):
+        """
+        Número que cambia con cada escritura confirmada desde este proceso.
+        Permite cachear resultados derivados (p.ej. PDFs de reportes) mientras no haya cambios.
+        """
+        return self.db.write_version
+
     def _init_db(self):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
+        # Guardia de versión: si la base ya está en SCHEMA_VERSION no se ejecuta ningún DDL
+        # (ni CREATE TABLE ni ALTER TABLE): el arranque queda en una sola lectura de config.
+        if self._read_db_version() >= SCHEMA_VERSION:
+            return
+
+        with self.db.transaction() as cursor:
+            self._create_tables(cursor)
+
+        # Ejecutar Migraciones Automaticas
+        self.run_migrations()
+
+    def _read_db_version(self):
+        try:
+            with self.db.read() as cursor:
+                cursor.execute("SELECT value FROM config WHERE key='db_version'")
+                row = cursor.fetchone()
+            return int(row[0]) if row else 0
+        except (sqlite3.OperationalError, ValueError):
+            return 0 # Base nueva (sin tabla config) o valor inválido
+
+    @staticmethod
+    def _add_column(cursor, table, column, definition):
+        """Agrega la columna solo si falta (sin provocar un ALTER TABLE fallido)."""
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def _create_tables(self, cursor):
         # 1. Tabla Productos
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS productos (
@@ -22,18 +234,10 @@ class InventarioModel:
         ''')
         
         # Migración: Agregar columna codigo_barras si no existe
-        try:
-            cursor.execute("ALTER TABLE productos ADD COLUMN codigo_barras TEXT")
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass # Ya existe
-            
+        self._add_column(cursor, "productos", "codigo_barras", "TEXT")
+
         # Migración: Agregar columna categoria si no existe (Modo Café)
-        try:
-            cursor.execute("ALTER TABLE productos ADD COLUMN categoria TEXT DEFAULT 'General'")
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass # Ya existe
+        self._add_column(cursor, "productos", "categoria", "TEXT DEFAULT 'General'")
         
         # Crear índice para búsqueda rápida por código de barras
         cursor.execute('''
@@ -51,11 +255,7 @@ class InventarioModel:
         ''')
         
         # Migración: Agregar columna medio_pago a ventas si no existe
-        try:
-            cursor.execute("ALTER TABLE ventas ADD COLUMN medio_pago TEXT DEFAULT 'EFECTIVO'")
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass # Ya existe
+        self._add_column(cursor, "ventas", "medio_pago", "TEXT DEFAULT 'EFECTIVO'")
         
         # 3. Tabla Detalle Ventas
         cursor.execute('''
@@ -157,12 +357,6 @@ class InventarioModel:
                 nombre TEXT UNIQUE NOT NULL
             )
         ''')
-        
-        conn.commit()
-        conn.close()
-        
-        # Ejecutar Migraciones Automaticas
-        self.run_migrations()
 
     # ==========================================
     # METODOS DE MIGRACIÓN
@@ -172,120 +366,185 @@ class InventarioModel:
         """
         Sistema de Migración Automática.
         Verifica versión de DB y aplica cambios incrementales.
+        Cada migración corre en su propia transacción.
         """
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        try:
-            # Obtener versión actual
-            cursor.execute("SELECT value FROM config WHERE key='db_version'")
-            row = cursor.fetchone()
-            current_version = int(row[0]) if row else 0
-        except Exception as e:
-            print(f"Error reading config: {e}")
-            current_version = 0
+        # Obtener versión actual
+        current_version = self._read_db_version()
             
         print(f"DEBUG: Run Migrations - Current Version: {current_version}")
         
         # --- MIGRACION 1: Columnas Legacy (Legacy check) ---
         if current_version < 1:
             print("Aplicando Migración v1 (Legacy Fields)...")
-            # Verificar y agregar columnas que podrían faltar de versiones previas
-            tables_fields = {
-                "productos": [("codigo_barras", "TEXT"), ("categoria", "TEXT DEFAULT 'General'")],
-                "ventas": [("medio_pago", "TEXT DEFAULT 'EFECTIVO'")]
-            }
-            
-            for table, fields in tables_fields.items():
-                for field_name, field_type in fields:
-                    try:
-                        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {field_name} {field_type}")
-                    except sqlite3.OperationalError:
-                        pass # Ya existe
-            
-            # Update version
-            cursor.execute("INSERT OR REPLACE INTO config (key, value) VALUES ('db_version', '1')")
-            conn.commit()
+            with self.db.transaction() as cursor:
+                # Verificar y agregar columnas que podrían faltar de versiones previas
+                tables_fields = {
+                    "productos": [("codigo_barras", "TEXT"), ("categoria", "TEXT DEFAULT 'General'")],
+                    "ventas": [("medio_pago", "TEXT DEFAULT 'EFECTIVO'")]
+                }
+                
+                for table, fields in tables_fields.items():
+                    for field_name, field_type in fields:
+                        try:
+                            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {field_name} {field_type}")
+                        except sqlite3.OperationalError:
+                            pass # Ya existe
+                
+                # Update version
+                cursor.execute("INSERT OR REPLACE INTO config (key, value) VALUES ('db_version', '1')")
             print("Migración v1 aplicada.")
             current_version = 1
 
         # --- MIGRACION 2: Descuento en Ventas ---
         if current_version < 2:
             print("Aplicando Migración v2 (Descuentos)...")
-            try:
-                cursor.execute("ALTER TABLE ventas ADD COLUMN descuento REAL DEFAULT 0")
-                print("Columna 'descuento' agregada.")
-            except sqlite3.OperationalError as e:
-                print(f"Error agregando columna descuento: {e}")
-                pass
-            
-            cursor.execute("INSERT OR REPLACE INTO config (key, value) VALUES ('db_version', '2')")
-            conn.commit()
+            with self.db.transaction() as cursor:
+                try:
+                    cursor.execute("ALTER TABLE ventas ADD COLUMN descuento REAL DEFAULT 0")
+                    print("Columna 'descuento' agregada.")
+                except sqlite3.OperationalError as e:
+                    print(f"Error agregando columna descuento: {e}")
+                    pass
+                
+                cursor.execute("INSERT OR REPLACE INTO config (key, value) VALUES ('db_version', '2')")
             print("Migración v2 aplicada.")
             current_version = 2
         
         # --- MIGRACION 3: Método de Pago en Movimientos de Cuenta ---
         if current_version < 3:
             print("Aplicando Migración v3 (Método de Pago en Deudas)...")
-            try:
-                cursor.execute("ALTER TABLE movimientos_cuenta ADD COLUMN medio_pago TEXT DEFAULT NULL")
-                print("Columna 'medio_pago' agregada a movimientos_cuenta.")
-            except sqlite3.OperationalError as e:
-                print(f"Error agregando columna medio_pago: {e}")
-                pass
-            
-            cursor.execute("INSERT OR REPLACE INTO config (key, value) VALUES ('db_version', '3')")
-            conn.commit()
+            with self.db.transaction() as cursor:
+                try:
+                    cursor.execute("ALTER TABLE movimientos_cuenta ADD COLUMN medio_pago TEXT DEFAULT NULL")
+                    print("Columna 'medio_pago' agregada a movimientos_cuenta.")
+                except sqlite3.OperationalError as e:
+                    print(f"Error agregando columna medio_pago: {e}")
+                    pass
+                
+                cursor.execute("INSERT OR REPLACE INTO config (key, value) VALUES ('db_version', '3')")
             print("Migración v3 aplicada.")
             current_version = 3
 
         # --- MIGRACION 4: Tabla Categorías ---
         if current_version < 4:
             print("Aplicando Migración v4 (Tabla Categorías)...")
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS categorias (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    nombre TEXT UNIQUE NOT NULL
-                )
-            ''')
-            # Poblar con valores por defecto
-            default_cats = ["General", "Promociones", "Bebidas", "Cafés", "Sandwiches", "Pastelería", "Almacén", "Cigarros", "Lácteos", "Aseo", "Fiambrería", "Verdurería", "Granel"]
-            for cat in default_cats:
-                cursor.execute("INSERT OR IGNORE INTO categorias (nombre) VALUES (?)", (cat,))
+            with self.db.transaction() as cursor:
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS categorias (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        nombre TEXT UNIQUE NOT NULL
+                    )
+                ''')
+                # Poblar con valores por defecto
+                default_cats = ["General", "Promociones", "Bebidas", "Cafés", "Sandwiches", "Pastelería", "Almacén", "Cigarros", "Lácteos", "Aseo", "Fiambrería", "Verdurería", "Granel"]
+                cursor.executemany("INSERT OR IGNORE INTO categorias (nombre) VALUES (?)", [(cat,) for cat in default_cats])
+                    
+                # Poblar con categorías existentes en productos, normalizándolas
+                cursor.execute("SELECT DISTINCT categoria FROM productos WHERE categoria IS NOT NULL")
+                existing_cats = cursor.fetchall()
+                for row in existing_cats:
+                    if row[0]:
+                        norm_cat = row[0].strip().title()
+                        if norm_cat:
+                            cursor.execute("INSERT OR IGNORE INTO categorias (nombre) VALUES (?)", (norm_cat,))
                 
-            # Poblar con categorías existentes en productos, normalizándolas
-            cursor.execute("SELECT DISTINCT categoria FROM productos WHERE categoria IS NOT NULL")
-            existing_cats = cursor.fetchall()
-            for row in existing_cats:
-                if row[0]:
-                    norm_cat = row[0].strip().title()
-                    if norm_cat:
-                        cursor.execute("INSERT OR IGNORE INTO categorias (nombre) VALUES (?)", (norm_cat,))
-            
-            cursor.execute("INSERT OR REPLACE INTO config (key, value) VALUES ('db_version', '4')")
-            conn.commit()
+                cursor.execute("INSERT OR REPLACE INTO config (key, value) VALUES ('db_version', '4')")
             print("Migración v4 aplicada.")
             current_version = 4
 
         # --- MIGRACION 5: Estado de Ventas y Movimientos ---
         if current_version < 5:
             print("Aplicando Migración v5 (Estado de Ventas y Movimientos)...")
-            try:
-                # 1. Ventas
-                cursor.execute("ALTER TABLE ventas ADD COLUMN estado TEXT DEFAULT 'Completada'")
-                # 2. Movimientos Cuenta
-                cursor.execute("ALTER TABLE movimientos_cuenta ADD COLUMN estado TEXT DEFAULT 'Completada'")
-                print("Columnas 'estado' agregadas.")
-            except sqlite3.OperationalError as e:
-                print(f"Error en Migración v5: {e}")
-                pass
-            
-            cursor.execute("INSERT OR REPLACE INTO config (key, value) VALUES ('db_version', '5')")
-            conn.commit()
+            with self.db.transaction() as cursor:
+                try:
+                    # 1. Ventas
+                    cursor.execute("ALTER TABLE ventas ADD COLUMN estado TEXT DEFAULT 'Completada'")
+                    # 2. Movimientos Cuenta
+                    cursor.execute("ALTER TABLE movimientos_cuenta ADD COLUMN estado TEXT DEFAULT 'Completada'")
+                    print("Columnas 'estado' agregadas.")
+                except sqlite3.OperationalError as e:
+                    print(f"Error en Migración v5: {e}")
+                    pass
+                
+                cursor.execute("INSERT OR REPLACE INTO config (key, value) VALUES ('db_version', '5')")
             print("Migración v5 aplicada.")
             current_version = 5
-        
-        conn.close()
+
+        # --- MIGRACION 6: Índices para reportes ---
+        if current_version < 6:
+            print("Aplicando Migración v6 (Índices de Reportes)...")
+            with self.db.transaction() as cursor:
+                for index_sql in REPORT_INDEXES:
+                    cursor.execute(index_sql)
+                cursor.execute("INSERT OR REPLACE INTO config (key, value) VALUES ('db_version', '6')")
+            print("Migración v6 aplicada.")
+            current_version = 6
+
+        # --- MIGRACION 7: Índices para paginación keyset ---
+        if current_version < 7:
+            print("Aplicando Migración v7 (Índices de Paginación)...")
+            with self.db.transaction() as cursor:
+                for index_sql in KEYSET_INDEXES:
+                    cursor.execute(index_sql)
+                cursor.execute("INSERT OR REPLACE INTO config (key, value) VALUES ('db_version', '7')")
+            print("Migración v7 aplicada.")
+            current_version = 7
+
+        # --- MIGRACION 8: Saldos de clientes mantenidos ---
+        if current_version < 8:
+            print("Aplicando Migración v8 (Saldos de Clientes)...")
+            with self.db.transaction() as cursor:
+                for columna in ("deuda_total", "pagado_total", "saldo"):
+                    try:
+                        cursor.execute(f"ALTER TABLE clientes ADD COLUMN {columna} REAL NOT NULL DEFAULT 0")
+                    except sqlite3.OperationalError:
+                        pass # Ya existe
+                self._rebuild_client_balances(cursor)
+                cursor.execute("INSERT OR REPLACE INTO config (key, value) VALUES ('db_version', '8')")
+            print("Migración v8 aplicada.")
+            current_version = 8
+
+        # --- MIGRACION 9: Resúmenes diarios para reportes ---
+        if current_version < 9:
+            print("Aplicando Migración v9 (Resúmenes Diarios)...")
+            with self.db.transaction() as cursor:
+                for table_sql in ROLLUP_TABLES:
+                    cursor.execute(table_sql)
+                self._rebuild_rollups(cursor)
+                cursor.execute("INSERT OR REPLACE INTO config (key, value) VALUES ('db_version', '9')")
+            print("Migración v9 aplicada.")
+            current_version = 9
+
+        # --- MIGRACION 10: Fecha de vencimiento de productos ---
+        # (antes se intentaba el ALTER TABLE en cada lectura/escritura de productos)
+        if current_version < 10:
+            print("Aplicando Migración v10 (Fecha de Vencimiento)...")
+            with self.db.transaction() as cursor:
+                self._add_column(cursor, "productos", "fecha_vencimiento", "TEXT")
+                cursor.execute("INSERT OR REPLACE INTO config (key, value) VALUES ('db_version', '10')")
+            print("Migración v10 aplicada.")
+            current_version = 10
+
+        # --- MIGRACION 11: Código de barras normalizado + códigos alternativos ---
+        if current_version < 11:
+            print("Aplicando Migración v11 (Códigos de Barras)...")
+            with self.db.transaction() as cursor:
+                self._add_column(cursor, "productos", "codigo_norm", "TEXT")
+                cursor.execute(BARCODE_ALIAS_TABLE)
+                cursor.execute("SELECT id, codigo_barras FROM productos WHERE codigo_barras IS NOT NULL ORDER BY id")
+                vistos, filas = set(), []
+                for pid, codigo in cursor.fetchall():
+                    norm = normalize_barcode(codigo)
+                    if norm is None or norm in vistos:
+                        continue # Repetido: lo conserva el producto más antiguo
+                    vistos.add(norm)
+                    filas.append((norm, pid))
+                cursor.executemany("UPDATE productos SET codigo_norm = ? WHERE id = ?", filas)
+                for index_sql in BARCODE_INDEXES:
+                    cursor.execute(index_sql)
+                cursor.execute("INSERT OR REPLACE INTO config (key, value) VALUES ('db_version', '11')")
+            print("Migración v11 aplicada.")
+            current_version = 11
 
 
 
@@ -294,46 +553,40 @@ class InventarioModel:
     # METODOS CONFIGURACION
     # ==========================================
     def get_config(self, key, default=None):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("SELECT value FROM config WHERE key = ?", (key,))
-        res = cursor.fetchone()
-        conn.close()
-        return res[0] if res else default
+        # La tabla config es chica y se lee en cada venta (ticket): se cachea completa
+        # en memoria y set_config la invalida.
+        config = self._config_cache
+        if config is None:
+            with self.db.read() as cursor:
+                cursor.execute("SELECT key, value FROM config")
+                config = dict(cursor.fetchall())
+            self._config_cache = config
+        return config.get(key, default)
 
     def set_config(self, key, value):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)", (key, value))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as cursor:
+            cursor.execute("INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)", (key, value))
+        self._config_cache = None  # Se recarga en la próxima lectura (con la conversión de SQLite)
 
     # ==========================================
     # METODOS CATEGORIAS
     # ==========================================
     def get_all_categories(self):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("SELECT nombre FROM categorias ORDER BY nombre ASC")
-        res = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return res
+        with self.db.read() as cursor:
+            cursor.execute("SELECT nombre FROM categorias ORDER BY nombre ASC")
+            return [row[0] for row in cursor.fetchall()]
 
     def add_category(self, nombre):
         if not nombre: return
         # Normalizar: " mascotas " -> "Mascotas"
         nombre_normalizado = nombre.strip().title()
         if not nombre_normalizado or nombre_normalizado == "Todas": return
-        
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+
         try:
-            cursor.execute("INSERT INTO categorias (nombre) VALUES (?)", (nombre_normalizado,))
-            conn.commit()
+            with self.db.transaction() as cursor:
+                cursor.execute("INSERT INTO categorias (nombre) VALUES (?)", (nombre_normalizado,))
         except sqlite3.IntegrityError:
             pass # Ya existe
-        finally:
-            conn.close()
 
     def update_category(self, old_name, new_name):
         """Actualiza el nombre de una categoría y cambia los productos asociados."""
@@ -341,20 +594,17 @@ class InventarioModel:
         if not new_name or old_name == new_name or new_name == "Todas":
             return False
 
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
         try:
-            # 1. Actualizar la tabla de categorías
-            cursor.execute("UPDATE categorias SET nombre = ? WHERE nombre = ?", (new_name, old_name))
-            # 2. Actualizar los productos que tenían la categoría vieja
-            cursor.execute("UPDATE productos SET categoria = ? WHERE categoria = ?", (new_name, old_name))
-            conn.commit()
+            with self.db.transaction() as cursor:
+                # 1. Actualizar la tabla de categorías
+                cursor.execute("UPDATE categorias SET nombre = ? WHERE nombre = ?", (new_name, old_name))
+                # 2. Actualizar los productos que tenían la categoría vieja
+                cursor.execute("UPDATE productos SET categoria = ? WHERE categoria = ?", (new_name, old_name))
+            self.catalog.invalidate()
             return True
         except Exception as e:
             print(f"Error al actualizar categoría: {e}")
             return False
-        finally:
-            conn.close()
 
     def delete_category(self, category_name):
         """Elimina una categoría y mueve sus productos a 'General'."""
@@ -363,241 +613,277 @@ class InventarioModel:
         if category_name in categorias_protegidas:
             return False
 
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        try:
+        with self.db.transaction() as cursor:
             # 1. Mover productos a "General"
             cursor.execute("UPDATE productos SET categoria = 'General' WHERE categoria = ?", (category_name,))
             # 2. Borrar la categoría de la tabla
             cursor.execute("DELETE FROM categorias WHERE nombre = ?", (category_name,))
-            conn.commit()
-            return True
-        finally:
-            conn.close()
+        self.catalog.invalidate()
+        return True
 
     def anular_venta(self, id_venta):
         """
-        Anula una venta: 
+        Anula una venta:
         1. Devuelve el stock (maneja productos normales y promos).
         2. Cambia estado del movimiento de cuenta a 'Anulada' si aplica.
         3. Cambia estado de la venta a 'Anulada'.
         """
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
         try:
-            # 1. Verificar existencia y estado
-            cursor.execute("SELECT estado, medio_pago, total FROM ventas WHERE id = ?", (id_venta,))
-            venta = cursor.fetchone()
-            if not venta:
-                return False, "La venta no existe."
-            
-            estado_actual, medio_pago, total = venta
-            if estado_actual == 'Anulada':
-                return False, "Esta venta ya fue anulada anteriormente."
-
-            # 2. Restaurar Stock
-            cursor.execute("SELECT producto_id, cantidad FROM detalle_ventas WHERE venta_id = ?", (id_venta,))
-            detalles = cursor.fetchall()
-            
-            for pid, cantidad in detalles:
-                # Chequear si es promo para devolver stock de sus componentes
-                cursor.execute("SELECT producto_id, cantidad FROM promocion_items WHERE promocion_id = ?", (pid,))
-                promo_items = cursor.fetchall()
-                
-                if promo_items:
-                    for comp_pid, comp_qty in promo_items:
-                        total_return = comp_qty * cantidad
-                        # Usamos UPDATE sin check de existencia por robustez (blindaje)
-                        cursor.execute("UPDATE productos SET stock = stock + ? WHERE id = ?", (total_return, comp_pid))
-                else:
-                    # Producto normal
-                    cursor.execute("UPDATE productos SET stock = stock + ? WHERE id = ?", (cantidad, pid))
-
-            # 3. Anular Movimiento de Cuenta si existe (Fiado/Deuda)
-            cursor.execute("UPDATE movimientos_cuenta SET estado = 'Anulada' WHERE venta_id = ?", (id_venta,))
-
-            # 4. Cambiar estado de la venta
-            cursor.execute("UPDATE ventas SET estado = 'Anulada' WHERE id = ?", (id_venta,))
-            
-            conn.commit()
+            with self.db.transaction(immediate=True) as cursor:
+                # 1. Verificar existencia y estado
+                cursor.execute("SELECT estado, medio_pago, total, fecha FROM ventas WHERE id = ?", (id_venta,))
+                venta = cursor.fetchone()
+                if not venta:
+                    return False, "La venta no existe."
+
+                estado_actual, medio_pago, total, fecha_venta = venta
+                if estado_actual == 'Anulada':
+                    return False, "Esta venta ya fue anulada anteriormente."
+
+                # 2. Restaurar Stock
+                cursor.execute("SELECT producto_id, cantidad, subtotal FROM detalle_ventas WHERE venta_id = ?", (id_venta,))
+                detalles = cursor.fetchall()
+                touched = set()
+
+                for pid, cantidad, _ in detalles:
+                    # Chequear si es promo para devolver stock de sus componentes
+                    cursor.execute("SELECT producto_id, cantidad FROM promocion_items WHERE promocion_id = ?", (pid,))
+                    promo_items = cursor.fetchall()
+
+                    if promo_items:
+                        for comp_pid, comp_qty in promo_items:
+                            total_return = comp_qty * cantidad
+                            # Usamos UPDATE sin check de existencia por robustez (blindaje)
+                            cursor.execute("UPDATE productos SET stock = stock + ? WHERE id = ?", (total_return, comp_pid))
+                            touched.add(comp_pid)
+                    else:
+                        # Producto normal
+                        cursor.execute("UPDATE productos SET stock = stock + ? WHERE id = ?", (cantidad, pid))
+                        touched.add(pid)
+
+                # 3. Anular Movimiento de Cuenta si existe (Fiado/Deuda) y descontarlo del saldo
+                cursor.execute("""
+                    SELECT cliente_id, tipo, monto, fecha, medio_pago FROM movimientos_cuenta
+                    WHERE venta_id = ? AND COALESCE(estado, 'Completada') = 'Completada'
+                """, (id_venta,))
+                for cliente_id, tipo, monto, fecha_mov, medio_mov in cursor.fetchall():
+                    self._apply_client_balance(cursor, cliente_id, tipo, -monto)
+                    self._rollup_movement(cursor, fecha_mov, tipo, -monto, medio_mov)
+                cursor.execute("UPDATE movimientos_cuenta SET estado = 'Anulada' WHERE venta_id = ?", (id_venta,))
+
+                # 4. Cambiar estado de la venta y descontarla de los resúmenes
+                cursor.execute("UPDATE ventas SET estado = 'Anulada' WHERE id = ?", (id_venta,))
+                self._bump_daily(cursor, fecha_venta, medio_pago, ventas_total=-total, ventas_n=-1)
+                self._bump_products_daily(cursor, fecha_venta, [(pid, -cantidad, -subtotal) for pid, cantidad, subtotal in detalles])
+
+            self._refresh_catalog(touched)
             return True, "Venta anulada correctamente. Stock restaurado."
-            
+
         except Exception as e:
-            conn.rollback()
+            # El context manager ya hizo ROLLBACK
             print(f"Error crítico al anular venta: {e}")
             return False, f"Error interno: {e}"
-        finally:
-            conn.close()
 
     # ==========================================
     # METODOS CRUD PRODUCTOS
     # ==========================================
-    
-    # --- MIGRACION VENCIMIENTO ---
-    def _ensure_expiration_column(self):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        try:
-            cursor.execute("ALTER TABLE productos ADD COLUMN fecha_vencimiento TEXT")
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass # Ya existe
-        conn.close()
-    
+
+    # --- CATALOGO EN MEMORIA ---
+    def _load_catalog(self):
+        """Carga completa del catálogo (primer acceso o tras invalidar)."""
+        with self.db.read() as cursor:
+            cursor.execute(PRODUCT_SELECT + " ORDER BY p.id")
+            rows = cursor.fetchall()
+            cursor.execute("SELECT promocion_id, producto_id, cantidad FROM promocion_items")
+            promo_items = cursor.fetchall()
+            cursor.execute("SELECT producto_id, codigo_norm FROM producto_codigos ORDER BY rowid")
+            aliases = cursor.fetchall()
+        self.catalog.load(rows, promo_items, aliases)
+
+    def _get_catalog(self):
+        if not self.catalog.loaded:
+            self._load_catalog()
+        return self.catalog
+
+    def reload_catalog(self):
+        """Fuerza recarga (p.ej. si otro proceso modificó la base)."""
+        self.catalog.invalidate()
+
+    def _refresh_catalog(self, product_ids):
+        """
+        Parchea solo las filas tocadas por una escritura y recalcula
+        en memoria el stock de las promociones que las usan.
+        """
+        ids = list({pid for pid in product_ids if pid is not None})
+        if not ids or not self.catalog.loaded:
+            return
+        placeholders = ",".join("?" * len(ids))
+        with self.db.read() as cursor:
+            cursor.execute(PRODUCT_SELECT + f" WHERE p.id IN ({placeholders})", ids)
+            rows = cursor.fetchall()
+        found = set()
+        for row in rows:
+            self.catalog.upsert(row)
+            found.add(row[0])
+        for pid in ids:
+            if pid not in found:
+                self.catalog.remove(pid)
+        self.catalog.recompute_promo_stock(self.catalog.promos_using(ids))
+
     def get_all_products(self):
-        self._ensure_expiration_column()
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM productos")
-        res = cursor.fetchall()
-        
-        # Procesar para calcular stock dinámico de Promociones
-        final_res = []
-        for p in res:
-            # Schema: id, nombre, precio, stock, critico, barcode, categoria
-            # Check length just in case
-            p_cat = "General"
-            if len(p) >= 7: p_cat = p[6]
-            
-            if p_cat == "Promociones":
-                # Calcular stock máximo disponible basado en componentes
-                cursor.execute("SELECT producto_id, cantidad FROM promocion_items WHERE promocion_id = ?", (p[0],))
-                comps = cursor.fetchall()
-                if not comps:
-                    real_stock = 0
-                else:
-                    possible_stocks = []
-                    for c_pid, c_qty in comps:
-                        cursor.execute("SELECT stock FROM productos WHERE id = ?", (c_pid,))
-                        c_res = cursor.fetchone()
-                        c_stock = c_res[0] if c_res else 0
-                        # Cuantos paquetes puedo armar con este item?
-                        possible_stocks.append(c_stock // c_qty)
-                    real_stock = min(possible_stocks) if possible_stocks else 0
-                
-                # Reconstruir tupla con nuevo stock
-                # Tuplas son inmutables
-                p_list = list(p)
-                p_list[3] = real_stock # Index 3 is stock
-                final_res.append(tuple(p_list))
-            else:
-                final_res.append(p)
+        # El stock dinámico de Promociones viene resuelto en el catálogo
+        return self._get_catalog().all()
+
+    def get_product(self, product_id):
+        return self._get_catalog().get(product_id)
 
-        conn.close()
-        return final_res
+    def get_products_by_category(self, categoria):
+        """Productos de una categoría ('Todas' = todos), sin consultar la DB."""
+        if not categoria or categoria == "Todas":
+            return self._get_catalog().all()
+        return self._get_catalog().by_category(categoria)
+
+    def get_catalog_version(self):
+        """Cambia cada vez que se recarga o parchea el catálogo."""
+        return self._get_catalog().version
+
+    def search_products(self, query="", categoria=None, limit=None):
+        """Búsqueda en memoria por nombre (sin tildes) o código de barras, ordenada por relevancia."""
+        return self._get_catalog().search(query, categoria, limit)
 
     def add_product(self, nombre, precio, stock, stock_critico, codigo_barras=None, categoria="General", fecha_vencimiento=None):
-        self._ensure_expiration_column()
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+        codigo_norm = normalize_barcode(codigo_barras)
         try:
-            cursor.execute('''
-                INSERT INTO productos (nombre, precio, stock, stock_critico, codigo_barras, categoria, fecha_vencimiento)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (nombre, precio, stock, stock_critico, codigo_barras, categoria, fecha_vencimiento))
-            conn.commit()
+            with self.db.transaction() as cursor:
+                self._check_barcode_free(cursor, codigo_barras)
+                cursor.execute('''
+                    INSERT INTO productos (nombre, precio, stock, stock_critico, codigo_barras, categoria, fecha_vencimiento, codigo_norm)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (nombre, precio, stock, stock_critico, codigo_barras, categoria, fecha_vencimiento, codigo_norm))
+                product_id = cursor.lastrowid
         except sqlite3.IntegrityError:
             raise Exception(f"El producto '{nombre}' ya existe.")
-        finally:
-            conn.close()
-
-    def update_product(self, product_id, nombre, precio, stock, stock_critico, codigo_barras=None, categoria="General", fecha_vencimiento=None):
-        self._ensure_expiration_column()
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+        self._refresh_catalog([product_id])
+
+    def update_product(self, product_id, nombre, precio, stock, stock_critico, codigo_barras=None, categoria="General", fecha_vencimiento=None,
+                       codigos_alternativos=None):
+        """codigos_alternativos: si se pasa (lista), reemplaza los códigos adicionales del producto."""
+        codigo_norm = normalize_barcode(codigo_barras)
+        with self.db.transaction() as cursor:
+            self._check_barcode_free(cursor, codigo_barras, product_id)
+            # Si el nuevo código principal era uno de sus alternativos, deja de serlo
+            cursor.execute("DELETE FROM producto_codigos WHERE codigo_norm = ? AND producto_id = ?",
+                           (codigo_norm, product_id))
+            cursor.execute('''
+                UPDATE productos
+                SET nombre = ?, precio = ?, stock = ?, stock_critico = ?, codigo_barras = ?, categoria = ?, fecha_vencimiento = ?,
+                    codigo_norm = ?
+                WHERE id = ?
+            ''', (nombre, precio, stock, stock_critico, codigo_barras, categoria, fecha_vencimiento, codigo_norm, product_id))
+            if codigos_alternativos is not None:
+                self._replace_barcode_aliases(cursor, product_id, codigos_alternativos)
+            aliases = self._read_barcode_aliases(cursor, product_id)
+        self._refresh_catalog([product_id])
+        if self.catalog.loaded:
+            self.catalog.set_aliases(product_id, [norm for norm, _ in aliases])
+
+    # --- CODIGOS DE BARRAS ---
+    def resolve_barcode(self, codigo_barras):
+        """
+        Ruta rápida del escáner: código principal o alternativo -> Producto listo para el
+        carrito (el `info` de cada línea), con el stock de promociones ya resuelto.
+        Solo diccionarios en memoria, sin SQL.
+        """
+        return self._get_catalog().get_by_barcode(codigo_barras)
+
+    def get_barcode_aliases(self, product_id):
+        """Códigos alternativos de un producto, tal como se ingresaron."""
+        with self.db.read() as cursor:
+            return [codigo for _, codigo in self._read_barcode_aliases(cursor, product_id)]
+
+    def set_barcode_aliases(self, product_id, codigos):
+        """Reemplaza los códigos alternativos de un producto. Retorna los que quedaron guardados."""
+        with self.db.transaction() as cursor:
+            self._replace_barcode_aliases(cursor, product_id, codigos)
+            aliases = self._read_barcode_aliases(cursor, product_id)
+        if self.catalog.loaded:
+            self.catalog.set_aliases(product_id, [norm for norm, _ in aliases])
+        return [codigo for _, codigo in aliases]
+
+    @staticmethod
+    def _read_barcode_aliases(cursor, product_id):
+        cursor.execute("SELECT codigo_norm, codigo FROM producto_codigos WHERE producto_id = ? ORDER BY rowid",
+                       (product_id,))
+        return cursor.fetchall()
+
+    def _replace_barcode_aliases(self, cursor, product_id, codigos):
+        cursor.execute("DELETE FROM producto_codigos WHERE producto_id = ?", (product_id,))
+        cursor.execute("SELECT codigo_norm FROM productos WHERE id = ?", (product_id,))
+        row = cursor.fetchone()
+        vistos = {row[0]} if row else set()
+        for codigo in codigos:
+            norm = normalize_barcode(codigo)
+            if norm is None or norm in vistos:
+                continue # Vacío, repetido o igual al código principal
+            vistos.add(norm)
+            self._check_barcode_free(cursor, codigo, product_id)
+            cursor.execute("INSERT INTO producto_codigos (codigo_norm, codigo, producto_id) VALUES (?, ?, ?)",
+                           (norm, str(codigo).strip(), product_id))
+
+    @staticmethod
+    def _check_barcode_free(cursor, codigo_barras, product_id=None):
+        """Un código (principal o alternativo) identifica a un solo producto."""
+        norm = normalize_barcode(codigo_barras)
+        if norm is None:
+            return
         cursor.execute('''
-            UPDATE productos 
-            SET nombre = ?, precio = ?, stock = ?, stock_critico = ?, codigo_barras = ?, categoria = ?, fecha_vencimiento = ?
-            WHERE id = ?
-        ''', (nombre, precio, stock, stock_critico, codigo_barras, categoria, fecha_vencimiento, product_id))
-        conn.commit()
-        conn.close()
+            SELECT id, nombre FROM productos WHERE codigo_norm = ?
+            UNION ALL
+            SELECT p.id, p.nombre FROM producto_codigos c JOIN productos p ON p.id = c.producto_id
+            WHERE c.codigo_norm = ?
+        ''', (norm, norm))
+        for pid, nombre in cursor.fetchall():
+            if pid != product_id:
+                raise Exception(f"El código '{str(codigo_barras).strip()}' ya está asignado a '{nombre}'.")
 
     def get_expiring_products(self, days_threshold=7):
-        self._ensure_expiration_column()
         import datetime
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        today = datetime.date.today().isoformat()
+
         future_limit = (datetime.date.today() + datetime.timedelta(days=days_threshold)).isoformat()
-        
-        # Buscar productos vencidos y por vencer (<= today + 7)
-        cursor.execute('''
-            SELECT * FROM productos 
-            WHERE fecha_vencimiento IS NOT NULL 
-            AND fecha_vencimiento != ''
-            AND fecha_vencimiento <= ?
-        ''', (future_limit,))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        return rows
+        # Vencidos y por vencer (<= hoy + 7), resuelto en el catálogo en memoria
+        return self._get_catalog().expiring(future_limit)
 
     def delete_product(self, product_id):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM productos WHERE id = ?", (product_id,))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as cursor:
+            cursor.execute("DELETE FROM producto_codigos WHERE producto_id = ?", (product_id,))
+            cursor.execute("DELETE FROM productos WHERE id = ?", (product_id,))
+        self._refresh_catalog([product_id])
 
     def increase_stock_by_name(self, nombre, cantidad):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("UPDATE productos SET stock = stock + ? WHERE nombre = ?", (cantidad, nombre))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as cursor:
+            cursor.execute("UPDATE productos SET stock = stock + ? WHERE nombre = ?", (cantidad, nombre))
+            cursor.execute("SELECT id FROM productos WHERE nombre = ?", (nombre,))
+            ids = [row[0] for row in cursor.fetchall()]
+        self._refresh_catalog(ids)
 
     def increase_stock_by_id(self, product_id, cantidad):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("UPDATE productos SET stock = stock + ? WHERE id = ?", (cantidad, product_id))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as cursor:
+            cursor.execute("UPDATE productos SET stock = stock + ? WHERE id = ?", (cantidad, product_id))
+        self._refresh_catalog([product_id])
 
     def update_stock(self, product_id, quantity):
         """Metodo alias para actualizar stock desde UI"""
         self.increase_stock_by_id(product_id, quantity)
 
     def decrease_stock(self, product_id, quantity=1):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("UPDATE productos SET stock = stock - ? WHERE id = ?", (quantity, product_id))
-        conn.commit()
-        conn.close()
-    
+        with self.db.transaction() as cursor:
+            cursor.execute("UPDATE productos SET stock = stock - ? WHERE id = ?", (quantity, product_id))
+        self._refresh_catalog([product_id])
+
     def get_product_by_barcode(self, codigo_barras):
         """Buscar producto por código de barras (búsqueda exacta, case-insensitive)"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM productos WHERE LOWER(codigo_barras) = LOWER(?) AND codigo_barras IS NOT NULL", 
-                       (codigo_barras,))
-        res = cursor.fetchone()
-        
-        # Si es promo, calcular stock
-        if res:
-            p_cat = "General"
-            if len(res) >= 7: p_cat = res[6]
-            
-            if p_cat == "Promociones":
-                cursor.execute("SELECT producto_id, cantidad FROM promocion_items WHERE promocion_id = ?", (res[0],))
-                comps = cursor.fetchall()
-                real_stock = 0
-                if comps:
-                    possible_stocks = []
-                    for c_pid, c_qty in comps:
-                        cursor.execute("SELECT stock FROM productos WHERE id = ?", (c_pid,))
-                        c_res = cursor.fetchone()
-                        c_stock = c_res[0] if c_res else 0
-                        possible_stocks.append(c_stock // c_qty)
-                    real_stock = min(possible_stocks) if possible_stocks else 0
-                
-                p_list = list(res)
-                p_list[3] = real_stock
-                res = tuple(p_list)
-
-        conn.close()
-        return res
+        # Si es promo, el stock ya viene calculado por componentes
+        return self.resolve_barcode(codigo_barras)
 
     # ==========================================
     # LOGICA DE PROMOCIONES
@@ -608,9 +894,7 @@ class InventarioModel:
         Crea una promoción (Producto ficticio) y sus items.
         componentes: lista de tuplas (producto_id, cantidad)
         """
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        try:
+        with self.db.transaction() as cursor:
             # 1. Crear producto tipo "Promoción"
             # Stock ficticio 0, pero no importa porque no se descuenta.
             # Se puede usar stock para limitar la promo, pero por ahora ilimitado (controlado por componentes)
@@ -619,227 +903,192 @@ class InventarioModel:
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (nombre, precio, 0, 0, None, "Promociones"))
             promo_id = cursor.lastrowid
-            
+
             # 2. Insertar componentes
-            for pid, qty in componentes:
-                cursor.execute('''
-                    INSERT INTO promocion_items (promocion_id, producto_id, cantidad)
-                    VALUES (?, ?, ?)
-                ''', (promo_id, pid, qty))
-            
-            conn.commit()
-            return promo_id
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+            cursor.executemany('''
+                INSERT INTO promocion_items (promocion_id, producto_id, cantidad)
+                VALUES (?, ?, ?)
+            ''', [(promo_id, pid, qty) for pid, qty in componentes])
+
+        if self.catalog.loaded:
+            self.catalog.set_promo_items(promo_id, componentes)
+        self._refresh_catalog([promo_id])
+        return promo_id
 
     def get_promotion_items(self, promo_id):
         """Retorna componentes de una promo: [(prod_id, cant_requerida)]"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("SELECT producto_id, cantidad FROM promocion_items WHERE promocion_id = ?", (promo_id,))
-        res = cursor.fetchall()
-        conn.close()
-        return res
+        with self.db.read() as cursor:
+            cursor.execute("SELECT producto_id, cantidad FROM promocion_items WHERE promocion_id = ?", (promo_id,))
+            return cursor.fetchall()
 
     # ==========================================
     # NUEVOS METODOS (VENTAS Y GASTOS)
     # ==========================================
-    
-    def register_sale(self, items, medio_pago='EFECTIVO', discount_percent=0):
+
+    def register_sale(self, items, medio_pago='EFECTIVO', discount_percent=0, cliente_id=None):
         """
         Registra una venta completa con sus detalles.
-        items: lista de tuplas/objetos (producto_id, cantidad, precio_unitario)
+        items: CartSnapshot del POS (ver app/data/cart.py), o el dict
+               {producto_id: {'info': tupla_producto, 'qty': cantidad}}
         medio_pago: EFECTIVO, TRANSFERENCIA, DEBITO, CREDITO, DEUDA
-        discount_percent: Porcentaje de descuento (0-100)
+        discount_percent: Porcentaje de descuento (0-100); con un snapshot se usa el suyo
+        cliente_id: si medio_pago es DEUDA, se registra el fiado en la misma transacción
+
+        Todo ocurre en un solo BEGIN IMMEDIATE: validación de stock de todo el carrito
+        (expandiendo promociones) en una consulta, cabecera, detalles, descuentos de stock
+        con executemany y el movimiento de cuenta. Si algo falla, no queda nada a medias.
         """
         import datetime
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        try:
-            # Calcular total bruto
-            subtotal_venta = sum(item['qty'] * item['info'][2] for item in items.values())
-            
-            # Aplicar Descuento
-            descuento_monto = subtotal_venta * (discount_percent / 100.0)
-            total_venta = subtotal_venta - descuento_monto
-            
-            fecha_actual = datetime.datetime.now().isoformat()
-            
-            # 1. Crear cabecera de venta
-            cursor.execute("INSERT INTO ventas (fecha, total, medio_pago, descuento) VALUES (?, ?, ?, ?)", 
+
+        venta = as_snapshot(items, discount_percent)
+        lineas = [(l.product_id, l.qty, l.info[2]) for l in venta.lines]
+        if not lineas:
+            raise Exception("El carrito está vacío")
+
+        # Totales ya calculados por el carrito (los mismos que vio el cajero)
+        discount_percent = venta.discount_percent
+        total_venta = venta.total
+
+        fecha_actual = datetime.datetime.now().isoformat()
+
+        with self.db.transaction(immediate=True) as cursor:
+            # 1. Validar stock de todo el carrito en una consulta.
+            # Las promos se expanden a sus componentes; un mismo producto vendido suelto
+            # y dentro de una promo se suma antes de comparar contra el stock.
+            valores = ",".join("(?, ?)" for _ in lineas)
+            params = [v for pid, qty, _ in lineas for v in (pid, qty)]
+            cursor.execute(f'''
+                WITH carrito(producto_id, cantidad) AS (VALUES {valores}),
+                requerido AS (
+                    SELECT COALESCE(pi.producto_id, c.producto_id) AS producto_id,
+                           SUM(c.cantidad * COALESCE(pi.cantidad, 1)) AS cantidad,
+                           MAX(pi.promocion_id IS NOT NULL) AS es_componente
+                    FROM carrito c
+                    LEFT JOIN promocion_items pi ON pi.promocion_id = c.producto_id
+                    GROUP BY 1
+                )
+                SELECT r.producto_id, r.cantidad, p.stock, p.nombre, r.es_componente
+                FROM requerido r
+                LEFT JOIN productos p ON p.id = r.producto_id
+            ''', params)
+            requerido = cursor.fetchall()
+
+            for pid, cantidad, stock, nombre, es_componente in requerido:
+                if stock is None:
+                    if es_componente:
+                        raise Exception(f"Componente ID {pid} no existe")
+                    raise Exception(f"Producto ID {pid} no existe")
+                if stock < cantidad:
+                    if es_componente:
+                        raise Exception(f"Stock insuficiente de componente '{nombre}' para la promoción.")
+                    raise Exception(f"Stock insuficiente para {nombre}. Stock actual: {stock}")
+
+            # 2. Crear cabecera de venta
+            cursor.execute("INSERT INTO ventas (fecha, total, medio_pago, descuento) VALUES (?, ?, ?, ?)",
                            (fecha_actual, total_venta, medio_pago, discount_percent))
             venta_id = cursor.lastrowid
-            
-            # 2. Insertar detalles y descontar stock
-            for pid, item in items.items():
-                cantidad_venta = item['qty']
-                precio_unit = item['info'][2]
-                subtotal = cantidad_venta * precio_unit
-                
-                # Insertar detalle de venta (lo que el cliente ve)
-                cursor.execute('''
-                    INSERT INTO detalle_ventas (venta_id, producto_id, cantidad, precio_unitario, subtotal)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (venta_id, pid, cantidad_venta, precio_unit, subtotal))
 
-                # --- LOGICA DE STOCK (Normal vs Promoción) ---
-                
-                # Chequear si es promo
-                cursor.execute("SELECT producto_id, cantidad FROM promocion_items WHERE promocion_id = ?", (pid,))
-                promo_components = cursor.fetchall()
-                
-                if promo_components:
-                    # ES UNA PROMO: Descontar stock de sus componentes
-                    for comp_pid, comp_qty in promo_components:
-                        total_deduct = comp_qty * cantidad_venta
-                        
-                        # Verificar Stock Componente
-                        cursor.execute("SELECT stock, nombre FROM productos WHERE id = ?", (comp_pid,))
-                        curr = cursor.fetchone()
-                        if not curr:
-                            raise Exception(f"Componente ID {comp_pid} no existe")
-                        
-                        c_stock, c_name = curr
-                        if c_stock < total_deduct:
-                             raise Exception(f"Stock insuficiente de componente '{c_name}' para la promoción.")
-                             
-                        cursor.execute("UPDATE productos SET stock = stock - ? WHERE id = ?", (total_deduct, comp_pid))
-                
-                else:
-                    # PRODUCTO NORMAL
-                    cursor.execute("SELECT stock, nombre FROM productos WHERE id = ?", (pid,))
-                    curr = cursor.fetchone()
-                    if not curr:
-                        raise Exception(f"Producto ID {pid} no existe")
-                    
-                    current_stock, prod_name = curr
-                    
-                    # Ignoramos stock check si es solo 'Promociones' category sin components? 
-                    # No, debería tener componentes si es promo. Si no tiene, se comporta como normal.
-                    
-                    if current_stock < cantidad_venta:
-                        raise Exception(f"Stock insuficiente para {prod_name}. Stock actual: {current_stock}")
-                    
-                    cursor.execute("UPDATE productos SET stock = stock - ? WHERE id = ?", (cantidad_venta, pid))
-            
-            conn.commit()
-            return venta_id
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+            # 3. Insertar detalles (lo que el cliente ve)
+            cursor.executemany('''
+                INSERT INTO detalle_ventas (venta_id, producto_id, cantidad, precio_unitario, subtotal)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [(venta_id, pid, qty, precio, qty * precio) for pid, qty, precio in lineas])
+
+            # 4. Descontar stock (productos normales y componentes de promos).
+            # El WHERE stock >= ? es un resguardo: si alguna fila no se actualiza, se revierte todo.
+            cursor.executemany(
+                "UPDATE productos SET stock = stock - ? WHERE id = ? AND stock >= ?",
+                [(cantidad, pid, cantidad) for pid, cantidad, _, _, _ in requerido]
+            )
+            if cursor.rowcount != len(requerido):
+                raise Exception("Stock insuficiente: el inventario cambió durante la venta.")
+
+            # Resúmenes diarios (venta por medio de pago y unidades por producto)
+            self._bump_daily(cursor, fecha_actual, medio_pago, ventas_total=total_venta, ventas_n=1)
+            self._bump_products_daily(cursor, fecha_actual, [(pid, qty, qty * precio) for pid, qty, precio in lineas])
+
+            # 5. Fiado: el movimiento de deuda queda en la misma transacción que la venta
+            if medio_pago == 'DEUDA' and cliente_id:
+                self.add_movement(cliente_id, 'DEUDA', total_venta, f"Compra #{venta_id} (Fiado)", venta_id)
+
+        self._refresh_catalog(r[0] for r in requerido)
+        return venta_id
 
     def add_expense(self, descripcion, monto, categoria="General"):
         import datetime
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        try:
-            fecha_actual = datetime.datetime.now().isoformat()
+        fecha_actual = datetime.datetime.now().isoformat()
+        with self.db.transaction() as cursor:
             cursor.execute("INSERT INTO gastos (descripcion, monto, fecha, categoria) VALUES (?, ?, ?, ?)",
                            (descripcion, monto, fecha_actual, categoria))
-            conn.commit()
-            return True
-        finally:
-            conn.close()
+            self._bump_daily(cursor, fecha_actual, None, gastos_total=monto, gastos_n=1)
+        return True
 
     def get_sales_report(self):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM ventas WHERE estado = 'Completada' ORDER BY fecha DESC")
-        res = cursor.fetchall()
-        conn.close()
-        return res
+        with self.db.read() as cursor:
+            cursor.execute("SELECT * FROM ventas WHERE estado = 'Completada' ORDER BY fecha DESC")
+            return cursor.fetchall()
 
     def get_expenses_report(self):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM gastos ORDER BY fecha DESC")
-        res = cursor.fetchall()
-        conn.close()
-        return res
+        with self.db.read() as cursor:
+            cursor.execute("SELECT * FROM gastos ORDER BY fecha DESC")
+            return cursor.fetchall()
 
     def get_payments_report(self):
         """Retorna todos los movimientos de tipo PAGO (Abonos) con nombre de cliente"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        # Incluir c.nombre al final
-        cursor.execute('''
-            SELECT m.*, c.nombre 
-            FROM movimientos_cuenta m
-            JOIN clientes c ON m.cliente_id = c.id
-            WHERE m.tipo='PAGO' 
-            ORDER BY m.fecha DESC
-        ''')
-        res = cursor.fetchall()
-        conn.close()
-        return res
+        with self.db.read() as cursor:
+            # Incluir c.nombre al final
+            cursor.execute('''
+                SELECT m.*, c.nombre
+                FROM movimientos_cuenta m
+                JOIN clientes c ON m.cliente_id = c.id
+                WHERE m.tipo='PAGO'
+                ORDER BY m.fecha DESC
+            ''')
+            return cursor.fetchall()
 
     # ==========================================
     # METODOS CUADERNO DIGITAL (CLIENTES/DEUDAS)
     # ==========================================
 
     def add_client(self, nombre, telefono="", alias="", limite_credito=0):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        try:
+        with self.db.transaction() as cursor:
             cursor.execute("INSERT INTO clientes (nombre, telefono, alias, limite_credito) VALUES (?, ?, ?, ?)",
                            (nombre, telefono, alias, limite_credito))
-            conn.commit()
             return cursor.lastrowid
-        finally:
-            conn.close()
 
     def update_client(self, client_id, nombre, telefono, alias, limite_credito):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        try:
+        with self.db.transaction() as cursor:
             cursor.execute('''
-                UPDATE clientes 
+                UPDATE clientes
                 SET nombre = ?, telefono = ?, alias = ?, limite_credito = ?
                 WHERE id = ?
             ''', (nombre, telefono, alias, limite_credito, client_id))
-            conn.commit()
-        finally:
-            conn.close()
 
     def delete_client(self, client_id):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        try:
+        with self.db.transaction() as cursor:
+            # Sacar de los resúmenes los fiados/abonos que se van a borrar
+            cursor.execute("""
+                SELECT fecha, tipo, monto, medio_pago FROM movimientos_cuenta
+                WHERE cliente_id = ? AND COALESCE(estado, 'Completada') = 'Completada'
+            """, (client_id,))
+            for fecha, tipo, monto, medio_pago in cursor.fetchall():
+                self._rollup_movement(cursor, fecha, tipo, -monto, medio_pago)
             # Eliminar movimientos asociados primero (si no hay CASCADE)
             cursor.execute("DELETE FROM movimientos_cuenta WHERE cliente_id = ?", (client_id,))
             cursor.execute("DELETE FROM clientes WHERE id = ?", (client_id,))
-            conn.commit()
-        finally:
-            conn.close()
 
     def get_clients_with_balance(self):
-        """Retorna lista de clientes con su saldo calculado (Deuda - Pagos)"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        # Consulta optimizada: Clientes con saldo
-        query = '''
-            SELECT 
-                c.id, c.nombre, c.telefono, c.alias, c.limite_credito,
-                COALESCE(SUM(CASE WHEN m.tipo = 'DEUDA' AND COALESCE(m.estado, 'Completada') = 'Completada' THEN m.monto ELSE 0 END), 0) as total_deuda,
-                COALESCE(SUM(CASE WHEN m.tipo = 'PAGO' AND COALESCE(m.estado, 'Completada') = 'Completada' THEN m.monto ELSE 0 END), 0) as total_pagado
-            FROM clientes c
-            LEFT JOIN movimientos_cuenta m ON c.id = m.cliente_id
-            GROUP BY c.id
-            ORDER BY c.nombre
-        '''
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        
+        """Retorna lista de clientes con su saldo (Deuda - Pagos), mantenido en la tabla clientes"""
+        with self.db.read() as cursor:
+            cursor.execute('''
+                SELECT id, nombre, telefono, alias, limite_credito, deuda_total, pagado_total, saldo
+                FROM clientes
+                ORDER BY nombre
+            ''')
+            rows = cursor.fetchall()
+
         clients = []
         for r in rows:
-            balance = r[5] - r[6] # Deuda - Pagado
             clients.append({
                 "id": r[0],
                 "nombre": r[1],
@@ -848,79 +1097,142 @@ class InventarioModel:
                 "limite": r[4],
                 "deuda_total": r[5],
                 "pagado_total": r[6],
-                "saldo_actual": balance
+                "saldo_actual": r[7]
             })
-            
-        conn.close()
+
         return clients
 
+    # --- Saldos mantenidos ---
+    # clientes.deuda_total / pagado_total / saldo se actualizan en la misma transacción
+    # que cada movimiento (add_movement, register_sale vía add_movement, anular_venta).
+    # delete_client borra la fila del cliente junto con sus movimientos, así que no hay
+    # nada que ajustar. verify_client_balances() los compara contra el libro de movimientos.
+
+    @staticmethod
+    def _apply_client_balance(cursor, cliente_id, tipo, monto):
+        """Suma `monto` (negativo para revertir) a los totales del cliente según el tipo de movimiento."""
+        deuda = monto if tipo == 'DEUDA' else 0
+        pago = monto if tipo == 'PAGO' else 0
+        cursor.execute('''
+            UPDATE clientes
+            SET deuda_total = deuda_total + ?, pagado_total = pagado_total + ?, saldo = saldo + ? - ?
+            WHERE id = ?
+        ''', (deuda, pago, deuda, pago, cliente_id))
+
+    def _rebuild_client_balances(self, cursor):
+        cursor.execute('''
+            UPDATE clientes SET
+                deuda_total = COALESCE((SELECT SUM(m.monto) FROM movimientos_cuenta m
+                                        WHERE m.cliente_id = clientes.id AND m.tipo = 'DEUDA'
+                                          AND COALESCE(m.estado, 'Completada') = 'Completada'), 0),
+                pagado_total = COALESCE((SELECT SUM(m.monto) FROM movimientos_cuenta m
+                                         WHERE m.cliente_id = clientes.id AND m.tipo = 'PAGO'
+                                           AND COALESCE(m.estado, 'Completada') = 'Completada'), 0)
+        ''')
+        cursor.execute("UPDATE clientes SET saldo = deuda_total - pagado_total")
+
+    def verify_client_balances(self, repair=False, tolerance=0.005):
+        """
+        Compara los saldos guardados con los recalculados desde movimientos_cuenta.
+        Retorna la lista de diferencias:
+        [{'id', 'nombre', 'saldo_guardado', 'saldo_real', 'diferencia'}, ...]
+        Con repair=True además reconstruye todos los saldos desde el libro.
+        """
+        with self.db.transaction(immediate=repair) as cursor:
+            cursor.execute(CLIENT_LEDGER_BALANCES)
+            drift = []
+            for cid, nombre, deuda, pagado, saldo, deuda_real, pagado_real in cursor.fetchall():
+                saldo_real = deuda_real - pagado_real
+                if (abs(deuda - deuda_real) > tolerance or abs(pagado - pagado_real) > tolerance
+                        or abs(saldo - saldo_real) > tolerance):
+                    drift.append({
+                        "id": cid,
+                        "nombre": nombre,
+                        "saldo_guardado": saldo,
+                        "saldo_real": saldo_real,
+                        "diferencia": saldo - saldo_real,
+                    })
+            if repair and drift:
+                self._rebuild_client_balances(cursor)
+        return drift
+
     def get_client_movements(self, cliente_id):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM movimientos_cuenta WHERE cliente_id = ? ORDER BY fecha DESC", (cliente_id,))
-        res = cursor.fetchall()
-        conn.close()
-        return res
+        with self.db.read() as cursor:
+            cursor.execute("SELECT * FROM movimientos_cuenta WHERE cliente_id = ? ORDER BY fecha DESC", (cliente_id,))
+            return cursor.fetchall()
 
     def add_movement(self, cliente_id, tipo, monto, descripcion, venta_id=None, medio_pago=None):
         import datetime
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        try:
-            fecha_actual = datetime.datetime.now().isoformat()
+        fecha_actual = datetime.datetime.now().isoformat()
+        with self.db.transaction() as cursor:
             cursor.execute('''
                 INSERT INTO movimientos_cuenta (cliente_id, fecha, tipo, monto, descripcion, venta_id, medio_pago)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
             ''', (cliente_id, fecha_actual, tipo, monto, descripcion, venta_id, medio_pago))
-            conn.commit()
-            return True
-        finally:
-            conn.close()
+            self._apply_client_balance(cursor, cliente_id, tipo, monto)
+            self._rollup_movement(cursor, fecha_actual, tipo, monto, medio_pago)
+        return True
 
     # ==========================================
     # METODOS CONTROL DE TURNOS
     # ==========================================
-    
+
     def get_active_turno(self):
         """Devuelve el turno activo (fecha_fin IS NULL) o None"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM turnos WHERE fecha_fin IS NULL ORDER BY id DESC LIMIT 1")
-        res = cursor.fetchone()
-        conn.close()
-        return res
+        with self.db.read() as cursor:
+            cursor.execute("SELECT * FROM turnos WHERE fecha_fin IS NULL ORDER BY id DESC LIMIT 1")
+            return cursor.fetchone()
 
     def iniciar_turno(self, monto_inicial, usuario="Admin"):
         import datetime
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        try:
-            fecha_inicio = datetime.datetime.now().isoformat()
+        fecha_inicio = datetime.datetime.now().isoformat()
+        with self.db.transaction() as cursor:
             cursor.execute('''
                 INSERT INTO turnos (fecha_inicio, monto_inicial, usuario)
                 VALUES (?, ?, ?)
             ''', (fecha_inicio, monto_inicial, usuario))
-            conn.commit()
             return cursor.lastrowid
-        finally:
-            conn.close()
 
     def cerrar_turno(self, monto_final):
         import datetime
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        try:
-            fecha_fin = datetime.datetime.now().isoformat()
+        fecha_fin = datetime.datetime.now().isoformat()
+        with self.db.transaction() as cursor:
             # Cerrar el último turno abierto
             cursor.execute('''
-                UPDATE turnos 
-                SET fecha_fin = ?, monto_final = ? 
+                UPDATE turnos
+                SET fecha_fin = ?, monto_final = ?
                 WHERE fecha_fin IS NULL
             ''', (fecha_fin, monto_final))
-            conn.commit()
-        finally:
-            conn.close()
-    
+
+    def get_shift_close_summary(self):
+        """
+        Todo lo que necesita el diálogo de cierre de caja en un solo paso:
+        turno activo + métricas del turno (una consulta).
+        Retorna None si no hay turno activo; si no, el dict de get_current_shift_stats()
+        más 'desglose' (el de obtener_desglose_ventas_turno()).
+        """
+        with self.db.read() as cursor:
+            cursor.execute("SELECT * FROM turnos WHERE fecha_fin IS NULL ORDER BY id DESC LIMIT 1")
+            turno = cursor.fetchone()
+            if not turno:
+                return None
+            m = self._compute_metrics(cursor, turno[1])
+
+        # turno: (id, fecha_inicio, fecha_fin, monto_inicial, monto_final, usuario)
+        t_id, t_inicio, _, t_inicial, _, t_usuario = turno
+        return {
+            "turno_id": t_id,
+            "usuario": t_usuario,
+            "inicio": t_inicio,
+            "monto_inicial": t_inicial,
+            "ventas_turno": m["ventas_efectivo"],
+            "abonos_turno": m["abonos_efectivo"],
+            "gastos_turno": m["total_gastos"],
+            # Teorico = Inicial + Ventas en efectivo + Abonos en efectivo - Gastos
+            "teorico_en_caja": t_inicial + m["caja_neta"],
+            "desglose": {"ventas": m["ventas"], "pagos_deuda": m["pagos_deuda"]},
+        }
+
     def obtener_desglose_ventas_turno(self):
         """
         Obtiene el desglose de ventas del turno actual agrupado por método de pago.
@@ -943,197 +1255,262 @@ class InventarioModel:
                 }
             }
         """
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        try:
-            # Obtener fecha de inicio del turno actual
-            cursor.execute('''
-                SELECT fecha_inicio 
-                FROM turnos 
-                WHERE fecha_fin IS NULL 
-                ORDER BY id DESC 
-                LIMIT 1
-            ''')
-            turno = cursor.fetchone()
-            
-            if not turno:
-                return {'ventas': {}, 'pagos_deuda': {}}
-            
-            fecha_inicio = turno[0]
-            
-            # Obtener desglose de VENTAS (sin agrupar DEBITO y CREDITO)
-            cursor.execute('''
-                SELECT 
-                    COALESCE(medio_pago, 'EFECTIVO') as metodo,
-                    COUNT(*) as cantidad,
-                    SUM(total) as total_vendido
-                FROM ventas
-                WHERE fecha >= ? AND estado = 'Completada'
-                GROUP BY metodo
-            ''', (fecha_inicio,))
-            
-            ventas_resultados = cursor.fetchall()
-            
-            # Obtener desglose de PAGOS DE DEUDA
-            cursor.execute('''
-                SELECT 
-                    COALESCE(medio_pago, 'EFECTIVO') as metodo,
-                    COUNT(*) as cantidad,
-                    SUM(monto) as total_pagado
-                FROM movimientos_cuenta
-                WHERE tipo = 'PAGO' 
-                  AND fecha >= ?
-                  AND medio_pago IS NOT NULL
-                  AND estado = 'Completada'
-                GROUP BY metodo
-            ''', (fecha_inicio,))
-            
-            pagos_resultados = cursor.fetchall()
-            
-            # Convertir a diccionarios
-            desglose_ventas = {}
-            for metodo, cantidad, total in ventas_resultados:
-                desglose_ventas[metodo] = {
-                    'cantidad': cantidad,
-                    'total': total if total else 0.0
-                }
-            
-            desglose_pagos = {}
-            for metodo, cantidad, total in pagos_resultados:
-                desglose_pagos[metodo] = {
-                    'cantidad': cantidad,
-                    'total': total if total else 0.0
-                }
-            
-            return {
-                'ventas': desglose_ventas,
-                'pagos_deuda': desglose_pagos
-            }
-            
-        finally:
-            conn.close()
+        summary = self.get_shift_close_summary()
+        if not summary:
+            return {'ventas': {}, 'pagos_deuda': {}}
+        return summary["desglose"]
 
     def get_current_shift_stats(self):
         """Calcula el estado actual de la caja según el turno activo"""
+        summary = self.get_shift_close_summary()
+        if not summary:
+            return None
+        summary.pop("desglose")
+        return summary
+
+    def get_shift_activity(self, limit=50):
+        """
+        Actividad del turno activo (ventas, abonos y gastos) ya mezclada, ordenada
+        por fecha DESC y limitada en SQL, más sus agregados. Cada rama del UNION usa
+        su índice por fecha y lee a lo sumo `limit` filas: el costo no crece con el historial.
+
+        Retorna None si no hay turno activo, o:
+        {
+            'turno': tupla del turno,
+            'total_ventas': float, 'total_abonos': float, 'total_gastos': float,
+            'n_ventas': int, 'n_abonos': int,
+            'actividad': [{'type': 'VENTA'|'ABONO'|'GASTO', 'id', 'date', 'amount', 'description'}]
+        }
+        """
         turno = self.get_active_turno()
         if not turno:
             return None
-            
-        # turno: (id, fecha_inicio, fecha_fin, monto_inicial, monto_final, usuario)
-        t_id, t_inicio, _, t_inicial, _, t_usuario = turno
-        
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        # 1. Sumar ventas EN EFECTIVO DESDE el inicio del turno
-        # Solo contamos efectivo para el teórico en caja física
-        cursor.execute("SELECT SUM(total) FROM ventas WHERE fecha >= ? AND COALESCE(medio_pago, 'EFECTIVO') = 'EFECTIVO' AND estado = 'Completada'", (t_inicio,))
-        res = cursor.fetchone()
-        ventas_total = res[0] if res[0] else 0
-        
-        # 2. Sumar ABONOS (Pagos) EN EFECTIVO DESDE el inicio del turno
-        # Solo contamos pagos recibidos en efectivo
-        cursor.execute("SELECT SUM(monto) FROM movimientos_cuenta WHERE tipo='PAGO' AND fecha >= ? AND COALESCE(medio_pago, 'EFECTIVO') = 'EFECTIVO'", (t_inicio,))
-        res = cursor.fetchone()
-        abonos_total = res[0] if res[0] else 0
-        
-        # 3. Sumar GASTOS (Salidas) DESDE el inicio del turno
-        # Para que el teorico en caja sea REAL (Entradas - Salidas)
-        cursor.execute("SELECT SUM(monto) FROM gastos WHERE fecha >= ?", (t_inicio,))
-        res = cursor.fetchone()
-        gastos_total = res[0] if res[0] else 0
-        
-        conn.close()
-        
-        # Teorico = Inicial + Ventas + Abonos - Gastos
-        teorico = t_inicial + ventas_total + abonos_total - gastos_total
-        
+        t_inicio = turno[1]
+
+        with self.db.read() as cursor:
+            cursor.execute('''
+                SELECT
+                    (SELECT COUNT(*) FROM ventas WHERE estado = 'Completada' AND fecha >= :inicio),
+                    (SELECT COALESCE(SUM(total), 0) FROM ventas WHERE estado = 'Completada' AND fecha >= :inicio),
+                    (SELECT COUNT(*) FROM movimientos_cuenta WHERE tipo = 'PAGO' AND fecha >= :inicio),
+                    (SELECT COALESCE(SUM(monto), 0) FROM movimientos_cuenta WHERE tipo = 'PAGO' AND fecha >= :inicio),
+                    (SELECT COALESCE(SUM(monto), 0) FROM gastos WHERE fecha >= :inicio)
+            ''', {"inicio": t_inicio})
+            n_ventas, total_ventas, n_abonos, total_abonos, total_gastos = cursor.fetchone()
+
+            cursor.execute('''
+                SELECT tipo, id, fecha, monto, descripcion FROM (
+                    SELECT * FROM (
+                        SELECT 'VENTA' AS tipo, id, fecha, total AS monto, '' AS descripcion
+                        FROM ventas WHERE estado = 'Completada' AND fecha >= :inicio
+                        ORDER BY fecha DESC LIMIT :limite)
+                    UNION ALL
+                    SELECT * FROM (
+                        SELECT 'ABONO', id, fecha, monto, COALESCE(descripcion, '')
+                        FROM movimientos_cuenta WHERE tipo = 'PAGO' AND fecha >= :inicio
+                        ORDER BY fecha DESC LIMIT :limite)
+                    UNION ALL
+                    SELECT * FROM (
+                        SELECT 'GASTO', id, fecha, monto, descripcion
+                        FROM gastos WHERE fecha >= :inicio
+                        ORDER BY fecha DESC LIMIT :limite)
+                )
+                ORDER BY fecha DESC
+                LIMIT :limite
+            ''', {"inicio": t_inicio, "limite": limit})
+            rows = cursor.fetchall()
+
         return {
-            "turno_id": t_id,
-            "usuario": t_usuario,
-            "inicio": t_inicio,
-            "monto_inicial": t_inicial,
-            "ventas_turno": ventas_total,
-            "abonos_turno": abonos_total,
-            "gastos_turno": gastos_total,
-            "teorico_en_caja": teorico
+            "turno": turno,
+            "total_ventas": total_ventas,
+            "total_abonos": total_abonos,
+            "total_gastos": total_gastos,
+            "n_ventas": n_ventas,
+            "n_abonos": n_abonos,
+            "actividad": [
+                {"type": r[0], "id": r[1], "date": r[2], "amount": r[3], "description": r[4] or ""}
+                for r in rows
+            ],
+        }
+
+    # ==========================================
+    # RESUMENES DIARIOS (ROLLUPS)
+    # ==========================================
+    # Los días se toman de los primeros 10 caracteres de la fecha ISO (YYYY-MM-DD).
+    # Cada escritura suma (o resta, al anular/borrar) su aporte en la misma transacción.
+
+    @staticmethod
+    def _bump_daily(cursor, fecha, medio_pago, **deltas):
+        """Suma deltas (columnas de DAILY_ROLLUP_COLUMNS) a la fila (día, medio de pago)."""
+        columnas = [c for c in DAILY_ROLLUP_COLUMNS if c in deltas]
+        if len(columnas) != len(deltas):
+            raise ValueError(f"Columnas de resumen inválidas: {sorted(set(deltas) - set(columnas))}")
+        cursor.execute(f'''
+            INSERT INTO resumen_diario (dia, medio_pago, {", ".join(columnas)})
+            VALUES (substr(?, 1, 10), ?, {", ".join("?" * len(columnas))})
+            ON CONFLICT (dia, medio_pago) DO UPDATE SET
+                {", ".join(f"{c} = {c} + excluded.{c}" for c in columnas)}
+        ''', (fecha, medio_pago or '', *(deltas[c] for c in columnas)))
+
+    @staticmethod
+    def _bump_products_daily(cursor, fecha, lineas):
+        """lineas: [(producto_id, cantidad, subtotal)], con signo negativo para revertir."""
+        cursor.executemany('''
+            INSERT INTO resumen_producto_diario (dia, producto_id, cantidad, total)
+            VALUES (substr(?, 1, 10), ?, ?, ?)
+            ON CONFLICT (dia, producto_id) DO UPDATE SET
+                cantidad = cantidad + excluded.cantidad,
+                total = total + excluded.total
+        ''', [(fecha, pid, qty, total) for pid, qty, total in lineas])
+
+    def _rollup_movement(self, cursor, fecha, tipo, monto, medio_pago):
+        if tipo == 'DEUDA':
+            self._bump_daily(cursor, fecha, medio_pago, fiado_total=monto)
+        elif tipo == 'PAGO':
+            self._bump_daily(cursor, fecha, medio_pago, abonos_total=monto, abonos_n=1 if monto >= 0 else -1)
+
+    def _rebuild_rollups(self, cursor):
+        cursor.execute("DELETE FROM resumen_diario")
+        cursor.execute("DELETE FROM resumen_producto_diario")
+        cursor.execute('''
+            INSERT INTO resumen_diario (dia, medio_pago, ventas_total, ventas_n, fiado_total,
+                                        abonos_total, abonos_n, gastos_total, gastos_n)
+            SELECT dia, medio_pago, SUM(vt), SUM(vn), SUM(ft), SUM(at), SUM(an), SUM(gt), SUM(gn)
+            FROM (
+                SELECT substr(fecha, 1, 10) AS dia, COALESCE(medio_pago, '') AS medio_pago,
+                       total AS vt, 1 AS vn, 0 AS ft, 0 AS at, 0 AS an, 0 AS gt, 0 AS gn
+                FROM ventas WHERE estado = 'Completada'
+                UNION ALL
+                SELECT substr(fecha, 1, 10), COALESCE(medio_pago, ''), 0, 0, monto, 0, 0, 0, 0
+                FROM movimientos_cuenta
+                WHERE tipo = 'DEUDA' AND COALESCE(estado, 'Completada') = 'Completada'
+                UNION ALL
+                SELECT substr(fecha, 1, 10), COALESCE(medio_pago, ''), 0, 0, 0, monto, 1, 0, 0
+                FROM movimientos_cuenta
+                WHERE tipo = 'PAGO' AND COALESCE(estado, 'Completada') = 'Completada'
+                UNION ALL
+                SELECT substr(fecha, 1, 10), '', 0, 0, 0, 0, 0, monto, 1
+                FROM gastos
+            )
+            GROUP BY dia, medio_pago
+        ''')
+        cursor.execute('''
+            INSERT INTO resumen_producto_diario (dia, producto_id, cantidad, total)
+            SELECT substr(v.fecha, 1, 10), d.producto_id, SUM(d.cantidad), SUM(d.subtotal)
+            FROM detalle_ventas d
+            JOIN ventas v ON v.id = d.venta_id
+            WHERE v.estado = 'Completada'
+            GROUP BY 1, 2
+        ''')
+
+    def rebuild_rollups(self):
+        """Recalcula los resúmenes diarios desde las tablas de movimientos (backfill/reparación)."""
+        with self.db.transaction(immediate=True) as cursor:
+            self._rebuild_rollups(cursor)
+            cursor.execute("SELECT COUNT(*) FROM resumen_diario")
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def _whole_days(start_date, end_date):
+        """
+        Si el rango cubre días completos retorna (dia_inicio, dia_fin) para leer de los
+        resúmenes; si alguna punta tiene hora intermedia retorna None (hay que ir al detalle).
+        """
+        inicio = start_date[:10]
+        if start_date[10:] not in ("", "T00:00:00", "T00:00:00.000000"):
+            return None
+        fin = end_date[:10]
+        if end_date[10:] not in ("", "T23:59:59", "T23:59:59.999999"):
+            return None
+        return inicio, fin
+
+    def _compute_metrics(self, cursor, start_date, end_date=None):
+        """
+        Motor de métricas: todos los totales de una ventana en una sola consulta.
+        Si la ventana abarca días completos se lee de resumen_diario; si no, del detalle.
+        end_date=None significa "hasta ahora" (p.ej. un turno abierto).
+
+        Retorna dict con:
+        - ventas / pagos_deuda: {medio_pago: {'cantidad', 'total'}}
+        - total_ventas, n_ventas, total_gastos, n_gastos, total_fiado, total_abonos, n_abonos
+        - efectivo_ventas, flujo_entradas, flujo_neto, utilidad
+        - ventas_efectivo, abonos_efectivo, caja_neta (efectivo que entró menos gastos)
+        """
+        dias = self._whole_days(start_date, end_date) if end_date else None
+        if dias is not None:
+            cursor.execute(METRICS_ROLLUP_SQL, {"inicio": dias[0], "fin": dias[1]})
+        else:
+            if not end_date:
+                end_date = "9999-12-31T23:59:59"
+            elif len(end_date) == 10:
+                end_date += "T23:59:59"
+            cursor.execute(METRICS_DETAIL_SQL, {"inicio": start_date, "fin": end_date})
+
+        ventas, pagos = {}, {}
+        totales = {"D": [0, 0], "G": [0, 0]}
+        for fuente, metodo, cantidad, total in cursor.fetchall():
+            if fuente == 'V':
+                ventas[metodo] = {'cantidad': cantidad, 'total': total or 0.0}
+            elif fuente == 'P':
+                pagos[metodo] = {'cantidad': cantidad, 'total': total or 0.0}
+            else:
+                totales[fuente] = [cantidad or 0, total or 0]
+
+        total_ventas = sum(v['total'] for v in ventas.values())
+        total_abonos = sum(p['total'] for p in pagos.values())
+        total_fiado = totales["D"][1]
+        total_gastos = totales["G"][1]
+        ventas_efectivo = ventas.get('EFECTIVO', {}).get('total', 0)
+        abonos_efectivo = pagos.get('EFECTIVO', {}).get('total', 0)
+
+        # Dinero Real Entrado por Ventas = Ventas Totales - Fiado Generado
+        efectivo_ventas = total_ventas - total_fiado
+        # Flujo de Caja TOTAL (Entradas Reales) = Efectivo Ventas + Pagos Recibidos
+        flujo_entradas = efectivo_ventas + total_abonos
+
+        return {
+            "ventas": ventas,
+            "pagos_deuda": pagos,
+            "total_ventas": total_ventas,
+            "n_ventas": sum(v['cantidad'] for v in ventas.values()),
+            "total_gastos": total_gastos,
+            "n_gastos": totales["G"][0],
+            "total_fiado": total_fiado,
+            "total_abonos": total_abonos,
+            "n_abonos": sum(p['cantidad'] for p in pagos.values()),
+            "efectivo_ventas": efectivo_ventas,
+            "flujo_entradas": flujo_entradas,
+            # Flujo Neto (Caja Final Teorica generada en periodo) = Entradas - Gastos
+            "flujo_neto": flujo_entradas - total_gastos,
+            # Utilidad Operativa (Estado de Resultados simplificado) = Ventas - Gastos
+            # (Ignorando si cobramos o no, contabilidad de devengo simplificada)
+            "utilidad": total_ventas - total_gastos,
+            # Solo efectivo: lo que debería haber entrado físicamente a la caja
+            "ventas_efectivo": ventas_efectivo,
+            "abonos_efectivo": abonos_efectivo,
+            "caja_neta": ventas_efectivo + abonos_efectivo - total_gastos,
         }
 
     def get_financial_report(self, start_date=None, end_date=None):
         """
         Genera un reporte financiero detallado entre fechas.
-        Retorna diccionario con métricas clave.
+        Retorna diccionario con métricas clave (ver _compute_metrics).
         """
         import datetime
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
+
         # Filtros de fecha (ISO strings YYYY-MM-DD...)
         if not start_date:
             start_date = "1900-01-01"
         if not end_date:
-            # Fin del día de hoy
-            end_date = datetime.datetime.now().isoformat()
-            
-        # Asegurar que cubra todo el día final si solo se pasa fecha
-        if len(end_date) == 10: 
-            end_date += "T23:59:59"
-            
-        try:
-            # 1. Ventas Totales (Bruto)
-            cursor.execute("SELECT SUM(total) FROM ventas WHERE fecha BETWEEN ? AND ? AND estado = 'Completada'", (start_date, end_date))
-            res = cursor.fetchone()
-            total_ventas = res[0] or 0
-            
-            # 2. Gastos Totales
-            cursor.execute("SELECT SUM(monto) FROM gastos WHERE fecha BETWEEN ? AND ?", (start_date, end_date))
-            res = cursor.fetchone()
-            total_gastos = res[0] or 0
-            
-            # 3. Fiados Generados (Movimientos tipo DEUDA en el rango)
-            # Nota: Esto nos dice cuánto de la venta NO entró en caja.
-            cursor.execute("SELECT SUM(monto) FROM movimientos_cuenta WHERE tipo='DEUDA' AND fecha BETWEEN ? AND ?", (start_date, end_date))
-            res = cursor.fetchone()
-            total_fiado_generado = res[0] or 0
-            
-            # 4. Pagos Recibidos (Movimientos tipo PAGO en el rango)
-            # Dinero que entró por deudas pasadas o abonos
-            cursor.execute("SELECT SUM(monto) FROM movimientos_cuenta WHERE tipo='PAGO' AND fecha BETWEEN ? AND ?", (start_date, end_date))
-            res = cursor.fetchone()
-            total_pagos_recibidos = res[0] or 0
-            
-            # --- CALCULOS ---
-            
-            # Dinero Real Entrado por Ventas = Ventas Totales - Fiado Generado
-            efectivo_ventas = total_ventas - total_fiado_generado
-            
-            # Flujo de Caja TOTAL (Entradas Reales) = Efectivo Ventas + Pagos Recibidos
-            flujo_caja_entradas = efectivo_ventas + total_pagos_recibidos
-            
-            # Flujo Neto (Caja Final Teorica generada en periodo) = Entradas - Gastos
-            flujo_neto = flujo_caja_entradas - total_gastos
-            
-            # Utilidad Operativa (Estado de Resultados simplificado) = Ventas - Gastos
-            # (Ignorando si cobramos o no, contabilidad de devengo simplificada)
-            utilidad_operativa = total_ventas - total_gastos
-            
-            return {
-                "total_ventas": total_ventas,
-                "total_gastos": total_gastos,
-                "total_fiado": total_fiado_generado,
-                "total_abonos": total_pagos_recibidos,
-                
-                # Derivados
-                "efectivo_ventas": efectivo_ventas,
-                "flujo_entradas": flujo_caja_entradas,
-                "flujo_neto": flujo_neto,
-                "utilidad": utilidad_operativa
-            }
-            
-        finally:
-            conn.close()
+            # Hasta el final del día de hoy
+            end_date = datetime.date.today().isoformat()
 
+        with self.db.read() as cursor:
+            m = self._compute_metrics(cursor, start_date, end_date)
 
+        keys = ("total_ventas", "total_gastos", "total_fiado", "total_abonos", "n_ventas", "n_gastos",
+                "efectivo_ventas", "flujo_entradas", "flujo_neto", "utilidad")
+        return {k: m[k] for k in keys}
 
     def get_top_selling_products(self, days=30, limit=5):
         """
@@ -1141,50 +1518,51 @@ class InventarioModel:
         Retorna lista de tuplas: (nombre_producto, cantidad_total_vendida)
         """
         import datetime
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
         
-        try:
-            # Calcular fecha de inicio (hace N días)
-            start_date = (datetime.datetime.now() - datetime.timedelta(days=days)).isoformat()
-            
-            query = '''
-                SELECT 
-                    p.nombre,
-                    SUM(d.cantidad) as total_vendido
-                FROM detalle_ventas d
-                JOIN ventas v ON d.venta_id = v.id
-                JOIN productos p ON d.producto_id = p.id
-                WHERE v.fecha >= ?
-                GROUP BY p.id, p.nombre
-                ORDER BY total_vendido DESC
-                LIMIT ?
-            '''
-            
-            cursor.execute(query, (start_date, limit))
+        # Día de inicio (hace N días); se lee de resumen_producto_diario
+        start_day = (datetime.date.today() - datetime.timedelta(days=days)).isoformat()
+
+        query = '''
+            SELECT
+                p.nombre,
+                SUM(r.cantidad) as total_vendido
+            FROM resumen_producto_diario r
+            JOIN productos p ON r.producto_id = p.id
+            WHERE r.dia >= ?
+            GROUP BY p.id, p.nombre
+            HAVING total_vendido > 0
+            ORDER BY total_vendido DESC
+            LIMIT ?
+        '''
+
+        with self.db.read() as cursor:
+            cursor.execute(query, (start_day, limit))
             return cursor.fetchall()
-            
-        finally:
-            conn.close()
 
     def get_sales_in_range(self, start_date, end_date):
         """
         Retorna lista de ventas en un rango de fechas.
         Retorna: [(id, fecha, total), ...] ordenado por fecha DESC
         """
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
         # Asegurar formato completo para end_date
         if len(end_date) == 10: 
             end_date += "T23:59:59"
             
-        try:
+        with self.db.read() as cursor:
             cursor.execute("SELECT id, fecha, total, medio_pago FROM ventas WHERE fecha BETWEEN ? AND ? AND estado = 'Completada' ORDER BY fecha DESC", 
                            (start_date, end_date))
             return cursor.fetchall()
-        finally:
-            conn.close()
+
+    def get_expenses_in_range(self, start_date, end_date):
+        """
+        Retorna lista de gastos en un rango de fechas.
+        Retorna: [(id, descripcion, monto, fecha, categoria), ...] ordenado por fecha DESC
+        """
+        rango, params = self._range_filter("fecha", start_date, end_date)
+        with self.db.read() as cursor:
+            cursor.execute(f"SELECT id, descripcion, monto, fecha, categoria FROM gastos WHERE 1 = 1{rango} ORDER BY fecha DESC, id DESC",
+                           params)
+            return cursor.fetchall()
 
     # ==========================================
     # NUEVOS METODOS (HISTORIAL UNIFICADO)
@@ -1195,8 +1573,6 @@ class InventarioModel:
         Retorna detalles de los productos vendidos en una venta especifica.
         Lista de tuplas: (nombre_producto, cantidad, precio_unit, subtotal)
         """
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
         query = '''
             SELECT p.nombre, d.cantidad, d.precio_unitario, d.subtotal
             FROM detalle_ventas d
@@ -1204,10 +1580,39 @@ class InventarioModel:
             WHERE d.venta_id = ?
             ORDER BY p.nombre ASC
         '''
-        cursor.execute(query, (sale_id,))
-        res = cursor.fetchall()
-        conn.close()
-        return res
+        with self.db.read() as cursor:
+            cursor.execute(query, (sale_id,))
+            return cursor.fetchall()
+
+    def get_sales_for_tickets(self, sale_ids):
+        """
+        Datos para reimprimir/exportar tickets de varias ventas (dos consultas en total).
+        Retorna lista de dicts {id, fecha, total, medio_pago, descuento, items}, en el orden
+        de sale_ids; items es una lista de (nombre, cantidad, precio_unitario).
+        """
+        sale_ids = list(sale_ids)
+        ventas = {}
+        with self.db.read() as cursor:
+            for i in range(0, len(sale_ids), 500):
+                lote = sale_ids[i:i + 500]
+                marcas = ", ".join("?" * len(lote))
+                cursor.execute(f"""
+                    SELECT id, fecha, total, COALESCE(medio_pago, 'EFECTIVO'), COALESCE(descuento, 0)
+                    FROM ventas WHERE id IN ({marcas})
+                """, lote)
+                for v_id, fecha, total, medio, descuento in cursor.fetchall():
+                    ventas[v_id] = {'id': v_id, 'fecha': fecha, 'total': total, 'medio_pago': medio,
+                                    'descuento': descuento, 'items': []}
+                cursor.execute(f"""
+                    SELECT d.venta_id, p.nombre, d.cantidad, d.precio_unitario
+                    FROM detalle_ventas d
+                    JOIN productos p ON d.producto_id = p.id
+                    WHERE d.venta_id IN ({marcas})
+                    ORDER BY d.venta_id, d.id
+                """, lote)
+                for v_id, nombre, cantidad, precio in cursor.fetchall():
+                    ventas[v_id]['items'].append((nombre, cantidad, precio))
+        return [ventas[v_id] for v_id in sale_ids if v_id in ventas]
 
     def get_all_income_events(self):
         """
@@ -1222,12 +1627,9 @@ class InventarioModel:
             'details_id': int (id para buscar detalle, venta_id o movimiento_id)
         }
         """
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
         events = []
         
-        try:
+        with self.db.read() as cursor:
             # 1. Obtener Ventas
             cursor.execute("SELECT id, fecha, total FROM ventas WHERE estado = 'Completada'")
             sales = cursor.fetchall()
@@ -1261,11 +1663,133 @@ class InventarioModel:
                     'details_id': p[0] # Para abonos, usaremos el mismo ID para mostrar info
                 })
                 
-            # 3. Ordenar por fecha descendente (lo mas reciente primero)
-            events.sort(key=lambda x: x['date'], reverse=True)
-            
-            return events
-            
-        finally:
-            conn.close()
+        # 3. Ordenar por fecha descendente (lo mas reciente primero)
+        events.sort(key=lambda x: x['date'], reverse=True)
+        
+        return events
 
+
+    # ==========================================
+    # HISTORIALES PAGINADOS (KEYSET)
+    # ==========================================
+    # Cada método retorna Page(rows, next_cursor). Para la página siguiente se pasa
+    # next_cursor como `cursor`; es None cuando no hay más filas. El orden es siempre
+    # por fecha DESC, id DESC y el cursor es la clave (fecha, id) de la última fila,
+    # así que pedir la página N cuesta lo mismo que la primera (sin OFFSET).
+
+    @staticmethod
+    def _range_filter(column, start_date=None, end_date=None):
+        """Condición opcional 'AND column BETWEEN ...' para los rangos de fecha de los reportes."""
+        sql, params = "", []
+        if start_date:
+            sql += f" AND {column} >= ?"
+            params.append(start_date)
+        if end_date:
+            if len(end_date) == 10:
+                end_date += "T23:59:59"
+            sql += f" AND {column} <= ?"
+            params.append(end_date)
+        return sql, params
+
+    def get_sales_page(self, cursor=None, page_size=DEFAULT_PAGE_SIZE, start_date=None, end_date=None):
+        """Ventas completadas (filas Venta), opcionalmente dentro de un rango de fechas."""
+        rango, params = self._range_filter("fecha", start_date, end_date)
+        sql = f'''
+            SELECT id, fecha, total, medio_pago, descuento, estado
+            FROM ventas
+            WHERE estado = 'Completada'{rango} {{where}}
+            ORDER BY {{order}}
+        '''
+        with self.db.read() as cur:
+            return keyset_page(cur, sql, params, ("fecha", "id"), cursor, page_size,
+                               Venta, lambda r: (r.fecha, r.id))
+
+    def get_expenses_page(self, cursor=None, page_size=DEFAULT_PAGE_SIZE, start_date=None, end_date=None):
+        """Gastos (filas Gasto), opcionalmente dentro de un rango de fechas."""
+        rango, params = self._range_filter("fecha", start_date, end_date)
+        sql = f'''
+            SELECT id, descripcion, monto, fecha, categoria
+            FROM gastos
+            WHERE 1 = 1{rango} {{where}}
+            ORDER BY {{order}}
+        '''
+        with self.db.read() as cur:
+            return keyset_page(cur, sql, params, ("fecha", "id"), cursor, page_size,
+                               Gasto, lambda r: (r.fecha, r.id))
+
+    def get_payments_page(self, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+        """Abonos (movimientos PAGO) con el nombre del cliente (filas Abono)."""
+        sql = '''
+            SELECT m.id, m.cliente_id, m.fecha, m.tipo, m.monto, m.descripcion,
+                   m.venta_id, m.medio_pago, m.estado, c.nombre
+            FROM movimientos_cuenta m
+            JOIN clientes c ON m.cliente_id = c.id
+            WHERE m.tipo = 'PAGO' {where}
+            ORDER BY {order}
+        '''
+        with self.db.read() as cur:
+            return keyset_page(cur, sql, [], ("m.fecha", "m.id"), cursor, page_size,
+                               Abono, lambda r: (r.fecha, r.id))
+
+    def get_client_movements_page(self, cliente_id, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+        """Movimientos de la cuenta de un cliente (filas Movimiento)."""
+        sql = '''
+            SELECT id, cliente_id, fecha, tipo, monto, descripcion, venta_id, medio_pago, estado
+            FROM movimientos_cuenta
+            WHERE cliente_id = ? {where}
+            ORDER BY {order}
+        '''
+        with self.db.read() as cur:
+            return keyset_page(cur, sql, [cliente_id], ("fecha", "id"), cursor, page_size,
+                               Movimiento, lambda r: (r.fecha, r.id))
+
+    def get_income_events_page(self, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+        """
+        Versión paginada de get_all_income_events: ventas y abonos mezclados (filas Ingreso).
+        Como los ids de ventas y movimientos se repiten, el cursor es (fecha, type, id).
+        Cada rama trae a lo sumo page_size + 1 filas por su índice y el UNION solo ordena esas.
+        """
+        filtros = {'VENTA': ("", []), 'PAGO': ("", [])}
+        if cursor is not None:
+            fecha, tipo_cursor, id_cursor = cursor
+            for tipo in filtros:
+                # Misma fecha: el orden sigue por type DESC ('VENTA' antes que 'PAGO') y luego id DESC
+                if tipo == tipo_cursor:
+                    limite_id = id_cursor
+                elif tipo > tipo_cursor:
+                    limite_id = 0               # las de esa fecha ya se mostraron
+                else:
+                    limite_id = 2 ** 63 - 1     # aún faltan todas las de esa fecha
+                filtros[tipo] = ("AND ({alias}.fecha, {alias}.id) < (?, ?)", [fecha, limite_id])
+        query = '''
+            SELECT * FROM (
+                SELECT 'VENTA' AS type, v.id, v.fecha AS date, v.total AS amount,
+                       'Venta #' || v.id AS description, v.id AS details_id
+                FROM ventas v
+                WHERE v.estado = 'Completada' {filtro_venta}
+                ORDER BY v.fecha DESC, v.id DESC LIMIT ?
+            )
+            UNION ALL
+            SELECT * FROM (
+                SELECT 'PAGO' AS type, m.id, m.fecha AS date, m.monto AS amount,
+                       'Abono - ' || c.nombre || ' (' || COALESCE(m.descripcion, '') || ')' AS description,
+                       m.id AS details_id
+                FROM movimientos_cuenta m
+                JOIN clientes c ON m.cliente_id = c.id
+                WHERE m.tipo = 'PAGO' {filtro_pago}
+                ORDER BY m.fecha DESC, m.id DESC LIMIT ?
+            )
+            ORDER BY date DESC, type DESC, id DESC
+            LIMIT ?
+        '''.format(filtro_venta=filtros['VENTA'][0].format(alias="v"),
+                   filtro_pago=filtros['PAGO'][0].format(alias="m"))
+        limite = page_size + 1
+        params = [*filtros['VENTA'][1], limite, *filtros['PAGO'][1], limite, limite]
+        with self.db.read() as cur:
+            cur.execute(query, params)
+            rows = [Ingreso(*r) for r in cur.fetchall()]
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            return Page(rows, (last.date, last.type, last.id))
+        return Page(rows, None)
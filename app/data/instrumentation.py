@@ -0,0 +1,235 @@
+import functools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+_home_dir = os.path.expanduser("~")
+_data_dir = os.path.join(_home_dir, "Documents", "Digital_PyME")
+LOG_DIR = os.path.join(_data_dir, "logs")
+SLOW_LOG_NAME = "consultas_lentas.log"
+
+
+class _Operation:
+    """Llamada en curso a un método público del modelo (una por hilo)."""
+
+    __slots__ = ("name", "queries", "statements", "omitted")
+
+    MAX_STATEMENTS = 20  # Sentencias distintas que se guardan para el registro de lentas
+
+    def __init__(self, name):
+        self.name = name
+        self.queries = 0
+        self.statements = {}      # SQL -> veces ejecutada (en orden de ejecución)
+        self.omitted = 0
+
+    def add(self, statement):
+        self.queries += 1
+        if statement in self.statements:
+            self.statements[statement] += 1
+        elif len(self.statements) < self.MAX_STATEMENTS:
+            self.statements[statement] = 1
+        else:
+            self.omitted += 1
+
+
+class _OperationStats:
+    __slots__ = ("calls", "queries", "max_ms", "samples")
+
+    def __init__(self, max_samples):
+        self.calls = 0
+        self.queries = 0
+        self.max_ms = 0.0
+        self.samples = deque(maxlen=max_samples)
+
+
+def _percentile(ordenados, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    k = max(0, min(len(ordenados) - 1, int(round(p / 100.0 * len(ordenados) + 0.5)) - 1))
+    return ordenados[k]
+
+
+class QueryInstrumentation:
+    """
+    Tiempos por operación y registro de consultas lentas de InventarioModel.
+
+    - enable(model) envuelve cada método público de ESA instancia con timed() y registra un
+      trace callback de sqlite3 en sus conexiones; disable() deja todo como estaba. Mientras
+      está apagado no hay envoltorios ni callback: el costo es cero.
+    - Se mide la llamada más externa: si un método público llama a otro, el tiempo y las
+      consultas se cuentan una vez, en la operación que pidió la pantalla.
+    - stats() entrega p50/p95 por operación (sobre las últimas `max_samples` llamadas) y
+      cuántas llamadas y consultas hubo desde que se activó.
+    - Las operaciones que superan `slow_ms` o ejecutan `slow_queries` sentencias o más se
+      anotan con su SQL en logs/consultas_lentas.log (archivo rotativo).
+    """
+
+    SLOW_MS = 250
+    SLOW_QUERIES = 100
+    MAX_SAMPLES = 1000
+    LOG_MAX_BYTES = 512 * 1024
+    LOG_BACKUPS = 3
+
+    def __init__(self, log_dir=LOG_DIR, slow_ms=SLOW_MS, slow_queries=SLOW_QUERIES, max_samples=MAX_SAMPLES):
+        self.log_dir = log_dir
+        self.slow_ms = slow_ms
+        self.slow_queries = slow_queries
+        self.max_samples = max_samples
+        self._model = None
+        self._wrapped = []
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._logger = None
+
+    @property
+    def enabled(self):
+        return self._model is not None
+
+    @property
+    def log_path(self):
+        return os.path.join(self.log_dir, SLOW_LOG_NAME)
+
+    def configure(self, slow_ms=None, slow_queries=None):
+        if slow_ms is not None:
+            self.slow_ms = float(slow_ms)
+        if slow_queries is not None:
+            self.slow_queries = int(slow_queries)
+
+    # ------------------------------------------
+    # Activación
+    # ------------------------------------------
+    def apply_config(self, model):
+        """Enciende/apaga y ajusta umbrales según Configuración > Diagnóstico."""
+        try:
+            self.configure(model.get_config("diag_umbral_ms", self.SLOW_MS),
+                           model.get_config("diag_umbral_consultas", self.SLOW_QUERIES))
+        except (TypeError, ValueError):
+            self.configure(self.SLOW_MS, self.SLOW_QUERIES)
+        if model.get_config("diag_activo", "0") == "1":
+            self.enable(model)
+        else:
+            self.disable()
+
+    def enable(self, model):
+        """Instrumenta el modelo (InventarioModel o su fachada AsyncModel)."""
+        model = getattr(model, "model", model)
+        if self._model is model:
+            return
+        self.disable()
+        for name in dir(type(model)):
+            if name.startswith("_") or not callable(getattr(type(model), name)):
+                continue
+            setattr(model, name, self.timed(name)(getattr(model, name)))
+            self._wrapped.append(name)
+        model.db.set_trace_callback(self._trace)
+        self._model = model
+
+    def disable(self):
+        model, self._model = self._model, None
+        if model is None:
+            return
+        model.db.set_trace_callback(None)
+        for name in self._wrapped:
+            model.__dict__.pop(name, None)
+        self._wrapped = []
+
+    def timed(self, name):
+        """Decorador: mide la llamada y sus consultas bajo el nombre de operación `name`."""
+        def decorator(method):
+            @functools.wraps(method)
+            def wrapper(*args, **kwargs):
+                local = self._local
+                if getattr(local, "op", None) is not None:
+                    return method(*args, **kwargs)   # Anidada: cuenta para la operación externa
+                op = local.op = _Operation(name)
+                inicio = time.perf_counter()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    local.op = None
+                    self._record(op, (time.perf_counter() - inicio) * 1000)
+            return wrapper
+        return decorator
+
+    def _trace(self, statement):
+        # Corre en el hilo que ejecuta la sentencia (cada hilo tiene su conexión)
+        op = getattr(self._local, "op", None)
+        if op is not None:
+            op.add(statement)
+
+    # ------------------------------------------
+    # Estadísticas
+    # ------------------------------------------
+    def _record(self, op, ms):
+        with self._lock:
+            stats = self._stats.get(op.name)
+            if stats is None:
+                stats = self._stats[op.name] = _OperationStats(self.max_samples)
+            stats.calls += 1
+            stats.queries += op.queries
+            stats.max_ms = max(stats.max_ms, ms)
+            stats.samples.append(ms)
+        if ms >= self.slow_ms or op.queries >= self.slow_queries:
+            self._log_slow(op, ms)
+
+    def stats(self):
+        """Lista de dicts por operación, de la más lenta (p95) a la más rápida."""
+        with self._lock:
+            items = [(name, s.calls, s.queries, s.max_ms, sorted(s.samples)) for name, s in self._stats.items()]
+        filas = [{
+            "operacion": name,
+            "llamadas": calls,
+            "consultas_prom": queries / calls,
+            "p50_ms": _percentile(muestras, 50),
+            "p95_ms": _percentile(muestras, 95),
+            "max_ms": max_ms,
+        } for name, calls, queries, max_ms, muestras in items]
+        filas.sort(key=lambda f: f["p95_ms"], reverse=True)
+        return filas
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    # ------------------------------------------
+    # Registro de lentas
+    # ------------------------------------------
+    def _get_logger(self):
+        if self._logger is None:
+            os.makedirs(self.log_dir, exist_ok=True)
+            logger = logging.getLogger(f"digital_pyme.consultas_lentas.{id(self)}")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = RotatingFileHandler(self.log_path, maxBytes=self.LOG_MAX_BYTES,
+                                          backupCount=self.LOG_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    def _log_slow(self, op, ms):
+        lineas = [f"{op.name}: {ms:.1f} ms, {op.queries} consultas"]
+        for sql, veces in op.statements.items():
+            sql = " ".join(sql.split())
+            lineas.append(f"    {veces}x {sql[:300]}")
+        if op.omitted:
+            lineas.append(f"    ... y {op.omitted} ejecuciones más")
+        try:
+            self._get_logger().info("\n".join(lineas))
+        except OSError as e:
+            print(f"No se pudo escribir el registro de consultas lentas: {e}")
+
+    def close(self):
+        """Cierra el archivo de registro (p.ej. en tests)."""
+        if self._logger is not None:
+            for handler in list(self._logger.handlers):
+                self._logger.removeHandler(handler)
+                handler.close()
+            self._logger = None
+
+
+# Instancia única de la app (ver main.py y Configuración > Diagnóstico)
+instrumentation = QueryInstrumentation()
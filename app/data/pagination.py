@@ -0,0 +1,43 @@
+from collections import namedtuple
+
+# Filas livianas de los historiales. Son tuplas, así que el código que
+# desempaqueta por posición sigue funcionando igual que con fetchall().
+Venta = namedtuple("Venta", ["id", "fecha", "total", "medio_pago", "descuento", "estado"])
+Gasto = namedtuple("Gasto", ["id", "descripcion", "monto", "fecha", "categoria"])
+Movimiento = namedtuple("Movimiento", [
+    "id", "cliente_id", "fecha", "tipo", "monto", "descripcion", "venta_id", "medio_pago", "estado",
+])
+Abono = namedtuple("Abono", Movimiento._fields + ("cliente_nombre",))
+Ingreso = namedtuple("Ingreso", ["type", "id", "date", "amount", "description", "details_id"])
+
+# Resultado de una página: las filas y el cursor para pedir la siguiente
+# (None cuando no hay más).
+Page = namedtuple("Page", ["rows", "next_cursor"])
+
+DEFAULT_PAGE_SIZE = 50
+
+
+def keyset_page(cursor, sql, params, key_columns, after, page_size, row_type, key_of):
+    """
+    Ejecuta una consulta paginada por keyset (sin OFFSET).
+
+    sql: SELECT con un marcador {where} (condiciones extra, empieza con AND) y {order};
+    key_columns: columnas de la clave, p.ej. ("v.fecha", "v.id"). El orden es DESC;
+    after: cursor de la página anterior (tupla con los valores de la clave) o None;
+    key_of: función fila -> tupla clave, para armar el próximo cursor.
+
+    Se pide una fila de más para saber si existe una página siguiente.
+    """
+    params = list(params)
+    where = ""
+    if after is not None:
+        where = f"AND ({', '.join(key_columns)}) < ({', '.join('?' * len(key_columns))})"
+        params.extend(after)
+    order = ", ".join(f"{col} DESC" for col in key_columns)
+    params.append(page_size + 1)
+    cursor.execute(sql.format(where=where, order=order) + " LIMIT ?", params)
+    rows = [row_type(*r) for r in cursor.fetchall()]
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return Page(rows, key_of(rows[-1]))
+    return Page(rows, None)
@@ -0,0 +1,222 @@
+import bisect
+import heapq
+import unicodedata
+
+
+def normalize_text(texto):
+    """Minúsculas y sin tildes: 'Café Con Leche' -> 'cafe con leche'."""
+    if not texto:
+        return ""
+    texto = unicodedata.normalize("NFKD", str(texto).lower())
+    return "".join(ch for ch in texto if not unicodedata.combining(ch))
+
+
+def _trigrams(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _word_suffixes(name):
+    """Sufijos que empiezan en cada palabra (excepto la primera): 'leche con cafe' -> ['con cafe', 'cafe']"""
+    return [name[i + 1:] for i, ch in enumerate(name) if ch == " " and name[i + 1:i + 2] not in ("", " ")]
+
+
+class SearchIndex:
+    """
+    Índice de búsqueda en memoria sobre nombre y código de barras.
+
+    Insensible a tildes y mayúsculas ("cafe" encuentra "Café"). Resultados por niveles:
+      0. código exacto
+      1. nombre exacto
+      2. nombre empieza con la consulta
+      3. alguna palabra (o el código) empieza con la consulta
+      4. el nombre o código contiene la consulta (vía trigramas con 3+ caracteres; las
+         consultas más cortas recorren los nombres, como la búsqueda `in` original)
+    Dentro de cada nivel, orden alfabético.
+
+    Los niveles 2 y 3 salen de listas ordenadas con bisect, así que con `limit`
+    la búsqueda se corta apenas se llena el resultado, sin recorrer todo el catálogo.
+    """
+
+    # Con filtros chicos (p.ej. una categoría) conviene recorrer los permitidos directamente
+    SMALL_FILTER = 500
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._names = {}         # id -> nombre normalizado
+        self._codes = {}         # id -> código normalizado
+        self._by_name = {}       # nombre normalizado -> {ids}
+        self._by_code = {}       # código normalizado -> {ids}
+        self._grams = {}         # trigrama -> {ids} (nombre y código)
+        self._sorted = None      # listas ordenadas (se construyen en la primera búsqueda)
+
+    # ------------------------------------------
+    # Mantenimiento
+    # ------------------------------------------
+    def add(self, product_id, nombre, codigo_barras=None):
+        self.remove(product_id)
+        name = normalize_text(nombre)
+        code = normalize_text(codigo_barras)
+        self._names[product_id] = name
+        self._by_name.setdefault(name, set()).add(product_id)
+        if code:
+            self._codes[product_id] = code
+            self._by_code.setdefault(code, set()).add(product_id)
+        for gram in _trigrams(name) | _trigrams(code):
+            self._grams.setdefault(gram, set()).add(product_id)
+        if self._sorted is not None:
+            for lista, key in self._sorted_entries(product_id, name, code):
+                bisect.insort(lista, key)
+
+    def remove(self, product_id):
+        name = self._names.pop(product_id, None)
+        if name is None:
+            return
+        code = self._codes.pop(product_id, "")
+        self._discard(self._by_name, name, product_id)
+        if code:
+            self._discard(self._by_code, code, product_id)
+        for gram in _trigrams(name) | _trigrams(code):
+            self._discard(self._grams, gram, product_id)
+        if self._sorted is not None:
+            for lista, key in self._sorted_entries(product_id, name, code):
+                pos = bisect.bisect_left(lista, key)
+                if pos < len(lista) and lista[pos] == key:
+                    del lista[pos]
+
+    @staticmethod
+    def _discard(index, key, product_id):
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(product_id)
+            if not ids:
+                del index[key]
+
+    def _sorted_entries(self, product_id, name, code):
+        names, words = self._sorted
+        entries = [(names, (name, product_id))]
+        entries += [(words, (suffix, product_id)) for suffix in _word_suffixes(name)]
+        if code:
+            entries.append((words, (code, product_id)))
+        return entries
+
+    def _ensure_sorted(self):
+        if self._sorted is None:
+            names = sorted((name, pid) for pid, name in self._names.items())
+            words = [(suffix, pid) for pid, name in self._names.items() for suffix in _word_suffixes(name)]
+            words += [(code, pid) for pid, code in self._codes.items()]
+            words.sort()
+            self._sorted = (names, words)
+        return self._sorted
+
+    # ------------------------------------------
+    # Búsqueda
+    # ------------------------------------------
+    def search(self, query, limit=None, allowed=None):
+        """
+        Retorna ids ordenados por relevancia.
+        allowed: conjunto opcional de ids permitidos (p.ej. filtro de categoría).
+        """
+        q = " ".join(normalize_text(query).split())
+        if not q:
+            return []
+        words = q.split()
+        if len(words) > 1 or (allowed is not None and len(allowed) <= self.SMALL_FILTER):
+            return self._search_scan(q, words, limit, allowed)
+
+        names, word_list = self._ensure_sorted()
+        result, seen = [], set()
+
+        def take(ids):
+            for pid in ids:
+                if pid in seen or (allowed is not None and pid not in allowed):
+                    continue
+                seen.add(pid)
+                result.append(pid)
+                if limit and len(result) >= limit:
+                    return True
+            return False
+
+        if (take(sorted(self._by_code.get(q, ())))
+                or take(sorted(self._by_name.get(q, ())))
+                or take(self._prefix_range(names, q))
+                or take(self._prefix_range(word_list, q))):
+            return result
+
+        candidatos = self._gram_candidates(q) if len(q) >= 3 else self._names
+        # El filtro va antes de recortar a `limit`: si no, la página podría volver corta
+        contiene = [pid for pid in candidatos
+                    if pid not in seen and (allowed is None or pid in allowed)
+                    and (q in self._names[pid] or q in self._codes.get(pid, ""))]
+        orden = lambda pid: (self._names[pid], pid)
+        faltan = limit - len(result) if limit else None
+        take(heapq.nsmallest(faltan, contiene, key=orden) if faltan else sorted(contiene, key=orden))
+        return result
+
+    @staticmethod
+    def _prefix_range(lista, prefix):
+        pos = bisect.bisect_left(lista, (prefix,))
+        while pos < len(lista):
+            text, pid = lista[pos]
+            if not text.startswith(prefix):
+                break
+            yield pid
+            pos += 1
+
+    def _gram_candidates(self, word):
+        postings = [self._grams.get(gram) for gram in _trigrams(word)]
+        if not postings or any(p is None for p in postings):
+            return set()
+        postings.sort(key=len)
+        result = set(postings[0])
+        for p in postings[1:]:
+            result &= p
+            if not result:
+                break
+        return result
+
+    def _search_scan(self, q, words, limit, allowed):
+        """Consultas de varias palabras o con filtro chico: se evalúa cada candidato."""
+        if allowed is not None and len(allowed) <= self.SMALL_FILTER:
+            candidates = set(allowed)
+        else:
+            candidates = None
+            for word in words:
+                ids = self._gram_candidates(word) if len(word) >= 3 else None
+                if ids is not None:
+                    candidates = ids if candidates is None else candidates & ids
+            if candidates is None:
+                candidates = set(self._names)
+            if allowed is not None:
+                candidates &= allowed
+
+        scored = []
+        for pid in candidates:
+            rank = self._rank(pid, q, words)
+            if rank is not None:
+                scored.append((rank, self._names[pid], pid))
+        scored.sort()
+        ids = [item[2] for item in scored]
+        return ids[:limit] if limit else ids
+
+    def _rank(self, pid, q, words):
+        name = self._names.get(pid)
+        if name is None:
+            return None
+        code = self._codes.get(pid, "")
+        if code == q:
+            return 0
+        if not all(self._word_matches(w, name, code) for w in words):
+            return None
+        if name == q:
+            return 1
+        if name.startswith(q):
+            return 2
+        if (" " + q) in name or code.startswith(q):
+            return 3
+        return 4
+
+    @staticmethod
+    def _word_matches(word, name, code):
+        return word in name or word in code
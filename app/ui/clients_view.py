@@ -144,9 +144,11 @@ def build_clients_view(page: ft.Page, model):
         page.update()
 
     def open_client_detail(client):
-        movements = model.get_client_movements(client['id'])
-        history_items = []
-        for mov in movements:
+        # Historial paginado por keyset: se cargan 50 movimientos y "Cargar más" trae los anteriores
+        history_list = ft.ListView(expand=True, spacing=0, padding=0)
+        movements_cursor = [None]
+
+        def movement_row(mov):
             m_date = mov[2][2:10]
             m_type = mov[3]
             m_amount = mov[4]
@@ -155,21 +157,36 @@ def build_clients_view(page: ft.Page, model):
             color = "red" if is_debt else "green"
             icon = ft.Icons.REMOVE_CIRCLE_OUTLINE if is_debt else ft.Icons.ADD_CIRCLE_OUTLINE
             sign = "-" if is_debt else "+"
-            history_items.append(
-                ft.Container(
-                    content=ft.Row([
-                        ft.Icon(icon, color=color, size=20),
-                        ft.Column([
-                            ft.Text(m_desc, color=TEXT, weight="bold", size=14, overflow=ft.TextOverflow.ELLIPSIS),
-                            ft.Text(f"{m_date} • {m_type}", color=DIM, size=12),
-                        ], expand=True, spacing=2),
-                        ft.Text(f"{sign}${m_amount:,.0f}", color=color, weight="bold", size=14),
-                    ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
-                    padding=10,
-                    border=ft.border.only(bottom=ft.border.BorderSide(1, "#333333")),
-                )
+            return ft.Container(
+                content=ft.Row([
+                    ft.Icon(icon, color=color, size=20),
+                    ft.Column([
+                        ft.Text(m_desc, color=TEXT, weight="bold", size=14, overflow=ft.TextOverflow.ELLIPSIS),
+                        ft.Text(f"{m_date} • {m_type}", color=DIM, size=12),
+                    ], expand=True, spacing=2),
+                    ft.Text(f"{sign}${m_amount:,.0f}", color=color, weight="bold", size=14),
+                ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+                padding=10,
+                border=ft.border.only(bottom=ft.border.BorderSide(1, "#333333")),
             )
 
+        more_btn = ft.Container(
+            ft.TextButton("Cargar más", icon=ft.Icons.EXPAND_MORE, on_click=lambda e: load_movements(update=True)),
+            alignment=ft.Alignment(0.0, 0.0), padding=10
+        )
+
+        def load_movements(update=False):
+            if more_btn in history_list.controls:
+                history_list.controls.remove(more_btn)
+            movements, movements_cursor[0] = model.get_client_movements_page(client['id'], cursor=movements_cursor[0])
+            history_list.controls.extend(movement_row(mov) for mov in movements)
+            if movements_cursor[0] is not None:
+                history_list.controls.append(more_btn)
+            if update:
+                page.update()
+
+        load_movements()
+
         def open_payment_dialog(e):
             amount_field = ft.TextField(label="Monto a Pagar", keyboard_type=ft.KeyboardType.NUMBER, autofocus=True)
             payment_method_dropdown = ft.Dropdown(
@@ -214,7 +231,7 @@ def build_clients_view(page: ft.Page, model):
                 ], alignment=ft.MainAxisAlignment.CENTER),
                 ft.Divider(color="white24"),
                 ft.Text("Historial de Movimientos", weight="bold", color=TEXT),
-                ft.Container(content=ft.ListView(controls=history_items, expand=True, spacing=0, padding=0), height=300),
+                ft.Container(content=history_list, height=300),
             ], width=600, height=400),
             bgcolor=SURFACE,
             padding=20,
@@ -365,9 +382,17 @@ def build_clients_view(page: ft.Page, model):
             filtered = [c for c in all_clients if q in c['nombre'].lower() or (c['alias'] and q in c['alias'].lower())]
             render_clients(filtered)
 
-    def refresh_clients():
+    async def load_clients():
         nonlocal all_clients
-        all_clients = model.get_clients_with_balance()
+        loading_bar.visible = True
+        page.update()
+        try:
+            all_clients = await model.async_get_clients_with_balance()
+        except Exception as ex:
+            show_message(page, f"Error: {ex}", "red")
+            return
+        finally:
+            loading_bar.visible = False
 
         # Stats
         with_debt = [c for c in all_clients if c['saldo_actual'] > 0]
@@ -382,6 +407,10 @@ def build_clients_view(page: ft.Page, model):
 
         render_clients(all_clients)
 
+    def refresh_clients():
+        # La lista se lee en el hilo de BD; la UI queda libre mientras tanto
+        page.run_task(load_clients)
+
     # --- Layout Principal ---
     stat_cards = ft.Row([
         ft.Container(
@@ -407,9 +436,13 @@ def build_clients_view(page: ft.Page, model):
         ),
     ], spacing=10)
 
+    loading_bar = ft.ProgressBar(visible=False, color=PRIMARY, bgcolor=BORDER)
+
     refresh_clients()
 
+    # Al volver a la pestaña se reutiliza esta vista y se llama a data() (ver switch_tab en main.py)
     return ft.Container(
+        data=refresh_clients,
         content=ft.Column([
             # Barra busqueda + boton
             ft.Row([
@@ -421,6 +454,7 @@ def build_clients_view(page: ft.Page, model):
                     height=48
                 )
             ], spacing=10),
+            loading_bar,
             ft.Container(height=10),
             stat_cards,
             ft.Container(height=10),
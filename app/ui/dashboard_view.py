@@ -189,9 +189,9 @@ def build_dashboard_view(page: ft.Page, model, on_logout_callback=None):
         dlg.open = True
         page.update()
 
-    def update_expiring_alert(update_ui=True):
+    async def update_expiring_alert():
         try:
-            exp_items = model.get_expiring_products() # items próximos a vencer (7 días)
+            exp_items = await model.async_get_expiring_products() # items próximos a vencer (7 días)
             
             if exp_items:
                 count = len(exp_items)
@@ -225,34 +225,29 @@ def build_dashboard_view(page: ft.Page, model, on_logout_callback=None):
                 expiring_alert.visible = True
             else:
                 expiring_alert.visible = False
-            
-            if update_ui:
-                expiring_alert.update()
         except Exception as e:
             print(f"Error checking expiration: {e}")
 
-    def refresh_data(initial=False):
-        turno = model.get_active_turno()
-        if turno:
-            _, t_inicio, _, _, _, _ = turno
-            fin_report = model.get_financial_report(start_date=t_inicio)
-            
-            total_s = fin_report["total_ventas"]
-            total_e = fin_report["total_gastos"]
-            total_a = fin_report.get("total_abonos", 0)
+    async def refresh_data():
+        # Actividad y totales del turno resueltos en SQL (ver get_shift_activity),
+        # en el hilo de BD para no congelar la UI
+        loading_bar.visible = True
+        page.update()
+        try:
+            shift = await model.async_get_shift_activity(limit=50)
+        except Exception as ex:
+            shift = None
+            show_message(page, f"Error: {ex}", "red")
+        finally:
+            loading_bar.visible = False
+        if shift:
+            total_s = shift["total_ventas"]
+            total_e = shift["total_gastos"]
+            total_a = shift["total_abonos"]
             
             profit = total_s + total_a - total_e
-            
-            sales = model.get_sales_report() 
-            session_sales = [s for s in sales if s[1] >= t_inicio] if sales else []
-
-            payments = model.get_payments_report()
-            session_payments = [p for p in payments if p[2] >= t_inicio] if payments else []
-            
-            expenses = model.get_expenses_report()
-            session_expenses = [e for e in expenses if e[3] >= t_inicio] if expenses else []
 
-            tx_count = len(session_sales) + len(session_payments)
+            tx_count = shift["n_ventas"] + shift["n_abonos"]
             promedio = (total_s + total_a) / tx_count if tx_count > 0 else 0
             margen = (profit / (total_s + total_a) * 100) if (total_s + total_a) > 0 else 0
             
@@ -272,29 +267,23 @@ def build_dashboard_view(page: ft.Page, model, on_logout_callback=None):
                 txt_ganancia_margen.color = "#F44336"
                 
             combined_activity = []
-            for s in session_sales:
+            for ev in shift["actividad"]:
+                if ev["type"] == "VENTA":
+                    label, color, sign, desc = f"Venta #{ev['id']}", "#4CAF50", "+", ""
+                elif ev["type"] == "ABONO":
+                    label, color, sign, desc = f"Abono #{ev['id']}", "#4CAF50", "+", ev["description"]
+                else:
+                    label, color, sign, desc = ev["description"], "#F44336", "-", ""
                 combined_activity.append({
-                    "id": s[0], "date": s[1], "label": f"Venta #{s[0]}", 
-                    "amount": s[2], "color": "#4CAF50", "type": "VENTA", "sign": "+", "description": ""
+                    "id": ev["id"], "date": ev["date"], "label": label,
+                    "amount": ev["amount"], "color": color, "type": ev["type"], "sign": sign, "description": desc
                 })
-            for p in session_payments:
-                combined_activity.append({
-                    "id": p[0], "date": p[2], "label": f"Abono #{p[0]}",  # pyre-ignore
-                    "amount": p[4], "color": "#4CAF50", "type": "ABONO", "sign": "+", "description": f"{p[5]}"  # pyre-ignore
-                })
-            for e in session_expenses:
-                combined_activity.append({
-                    "id": e[0], "date": e[3], "label": e[1],
-                    "amount": e[2], "color": "#F44336", "type": "GASTO", "sign": "-", "description": ""
-                })
-            
-            combined_activity.sort(key=lambda x: x["date"], reverse=True)
 
             activity_list.controls.clear()
             if not combined_activity:
                  activity_list.controls.append(ft.Container(ft.Text("Sin actividad en esta sesión", color="grey", text_align="center"), padding=20))
             else:
-                for item in combined_activity[:50]: 
+                for item in combined_activity: 
                     raw_date = item["date"]
                     hora_fmt = raw_date.split('T')[1][:5] if 'T' in raw_date else raw_date
                     
@@ -323,11 +312,9 @@ def build_dashboard_view(page: ft.Page, model, on_logout_callback=None):
             activity_list.controls.clear()
             activity_list.controls.append(ft.Container(ft.Text("Caja Cerrada. Inicie turno.", color="grey", italic=True, text_align="center"), padding=20))
             
-        if not initial:
-            page.update()
-        
         # Check expirations
-        update_expiring_alert(update_ui=not initial)
+        await update_expiring_alert()
+        page.update()
 
     # ==========================
     # 2. UI - TARJETAS LATERALES (KPIs)
@@ -373,7 +360,7 @@ def build_dashboard_view(page: ft.Page, model, on_logout_callback=None):
     desc_field = ft.TextField(hint_text="Descripción del gasto", bgcolor=SURFACE, filled=True, expand=2, height=40, content_padding=10, text_size=14, hint_style=ft.TextStyle(color="#666666"), color=TEXT, border_color=DIM)
     amount_field = ft.TextField(hint_text="Monto", keyboard_type=ft.KeyboardType.NUMBER, bgcolor=SURFACE, filled=True, expand=1, height=40, content_padding=10, text_size=14, hint_style=ft.TextStyle(color="#666666"), color=TEXT, border_color=DIM)
     
-    def add_expense_click(e):
+    async def add_expense_click(e):
         try:
             desc = desc_field.value.strip()
             if not desc:
@@ -384,10 +371,10 @@ def build_dashboard_view(page: ft.Page, model, on_logout_callback=None):
                 show_message(page, "El monto debe ser mayor a 0", "orange")
                 return
                 
-            model.add_expense(desc, monto)
+            await model.async_add_expense(desc, monto)
             desc_field.value = ""
             amount_field.value = ""
-            refresh_data()
+            await refresh_data()
             desc_field.focus()
         except ValueError:
             show_message(page, "Monto inválido", "red")
@@ -410,6 +397,7 @@ def build_dashboard_view(page: ft.Page, model, on_logout_callback=None):
     )
 
     activity_list.expand = False
+    loading_bar = ft.ProgressBar(visible=False, color=REVENUE, bgcolor=BORDER)
     right_column = ft.Container(
         content=ft.Column([
             # Top Header
@@ -426,6 +414,7 @@ def build_dashboard_view(page: ft.Page, model, on_logout_callback=None):
                 ]),
                 padding=ft.padding.only(left=20, right=20, top=15, bottom=5)
             ),
+            loading_bar,
             # List
             ft.Container(content=activity_list, height=360),
             # Form
@@ -435,9 +424,11 @@ def build_dashboard_view(page: ft.Page, model, on_logout_callback=None):
         border_radius=10,
     )
 
-    refresh_data(initial=True) # Cargar datos iniciales
+    page.run_task(refresh_data) # Cargar datos iniciales sin bloquear el armado de la vista
     
+    # Al volver a la pestaña se reutiliza esta vista y se llama a data() (ver switch_tab en main.py)
     return ft.Container(
+        data=lambda: page.run_task(refresh_data),
         content=ft.Column([
             # ALERTA DE VENCIMIENTO
             expiring_alert,
@@ -310,10 +310,8 @@ def build_inventory_view(page: ft.Page, model):
     
     def refresh_products(search_query=""):
         product_grid.controls.clear()
-        products = model.get_all_products()
-        
-        if search_query:
-            products = [p for p in products if search_query.lower() in p[1].lower()]
+        # Índice de búsqueda en memoria: sin tildes, por nombre o código, ordenado por relevancia
+        products = model.search_products(search_query)
         
         if not products:
              pass
@@ -588,9 +586,8 @@ def build_inventory_view(page: ft.Page, model):
                 dlg_promo.update()
                 return
 
-            all_prods = model.get_all_products()
             # Filtrar solo productos normales (no Promociones para evitar recursividad infinita simple)
-            matches = [p for p in all_prods if query in p[1].lower() and p[6] != "Promociones"][:5]
+            matches = [p for p in model.search_products(query) if p[6] != "Promociones"][:5]
             
             if matches:
                 search_results.visible = True
@@ -669,6 +666,8 @@ def build_inventory_view(page: ft.Page, model):
         
         edit_name = ft.TextField(label="Nombre", value=p_name)
         edit_barcode = ft.TextField(label="Código de Barras", value=p_barcode if p_barcode else "")
+        edit_aliases = ft.TextField(label="Códigos alternativos", hint_text="Separados por coma (EAN anterior, otro envase...)",
+                                    value=", ".join(model.get_barcode_aliases(product_id)))
         
         # Opciones dinámicas para el diálogo de edición
         current_cats = model.get_all_categories()
@@ -702,19 +701,24 @@ def build_inventory_view(page: ft.Page, model):
                     show_message(page, "Verifica los valores", "orange")
                     return
                 
-                model.update_product(product_id, nombre, precio, stock, critico, codigo_barras, cat, fecha_vencimiento=exp)
+                aliases = edit_aliases.value.split(",") if edit_aliases.value else []
+                model.update_product(product_id, nombre, precio, stock, critico, codigo_barras, cat, fecha_vencimiento=exp,
+                                     codigos_alternativos=aliases)
                 dlg_edit.open = False
                 page.update()
                 show_message(page, f"'{nombre}' actualizado correctamente", "green")
                 refresh_products()
             except ValueError:
                 show_message(page, "Error: Verifica los números", "red")
+            except Exception as ex:
+                show_message(page, f"Error: {str(ex)}", "red")
         
         dlg_edit = ft.AlertDialog(
             title=ft.Text("Editar Producto"),
             content=ft.Column([
                 edit_name,
                 edit_barcode,
+                edit_aliases,
                 edit_cat,
                 edit_price,
                 edit_stock,
@@ -797,7 +801,9 @@ def build_inventory_view(page: ft.Page, model):
     )
 
     # Layout de la vista
+    # Al volver a la pestaña se reutiliza esta vista y se llama a data() (ver switch_tab en main.py)
     return ft.Container(
+        data=lambda: refresh_products(search_inventory.value or ""),
         content=ft.Row([
             main_panel,
             form_panel
@@ -1,6 +1,10 @@
 import flet as ft  # pyre-ignore
 from app.utils.helpers import is_mobile, show_message  # pyre-ignore
-from app.utils.printer_helper import generar_ticket_texto, imprimir_ticket  # pyre-ignore
+from app.utils.printer_helper import get_ticket_template  # pyre-ignore
+from app.utils.print_spooler import print_spooler  # pyre-ignore
+from app.ui.product_grid import ProductGrid  # pyre-ignore
+from app.utils.scan_buffer import ScanBuffer  # pyre-ignore
+from app.data.cart import Cart  # pyre-ignore
 
 # ── Ya no se usa paleta global estática, se inyecta en la vista ─────────
 
@@ -21,26 +25,53 @@ def build_pos_view(page: ft.Page, model, shared_cart=None):
     PRIMARY  = theme_manager.get_color("primary")
 
     # --- 1. STATE VARIABLES ---
-    cart = shared_cart if shared_cart is not None else {}
+    # Carrito con totales incrementales (ver app/data/cart.py); el descuento vive en el carrito
+    cart = shared_cart if shared_cart is not None else Cart()
     current_category = ["Todas"]
-    current_discount = [0]
     last_expiring_count = [0]
+    expiring_checked = [None]   # (versión del catálogo, fecha) de la última revisión
+    sale_in_progress = [False]
 
     # --- 2. FORWARD REFS ---
     cart_list      = ft.ListView(spacing=0, expand=True, padding=0)
     cart_count_txt = ft.Text("Carrito · 0 ítems", color=DIM, size=12)
     total_text     = ft.Text("$0", size=32, weight="bold", color=TEXT)
     iva_txt        = ft.Text("IVA incluido (19%)", color=DIM, size=11)
+    checkout_progress = ft.ProgressBar(visible=False, color=PRIMARY, bgcolor=BORDER)
+    checkout_btn   = ft.FilledButton(
+        "COBRAR",
+        style=ft.ButtonStyle(bgcolor=PRIMARY, color="white", shape=ft.RoundedRectangleBorder(radius=10)),
+        width=float("inf"), height=54,
+        on_click=lambda e: checkout(e)
+    )
 
-    product_row = ft.Row(wrap=True, spacing=10, run_spacing=10)
-    list_container = ft.Container(content=product_row, expand=True)
+    # Grilla con tarjetas reutilizables por id (ver app/ui/product_grid.py)
+    product_grid = ProductGrid(
+        page,
+        colors={"dim": DIM, "surface": SURFACE, "card_bg": CARD_BG, "expense": EXPENSE,
+                "border": BORDER, "text": TEXT, "green": GREEN},
+        on_select=lambda pid, pinfo: add_to_cart(pid, pinfo),
+    )
+    list_container = ft.Container(content=product_grid.control, expand=True)
 
     # --- 3. HELPERS ---
     def close_dialog(dlg):
         dlg.open = False
         page.update()
 
+    def set_checkout_busy(busy):
+        """Estado de carga mientras la venta se guarda en el hilo de BD."""
+        checkout_progress.visible = busy
+        checkout_btn.disabled = busy
+        page.update()
+
     def update_expiration_alert():
+        # Solo si el catálogo cambió (carga o escritura) o cambió el día; nunca por búsqueda
+        import datetime
+        key = (model.get_catalog_version(), datetime.date.today())
+        if key == expiring_checked[0]:
+            return
+        expiring_checked[0] = key
         try:
             exp_items = model.get_expiring_products()
             current_count = len(exp_items) if exp_items else 0
@@ -62,8 +93,6 @@ def build_pos_view(page: ft.Page, model, shared_cart=None):
     # --- 4. CART ---
     def refresh_cart():
         cart_list.controls.clear()
-        subtotal = 0
-        item_count = 0
 
         if not cart:
             cart_list.controls.append(
@@ -77,12 +106,9 @@ def build_pos_view(page: ft.Page, model, shared_cart=None):
                 )
             )
         else:
-            for pid, item in cart.items():
-                info = item['info']
-                qty  = item['qty']
-                line_total = info[2] * qty
-                subtotal  += line_total
-                item_count += 1
+            for line in cart:
+                pid, info, qty = line.product_id, line.info, line.qty
+                line_total = line.amount
                 qty_str = str(int(qty)) if qty % 1 == 0 else f"{qty:.3f} Kg"
 
                 cart_list.controls.append(
@@ -111,9 +137,9 @@ def build_pos_view(page: ft.Page, model, shared_cart=None):
                     )
                 )
 
-            discount_pct = current_discount[0]
-            discount_amt = subtotal * (discount_pct / 100.0)
-            total = subtotal - discount_amt
+            # Totales mantenidos por el carrito en cada cambio (sin recorrer las líneas)
+            subtotal, discount_pct = cart.subtotal, cart.discount_percent
+            discount_amt, total, item_count = cart.discount_amount, cart.total, cart.line_count
 
             if discount_pct > 0:
                 cart_list.controls.append(ft.Container(
@@ -126,107 +152,46 @@ def build_pos_view(page: ft.Page, model, shared_cart=None):
                                alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
                     ], spacing=4), padding=ft.padding.symmetric(horizontal=14, vertical=8)
                 ))
-            else:
-                total = subtotal
 
             total_text.value     = f"${total:,.0f}"
+            iva_txt.value        = f"IVA incluido (19%): ${cart.tax:,.0f}"
             cart_count_txt.value = f"Carrito · {item_count} ítem{'s' if item_count != 1 else ''}"
             page.update()
             return
 
         total_text.value     = "$0"
+        iva_txt.value        = "IVA incluido (19%)"
         cart_count_txt.value = "Carrito · 0 ítems"
         page.update()
 
     def _cart_dec(pid):
-        if pid in cart:
-            cart[pid]['qty'] -= 1
-            if cart[pid]['qty'] <= 0:
-                del cart[pid]  # pyre-ignore
+        cart.change(pid, -1)
         refresh_cart()
 
     def remove_from_cart(product_id):
-        if product_id in cart:
-            del cart[product_id]  # pyre-ignore
+        cart.remove(product_id)
         refresh_cart()
 
     # --- 5. PRODUCTS ---
     BULK_CATEGORIES = ["Fiambrería", "Verdurería", "Granel"]
 
-    def refresh_products(search_query=""):
-        products = model.get_all_products()
-        product_row.controls.clear()
-
-        if search_query:
-            products = [p for p in products if
-                        search_query.lower() in p[1].lower() or # pyre-ignore
-                        (len(p) >= 6 and p[5] and search_query.lower() in str(p[5]).lower())]
-
-        cat = current_category[0]
-        if cat != "Todas":
-            products = [p for p in products if (p[6] if len(p) >= 7 else "General") == cat]  # pyre-ignore
-
-        if not products:
-            product_row.controls.append(
-                ft.Container(ft.Text("Sin resultados", color=DIM, italic=True),
-                             padding=20, alignment=ft.Alignment(0.0, 0.0))
-            )
-        else:
-            for p in products:
-                p_id, p_name, p_price = p[0], p[1], p[2]  # pyre-ignore
-                p_stock, p_crit       = p[3], p[4]        # pyre-ignore
-                p_cat = p[6] if len(p) >= 7 else "General" # pyre-ignore
-
-                is_promo = p_cat == "Promos"
-                is_low   = p_stock <= p_crit
-
-                stock_color = "#F44336" if is_low else GREEN
-                stock_badge = ft.Container(
-                    content=ft.Text(f"{p_stock} ud.", size=10, color="white", weight="bold"),
-                    bgcolor=stock_color,
-                    padding=ft.padding.symmetric(horizontal=6, vertical=2),
-                    border_radius=10
-                )
-
-                if is_promo:
-                    card_bg    = SURFACE
-                    border_cl  = "#9C27B0"
-                    name_color = "#CE93D8"
-                    price_color= "#CE93D8"
-                    top_label  = ft.Container(
-                        content=ft.Text("PROMO", size=9, color="#9C27B0", weight="bold"),
-                        padding=ft.padding.symmetric(horizontal=6, vertical=2)
-                    )
-                else:
-                    card_bg    = CARD_BG
-                    border_cl  = EXPENSE if is_low else BORDER
-                    name_color = TEXT
-                    price_color= GREEN
-                    top_label  = None
-
-                top_items = [top_label, ft.Container(expand=True), stock_badge] if top_label else [ft.Container(expand=True), stock_badge]
-
-                card = ft.Container(
-                    content=ft.Column([
-                        ft.Row(top_items, spacing=4),
-                        ft.Container(expand=True),
-                        ft.Text(p_name, color=name_color, size=13, weight="bold",
-                                no_wrap=False, overflow=ft.TextOverflow.ELLIPSIS),
-                        ft.Text(f"${p_price:,.0f}", color=price_color, size=15, weight="bold"),
-                    ], spacing=3, tight=True),
-                    bgcolor=card_bg,
-                    border=ft.border.all(1, border_cl),
-                    border_radius=10,
-                    padding=10,
-                    on_click=lambda e, pid=p_id, pinfo=p: add_to_cart(pid, pinfo),
-                    ink=True,
-                    width=155, height=105
-                )
-                product_row.controls.append(card)
+    def refresh_products(search_query=None):
+        # Búsqueda y filtro por categoría en memoria (catálogo del modelo, sin SQL)
+        if search_query is None:
+            search_query = search_field.value or ""
+        product_grid.show(model.search_products(search_query, current_category[0]))
 
         if page:
             page.update()
-            update_expiration_alert()
+
+    def refresh_stock_badges():
+        """Tras una venta/anulación: solo se parchean las tarjetas cuyo stock cambió."""
+        product_grid.patch_stock(model.get_product)
+        update_expiration_alert()
+
+    def on_search_change(e):
+        query = e.control.value
+        product_grid.search_debounced(lambda: refresh_products(query))
 
     # --- 6. BULK / ADD TO CART ---
     def show_bulk_dialog(product_info, on_confirm):
@@ -285,12 +250,10 @@ def build_pos_view(page: ft.Page, model, shared_cart=None):
         if p_cat in BULK_CATEGORIES and quantity == 1.0:
             show_bulk_dialog(product_info, lambda qty: add_to_cart(product_id, product_info, qty))
             return
-        if product_id not in cart: cart[product_id] = {'info': product_info, 'qty': 0.0}
-        cart[product_id]['qty'] += quantity
-        if cart[product_id]['qty'] > product_info[3]:
-            cart[product_id]['qty'] -= quantity
+        if cart.qty(product_id) + quantity > product_info[3]:
             show_message(page, f"Stock insuficiente (Max: {product_info[3]})", "red")
             return
+        cart.add(product_info, quantity)
         refresh_cart()
         qty_msg = f"{int(quantity)}" if quantity.is_integer() else f"{quantity:.3f} Kg"
         show_message(page, f"{product_info[1]} (+{qty_msg})", "green")
@@ -298,10 +261,18 @@ def build_pos_view(page: ft.Page, model, shared_cart=None):
     # --- 7. MISC DIALOGS ---
     def open_sales_history_dialog(e):
         history_list_dlg = ft.Column(scroll=ft.ScrollMode.AUTO, height=400, spacing=10)
-        def refresh_history():
-            history_list_dlg.controls.clear()
-            recent_sales = model.get_sales_report()[:50]
-            if not recent_sales: history_list_dlg.controls.append(ft.Text("No hay ventas recientes.", italic=True))
+        history_cursor = [None]
+        more_btn = ft.TextButton("Cargar más", icon=ft.Icons.EXPAND_MORE,
+                                 on_click=lambda e: refresh_history(reset=False))
+        def refresh_history(reset=True):
+            # Paginado por keyset: cada "Cargar más" trae las 50 ventas anteriores
+            if reset:
+                history_cursor[0] = None
+                history_list_dlg.controls.clear()
+            elif more_btn in history_list_dlg.controls:
+                history_list_dlg.controls.remove(more_btn)
+            recent_sales, history_cursor[0] = model.get_sales_page(cursor=history_cursor[0], page_size=50)
+            if reset and not recent_sales: history_list_dlg.controls.append(ft.Text("No hay ventas recientes.", italic=True))
             for s in recent_sales:
                 s_id, s_fecha, s_total, s_medio, s_desc, s_estado = s
                 try: hora = s_fecha.split('T')[1][:5]
@@ -310,18 +281,29 @@ def build_pos_view(page: ft.Page, model, shared_cart=None):
                     ft.Container(content=ft.Row([
                         ft.Column([ft.Text(f"Ticket #{s_id} - {hora}", weight="bold", color=TEXT),
                                    ft.Text(f"Total: ${s_total:,.0f} ({s_medio})", size=12, color=TEXT)], expand=True, spacing=2),
+                        ft.IconButton(icon=ft.Icons.PRINT, icon_color=DIM, tooltip="Reimprimir ticket",
+                                      on_click=lambda e, sid=s_id: reprint_sale(sid)),
                         ft.IconButton(icon=ft.Icons.NOT_INTERESTED, icon_color=RED, tooltip="Anular Venta",
                                       on_click=lambda e, sid=s_id: confirm_void_sale(sid))
                     ]), bgcolor=SURFACE, padding=15, border_radius=10, border=ft.border.all(1, "#e0e0e0"))
                 )
+            if history_cursor[0] is not None:
+                history_list_dlg.controls.append(more_btn)
             page.update()
 
+        def reprint_sale(sale_id):
+            ventas = model.get_sales_for_tickets([sale_id])
+            if not ventas: show_message(page, "Venta no encontrada", "red"); return
+            ticket = get_ticket_template(model.get_config).render_many(ventas)[0]
+            print_spooler.submit(ticket, venta_id=sale_id)
+            show_message(page, f"🖨️  Ticket #{sale_id} enviado a impresora", "#1565C0")
+
         def confirm_void_sale(sale_id):
             def proceed_void(e):
                 success, msg = model.anular_venta(sale_id)
                 dlg_confirm.open = False
                 if success:
-                    show_message(page, msg, "green"); dlg_history.open = False; refresh_products()
+                    show_message(page, msg, "green"); dlg_history.open = False; refresh_stock_badges(); page.update()
                 else:
                     show_message(page, msg, "red")
                 page.update()
@@ -342,12 +324,12 @@ def build_pos_view(page: ft.Page, model, shared_cart=None):
         page.overlay.append(dlg_history); dlg_history.open = True; page.update()
 
     def open_discount_dialog():
-        dct_field = ft.TextField(label="Porcentaje %", value=str(current_discount[0]), autofocus=True, keyboard_type=ft.KeyboardType.NUMBER)
+        dct_field = ft.TextField(label="Porcentaje %", value=str(cart.discount_percent), autofocus=True, keyboard_type=ft.KeyboardType.NUMBER)
         def apply_dct(e):
             try:
                 val = int(dct_field.value)
                 if val < 0 or val > 100: show_message(page, "Debe ser entre 0 y 100", "red"); return
-                current_discount[0] = val; refresh_cart(); dlg_dct.open = False; page.update()
+                cart.discount_percent = val; refresh_cart(); dlg_dct.open = False; page.update()
             except ValueError: show_message(page, "Valor inválido", "red")
         dlg_dct = ft.AlertDialog(title=ft.Text("Aplicar Descuento"), content=dct_field,
                                   actions=[ft.TextButton("Cancelar", on_click=lambda e: close_dialog(dlg_dct)),
@@ -357,48 +339,50 @@ def build_pos_view(page: ft.Page, model, shared_cart=None):
     # --- 8. CHECKOUT ---
     def checkout(e):
         if not cart: show_message(page, "El carrito está vacío", "orange"); return
+        if sale_in_progress[0]: return
         dlg_payment = None; dlg_cash = None
 
-        def finalize_sale(payment_type, client_id=None):
+        async def finalize_sale(payment_type, client_id=None):
             nonlocal dlg_payment, dlg_cash
+            if sale_in_progress[0]: return  # Evita doble cobro por doble click
+            sale_in_progress[0] = True
+            # Foto del carrito: el cajero puede seguir escaneando mientras se guarda la venta.
+            # El total guardado y el del ticket salen de esta misma foto.
+            vendidos = cart.snapshot()
+            set_checkout_busy(True)
             try:
-                venta_id = model.register_sale(cart, medio_pago=payment_type, discount_percent=current_discount[0])
-                if payment_type == 'DEUDA' and client_id:
-                    subtotal = sum(item['qty'] * item['info'][2] for item in cart.values())
-                    total_amount = subtotal - (subtotal * (current_discount[0] / 100.0))
-                    model.add_movement(client_id, 'DEUDA', total_amount, f"Compra #{venta_id} (Fiado)", venta_id)
-                subtotal_v = sum(item['qty'] * item['info'][2] for item in cart.values())
-                total_v    = subtotal_v - (subtotal_v * (current_discount[0] / 100.0))
-                try:
-                    texto = generar_ticket_texto(
-                        venta_id=venta_id, carrito=cart, total=total_v, medio_pago=payment_type,
-                        descuento=current_discount[0],
-                        nombre_local=model.get_config("business_name", "MI NEGOCIO"),
-                        rut_local=model.get_config("business_rut", ""),
-                        direccion_local=model.get_config("business_address", ""),
-                        telefono_local=model.get_config("business_phone", ""),
-                        tipo_impresora=model.get_config("tipo_impresora", "58mm"),
-                        mensaje_pie=model.get_config("ticket_mensaje", "¡Gracias por su preferencia!")
-                    )
-                    ok = imprimir_ticket(texto)
-                    print_msg = ("🖨️  Ticket enviado a impresora", "#1565C0") if ok else ("⚠️  Venta OK, impresora no respondió", "#E65100")
-                except Exception as pe:
-                    print(f"[POS] Error al imprimir: {pe}"); print_msg = ("⚠️  Venta OK, impresora no respondió", "#E65100")
-                cart.clear(); current_discount[0] = 0; refresh_cart(); refresh_products()
+                # La venta y el movimiento de fiado se registran en una sola transacción (en el hilo de BD)
+                venta_id = await model.async_register_sale(vendidos, medio_pago=payment_type, cliente_id=client_id)
+                # Quitar solo lo vendido: lo escaneado durante el guardado queda en el carrito
+                cart.subtract(vendidos)
+                refresh_cart(); refresh_stock_badges()
                 if dlg_payment: dlg_payment.open = False  # pyre-ignore
                 if dlg_cash:    dlg_cash.open = False     # pyre-ignore
                 page.update()
                 show_message(page, f"✅  Venta #{venta_id} registrada", "green")
+                try:
+                    # Encabezado/pie precompilados; solo se formatean ítems y totales
+                    ticket = get_ticket_template(model.get_config).render(
+                        venta_id=venta_id, carrito=vendidos, total=vendidos.total, medio_pago=payment_type,
+                        descuento=vendidos.discount_percent
+                    )
+                    # La cola imprime en segundo plano (con reintentos); la venta ya quedó registrada
+                    job = print_spooler.submit(ticket, venta_id=venta_id)
+                    print_msg = ("🖨️  Ticket enviado a impresora", "#1565C0") if not job["error"] else ("⚠️  Venta OK, ticket guardado para reimprimir", "#E65100")
+                except Exception as pe:
+                    print(f"[POS] Error al imprimir: {pe}"); print_msg = ("⚠️  Venta OK, impresora no respondió", "#E65100")
                 show_message(page, print_msg[0], print_msg[1])
             except Exception as ex: show_message(page, f"Error: {str(ex)}", "red")
+            finally:
+                sale_in_progress[0] = False
+                set_checkout_busy(False)
 
         def show_client_selector():
             nonlocal dlg_payment
             clients = model.get_clients_with_balance()
             client_list_view = ft.ListView(expand=True, height=300)
             def finalize_with_client(client_data):
-                sub_t = sum(item['qty'] * item['info'][2] for item in cart.values())
-                current_total = sub_t - (sub_t * (current_discount[0] / 100.0))
+                current_total = cart.total
                 limit = client_data.get('limite', 0); current_balance = client_data.get('saldo_actual', 0)
                 if limit > 0 and (current_balance + current_total) > limit:
                     dlg_l = ft.AlertDialog(
@@ -411,7 +395,7 @@ def build_pos_view(page: ft.Page, model, shared_cart=None):
                         actions=[ft.TextButton("Entendido", on_click=lambda e: close_dialog(dlg_l))]
                     )
                     page.overlay.append(dlg_l); dlg_l.open = True; page.update(); return
-                finalize_sale('DEUDA', client_id=client_data['id'])
+                page.run_task(finalize_sale, 'DEUDA', client_id=client_data['id'])
 
             def render_list(search_term="", update_ui=True):
                 client_list_view.controls.clear()
@@ -451,7 +435,7 @@ def build_pos_view(page: ft.Page, model, shared_cart=None):
             txt_pago = ft.TextField(
                 label="Monto Entregado ($)", value=str(int(total_amount)),
                 keyboard_type=ft.KeyboardType.NUMBER, autofocus=True, text_size=20,
-                on_submit=lambda e: finalize_sale('EFECTIVO') if not btn_confirm_cash.disabled else None
+                on_submit=lambda e: page.run_task(finalize_sale, 'EFECTIVO') if not btn_confirm_cash.disabled else None
             )
             txt_vuelto = ft.Text("Vuelto: $0", size=20, weight="bold", color=GREEN)
             def calculate_change(e):
@@ -463,7 +447,7 @@ def build_pos_view(page: ft.Page, model, shared_cart=None):
                     txt_vuelto.update(); btn_confirm_cash.update()
                 except: pass
             txt_pago.on_change = calculate_change
-            btn_confirm_cash = ft.ElevatedButton("Confirmar Venta", bgcolor=GREEN, color="white", disabled=False, on_click=lambda e: finalize_sale('EFECTIVO'))
+            btn_confirm_cash = ft.ElevatedButton("Confirmar Venta", bgcolor=GREEN, color="white", disabled=False, on_click=lambda e: page.run_task(finalize_sale, 'EFECTIVO'))
             dlg_cash = ft.AlertDialog(
                 title=ft.Text("Pago en Efectivo"),
                 content=ft.Column([ft.Text(f"Total a Pagar: ${total_amount:,.0f}", size=24, weight="bold"), ft.Divider(), txt_pago, txt_vuelto], tight=True),
@@ -472,11 +456,10 @@ def build_pos_view(page: ft.Page, model, shared_cart=None):
             page.overlay.append(dlg_cash); dlg_cash.open = True; page.update()
 
         def pay_with(method):
-            sub_t = sum(item['qty'] * item['info'][2] for item in cart.values())
-            current_total = sub_t - (sub_t * (current_discount[0] / 100.0))
+            current_total = cart.total
             if method == "EFECTIVO": show_cash_dialog(current_total)
             elif method == "FIADO": show_client_selector()
-            else: finalize_sale(method)
+            else: page.run_task(finalize_sale, method)
 
         dlg_payment = ft.AlertDialog(
             title=ft.Text("Método de Pago"),
@@ -493,21 +476,58 @@ def build_pos_view(page: ft.Page, model, shared_cart=None):
         page.overlay.append(dlg_payment); dlg_payment.open = True; page.update()
 
     # --- 9. BARCODE ---
+    # Los escaneos se encolan y se aplican en lote (ver app/utils/scan_buffer.py):
+    # 12 yogures seguidos = una línea con +12 y un solo refresco del carrito.
+    async def apply_scans(items, faltantes):
+        agregados, sin_stock = [], []
+        for product, veces in items:
+            p_cat = product[6] if len(product) >= 7 and product[6] else "General"
+            if p_cat in BULK_CATEGORIES:
+                add_to_cart(product[0], product) # Pide el peso en su diálogo
+                continue
+            cantidad = min(veces, max(0, product[3] - cart.qty(product[0])))
+            if cantidad < veces:
+                sin_stock.append(f"{product[1]} (Max: {product[3]})")
+            if cantidad > 0:
+                cart.add(product, cantidad)
+                agregados.append(f"{product[1]} x{cantidad}" if cantidad > 1 else product[1])
+
+        busqueda = not items and len(faltantes) == 1
+        if busqueda:
+            # No era un código: se usa como búsqueda por nombre (comportamiento anterior)
+            search_field.value = faltantes[0]
+            refresh_products(faltantes[0])
+        elif search_field.value == "":
+            refresh_products("")
+
+        if agregados:
+            refresh_cart()
+        if sin_stock:
+            show_message(page, "Stock insuficiente: " + ", ".join(sin_stock), "red")
+        elif faltantes and not busqueda:
+            show_message(page, "Código no encontrado: " + ", ".join(faltantes), "orange")
+        elif agregados:
+            show_message(page, "✓ " + ", ".join(agregados) + " agregado" + ("s" if len(agregados) > 1 else ""), "green")
+
+    scan_buffer = ScanBuffer(
+        model.resolve_barcode, # Código principal o alternativo, en memoria
+        lambda items, faltantes: page.run_task(apply_scans, items, faltantes),
+    )
+
     def handle_barcode_scan(e=None):
         barcode = search_field.value.strip()
         if not barcode: return
-        product = model.get_product_by_barcode(barcode)
-        if product:
-            add_to_cart(product[0], product); search_field.value = ""; refresh_products(); search_field.update()
-            show_message(page, f"✓ {product[1]} agregado", "green")
-        else:
-            refresh_products(barcode)
+        product_grid.cancel_pending()
+        # El campo se libera al instante para el próximo escaneo; el carrito se actualiza por lote
+        search_field.value = ""
+        search_field.update()
+        scan_buffer.push(barcode)
 
     # --- 10. UI COMPONENTS ---
     search_field = ft.TextField(
         hint_text="Buscar producto o escanear código de barras...",
         hint_style=ft.TextStyle(color="#555555"),
-        on_change=lambda e: refresh_products(e.control.value),
+        on_change=on_search_change,
         on_submit=handle_barcode_scan,
         bgcolor=BG, color=TEXT,
         border_color=ACCENT, focused_border_color=ACCENT,
@@ -548,9 +568,18 @@ def build_pos_view(page: ft.Page, model, shared_cart=None):
 
     refresh_products()
     refresh_cart()
+    update_expiration_alert()
+
+    def on_show():
+        # Vista reutilizada: stock y carrito compartido pudieron cambiar en otra pestaña
+        refresh_products()
+        refresh_cart()
+        update_expiration_alert()
 
     # --- 11. LAYOUT ---
+    # Al volver a la pestaña se reutiliza esta vista y se llama a data() (ver switch_tab en main.py)
     return ft.Container(
+        data=on_show,
         content=ft.Row([
             # ── PRODUCTOS (izquierda, expansible) ──────────────────
             ft.Container(
@@ -596,12 +625,8 @@ def build_pos_view(page: ft.Page, model, shared_cart=None):
                                 width=float("inf"), height=40,
                                 on_click=lambda e: open_discount_dialog()
                             ),
-                            ft.FilledButton(
-                                "COBRAR",
-                                style=ft.ButtonStyle(bgcolor=PRIMARY, color="white", shape=ft.RoundedRectangleBorder(radius=10)),
-                                width=float("inf"), height=54,
-                                on_click=checkout
-                            ),
+                            checkout_progress,
+                            checkout_btn,
                             ft.TextButton(
                                 "Anular venta",
                                 style=ft.ButtonStyle(color=DIM),
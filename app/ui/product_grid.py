@@ -0,0 +1,210 @@
+import asyncio
+import threading
+
+import flet as ft  # pyre-ignore
+
+
+class ProductGrid:
+    """
+    Grilla de productos del POS con render incremental.
+
+    - Las tarjetas se indexan por id de producto y se reutilizan entre refrescos:
+      Flet solo envía al cliente las propiedades que cambiaron.
+    - patch_stock() actualiza solo los badges de stock que cambiaron (p.ej. tras una venta).
+    - Paginación: se muestran `page_size` tarjetas y un botón "Ver más".
+    - search_debounced() agrupa las pulsaciones del buscador con una tarea del loop de
+      Flet (page.run_task), así el refresco y page.update() corren en el loop y no en un hilo.
+    """
+
+    PAGE_SIZE = 60
+    DEBOUNCE_SECONDS = 0.25
+    MAX_CACHED_CARDS = 1000
+
+    def __init__(self, page, colors, on_select, page_size=None):
+        self.page = page
+        self.colors = colors
+        self.on_select = on_select
+        self.page_size = page_size or self.PAGE_SIZE
+
+        self._cards = {}          # id -> dict con los controles de la tarjeta
+        self._products = []       # resultado completo de la última búsqueda
+        self._visible = self.page_size
+        self._pending = None      # Future de la búsqueda en espera (ver search_debounced)
+        self._generation = 0      # Cada pulsación invalida las búsquedas anteriores
+        self._pending_lock = threading.Lock()
+
+        self.row = ft.Row(wrap=True, spacing=10, run_spacing=10)
+        self.more_button = ft.TextButton("Ver más", icon=ft.Icons.EXPAND_MORE,
+                                         on_click=self._show_more, visible=False)
+        self.empty_text = ft.Container(ft.Text("Sin resultados", color=colors["dim"], italic=True),
+                                       padding=20, alignment=ft.Alignment(0.0, 0.0))
+        self.control = ft.Column([self.row, self.more_button], spacing=10,
+                                 horizontal_alignment=ft.CrossAxisAlignment.CENTER)
+
+    # ------------------------------------------
+    # API
+    # ------------------------------------------
+    def show(self, products, reset_page=True):
+        """Muestra una lista de productos reutilizando las tarjetas existentes."""
+        self._products = list(products)
+        if reset_page:
+            self._visible = self.page_size
+        self._render()
+
+    def patch_stock(self, get_product):
+        """
+        Refresca solo las tarjetas visibles cuyo stock/precio/nombre cambió.
+        get_product: función id -> tupla de producto (p.ej. model.get_product).
+        """
+        changed, rebuilt = [], False
+        for i, p in enumerate(self._products):
+            fresh = get_product(p[0])
+            if fresh is None or fresh == p:
+                continue
+            self._products[i] = fresh
+            card = self._cards.get(fresh[0])
+            if card is None:
+                continue
+            result = self._apply(card, fresh)
+            if result == "rebuilt":
+                rebuilt = True
+            elif result:
+                changed.append(card["container"])
+        if rebuilt:
+            self._render()
+            if self.page:
+                self.page.update()
+        else:
+            for container in changed:
+                try:
+                    container.update()
+                except (AssertionError, RuntimeError):
+                    pass # La tarjeta no está montada (p.ej. fuera de la página visible)
+        return len(changed) + (1 if rebuilt else 0)
+
+    def search_debounced(self, run_search):
+        """Ejecuta run_search() en el loop de Flet cuando el usuario deja de tipear por DEBOUNCE_SECONDS."""
+        if self.page is None:
+            run_search()
+            return
+        with self._pending_lock:
+            if self._pending is not None:
+                self._pending.cancel()
+            self._generation += 1
+            self._pending = self.page.run_task(self._debounce, run_search, self._generation)
+
+    async def _debounce(self, run_search, generation):
+        await asyncio.sleep(self.DEBOUNCE_SECONDS)
+        with self._pending_lock:
+            if generation != self._generation:
+                return  # Llegó otra pulsación justo al vencer la espera
+            self._pending = None
+        run_search()
+
+    def cancel_pending(self):
+        with self._pending_lock:
+            self._generation += 1
+            if self._pending is not None:
+                self._pending.cancel()
+                self._pending = None
+
+    # ------------------------------------------
+    # Render
+    # ------------------------------------------
+    def _render(self):
+        shown = self._products[:self._visible]
+        if not shown:
+            self.row.controls = [self.empty_text]
+        else:
+            controls = []
+            for p in shown:
+                card = self._cards.get(p[0])
+                if card is None:
+                    card = self._build_card(p)
+                    self._cards[p[0]] = card
+                else:
+                    self._apply(card, p)
+                controls.append(card["container"])
+            self.row.controls = controls
+            if len(self._cards) > self.MAX_CACHED_CARDS:
+                # Liberar tarjetas que ya no se muestran
+                visibles = {p[0] for p in shown}
+                self._cards = {pid: c for pid, c in self._cards.items() if pid in visibles}
+        restantes = len(self._products) - len(shown)
+        self.more_button.visible = restantes > 0
+        self.more_button.content = f"Ver más ({restantes})"
+
+    def _show_more(self, e=None):
+        self._visible += self.page_size
+        self._render()
+        if self.page:
+            self.page.update()
+
+    def _style(self, p):
+        c = self.colors
+        p_cat = p[6] if len(p) >= 7 else "General"
+        is_promo = p_cat == "Promos"
+        is_low = p[3] <= p[4]
+        if is_promo:
+            return dict(promo=True, low=is_low, bg=c["surface"], border="#9C27B0",
+                        name="#CE93D8", price="#CE93D8")
+        return dict(promo=False, low=is_low, bg=c["card_bg"],
+                    border=c["expense"] if is_low else c["border"],
+                    name=c["text"], price=c["green"])
+
+    def _build_card(self, p):
+        st = self._style(p)
+        badge_text = ft.Text(f"{p[3]} ud.", size=10, color="white", weight="bold")
+        badge = ft.Container(
+            content=badge_text,
+            bgcolor="#F44336" if st["low"] else self.colors["green"],
+            padding=ft.padding.symmetric(horizontal=6, vertical=2),
+            border_radius=10
+        )
+        top_label = None
+        if st["promo"]:
+            top_label = ft.Container(
+                content=ft.Text("PROMO", size=9, color="#9C27B0", weight="bold"),
+                padding=ft.padding.symmetric(horizontal=6, vertical=2)
+            )
+        top_items = [top_label, ft.Container(expand=True), badge] if top_label else [ft.Container(expand=True), badge]
+
+        name_text = ft.Text(p[1], color=st["name"], size=13, weight="bold",
+                            no_wrap=False, overflow=ft.TextOverflow.ELLIPSIS)
+        price_text = ft.Text(f"${p[2]:,.0f}", color=st["price"], size=15, weight="bold")
+        card = {"product": p, "badge": badge, "badge_text": badge_text,
+                "name_text": name_text, "price_text": price_text}
+        card["container"] = ft.Container(
+            content=ft.Column([
+                ft.Row(top_items, spacing=4),
+                ft.Container(expand=True),
+                name_text,
+                price_text,
+            ], spacing=3, tight=True),
+            bgcolor=st["bg"],
+            border=ft.border.all(1, st["border"]),
+            border_radius=10,
+            padding=10,
+            on_click=lambda e, pid=p[0]: self.on_select(pid, self._cards[pid]["product"]),
+            ink=True,
+            width=155, height=105
+        )
+        return card
+
+    def _apply(self, card, p):
+        """Aplica los cambios de un producto a su tarjeta. Retorna True si hubo cambios."""
+        old = card["product"]
+        if old == p:
+            return False
+        card["product"] = p
+        if self._style(old)["promo"] != self._style(p)["promo"]:
+            # Cambió de tipo: reconstruir la tarjeta completa
+            card.update(self._build_card(p))
+            return "rebuilt"
+        st = self._style(p)
+        card["badge_text"].value = f"{p[3]} ud."
+        card["badge"].bgcolor = "#F44336" if st["low"] else self.colors["green"]
+        card["container"].border = ft.border.all(1, st["border"])
+        card["name_text"].value = p[1]
+        card["price_text"].value = f"${p[2]:,.0f}"
+        return True
@@ -1,9 +1,9 @@
 import flet as ft
+import asyncio
 import datetime
-import os
-from app.utils.helpers import show_message
+from app.utils.helpers import open_path, show_message
 from app.utils.formatting import format_currency
-from app.utils.pdf_exporter import generate_report_pdf
+from app.utils.report_jobs import get_report_exporter
 
 # Tema oscuro
 def build_reports_view(page: ft.Page, model):
@@ -99,60 +99,144 @@ def build_reports_view(page: ft.Page, model):
         page.update()
 
     # ── Exportar PDF ───────────────────────────────────────────────────
-    def export_pdf():
+    async def export_pdf():
         s_date = start_date_ref.current.value
         e_date = end_date_ref.current.value
-        try:
-            report  = model.get_financial_report(s_date, e_date)
-            sales   = model.get_sales_in_range(s_date, e_date)
-            tops    = model.get_top_selling_products(days=30)
-            clients_debt = [c for c in model.get_clients_with_balance() if c['saldo_actual'] > 0]
 
-            if hasattr(model, 'get_expenses_in_range'):
-                expenses = model.get_expenses_in_range(s_date, e_date)
-            else:
-                all_exp = model.get_expenses_report() or []
-                expenses = [ex for ex in all_exp if s_date <= (ex[3].split('T')[0] if 'T' in ex[3] else ex[3]) <= e_date]
-
-            report_data = {
-                "start_date": s_date,
-                "end_date":   e_date,
-                "total_ventas":   report.get("total_ventas", 0),
-                "total_gastos":   report.get("total_gastos", 0),
-                "utilidad":       report.get("utilidad", 0),
-                "flujo_entradas": report.get("flujo_entradas", 0),
-                "total_fiado":    report.get("total_fiado", 0),
-                "total_abonos":   report.get("total_abonos", 0),
-                "tx_count":       len(sales),
-                "exp_count":      len(expenses),
-                "top_products":   tops,
-                "sales_history":  sales,
-                "expenses_history": expenses,
-                "clients_debt":   clients_debt,
-            }
-
-            docs_dir = os.path.expanduser("~/Documents/Digital_PyME")
-            os.makedirs(docs_dir, exist_ok=True)
-            filename = f"reporte_{s_date}_{e_date}.pdf"
-            out_path = os.path.join(docs_dir, filename)
-
-            generate_report_pdf(report_data, out_path)
+        exportando = [True]
+
+        async def show_progress(fraccion, mensaje):
+            if not exportando[0]:
+                return  # Llegó después de terminar: no pisar la barra ya reiniciada
+            loading_bar.value = fraccion
+            loading_bar.tooltip = mensaje
+            page.update()
+
+        def progress(fraccion, mensaje):
+            # Se llama desde el hilo del exportador: la UI se actualiza en el loop de Flet
+            page.run_task(show_progress, fraccion, mensaje)
+
+        set_loading(True)
+        try:
+            # Consultas + PDF en el hilo de exportación; el historial se escribe por bloques
+            job = get_report_exporter(model).submit(s_date, e_date, progress)
+            out_path = await asyncio.wrap_future(job)
             show_message(page, f"PDF guardado en: {out_path}", "green")
 
             # Abrir el archivo automáticamente
-            import subprocess
-            subprocess.Popen(["open", out_path])
+            open_path(out_path)
 
         except Exception as ex:
             show_message(page, f"Error al generar PDF: {ex}", "red")
             import traceback; traceback.print_exc()
+        finally:
+            exportando[0] = False
+            loading_bar.value = None
+            set_loading(False)
+
+    # ── Historiales paginados (keyset) ─────────────────────────────────
+    # Cada lista carga una página y un botón "Cargar más" pide la siguiente
+    # con el cursor que devolvió el modelo.
+    _pages = {"range": (None, None), "sales": None, "expenses": None}
+
+    def sale_row(sale):
+        s_id, s_date_val, s_total = sale[0], sale[1], sale[2]
+        s_pago = sale[3] or "EFECTIVO"
+        dp = s_date_val.split('T')[0]
+        tp = s_date_val.split('T')[1][:5] if 'T' in s_date_val else ""
+        pc = {"EFECTIVO":"#4CAF50","TRANSFERENCIA":"#2196F3",
+              "DEBITO":"#9C27B0","CREDITO":"#9C27B0","DEUDA":"#FF9800"}.get(s_pago,"#4CAF50")
+        return ft.Container(
+            content=ft.Row([
+                ft.Column([
+                    ft.Text(f"Venta #{s_id}", weight="bold", color=TEXT, size=14),
+                    ft.Text(f"{dp} {tp}", size=11, color=DIM)
+                ], spacing=2, expand=True),
+                ft.Column([
+                    ft.Text(f"${s_total:,.0f}", weight="bold", color=REVENUE, size=15),
+                    ft.Container(
+                        ft.Text(s_pago, size=10, color=pc, weight="bold"),
+                        bgcolor=ft.Colors.with_opacity(0.12, pc),
+                        padding=ft.padding.symmetric(horizontal=8, vertical=2),
+                        border_radius=10
+                    )
+                ], spacing=3, horizontal_alignment=ft.CrossAxisAlignment.END),
+                ft.Icon(ft.Icons.CHEVRON_RIGHT, color="#555555", size=18)
+            ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN, vertical_alignment=ft.CrossAxisAlignment.CENTER),
+            padding=ft.padding.symmetric(horizontal=20, vertical=14),
+            border=ft.border.only(bottom=ft.border.BorderSide(1, BORDER)),
+            on_click=lambda e, sid=s_id: show_sale_details(sid), ink=True
+        )
+
+    def expense_row(exp):
+        e_id, e_desc, e_monto, e_fecha = exp[0], exp[1], exp[2], exp[3]
+        dp = e_fecha.split('T')[0] if 'T' in e_fecha else e_fecha
+        return ft.Container(
+            content=ft.Row([
+                ft.Column([
+                    ft.Text(e_desc, weight="bold", color=TEXT, size=14),
+                    ft.Text(dp, size=11, color=DIM)
+                ], spacing=2, expand=True),
+                ft.Text(f"-${e_monto:,.0f}", weight="bold", color=EXPENSE, size=15)
+            ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+            padding=ft.padding.symmetric(horizontal=20, vertical=14),
+            border=ft.border.only(bottom=ft.border.BorderSide(1, BORDER)),
+        )
+
+    def load_more_button(on_click):
+        return ft.Container(
+            ft.TextButton("Cargar más", icon=ft.Icons.EXPAND_MORE, on_click=on_click),
+            alignment=ft.Alignment(0.0, 0.0), padding=10
+        )
+
+    async def load_page(key, list_view, fetch, build_row, empty_msg, reset):
+        """Agrega la siguiente página de `fetch` (async) a list_view (o la primera si reset)."""
+        s_date, e_date = _pages["range"]
+        rows, next_cursor = await fetch(cursor=None if reset else _pages[key],
+                                        start_date=s_date, end_date=e_date)
+        if reset:
+            list_view.controls.clear()
+        elif list_view.controls:
+            list_view.controls.pop() # Quitar el botón "Cargar más" anterior
+        _pages[key] = next_cursor
+        if reset and not rows:
+            list_view.controls.append(
+                ft.Container(ft.Text(empty_msg, color=DIM, italic=True), padding=20)
+            )
+            return
+        list_view.controls.extend(build_row(r) for r in rows)
+        if next_cursor is not None:
+            list_view.controls.append(load_more_button(
+                lambda e: page.run_task(_load_more, key, list_view, fetch, build_row, empty_msg)))
+
+    async def _load_more(key, list_view, fetch, build_row, empty_msg):
+        try:
+            await load_page(key, list_view, fetch, build_row, empty_msg, reset=False)
+            page.update()
+        except Exception as ex:
+            show_message(page, f"Error: {ex}", "red")
+
+    async def load_sales_page(reset=False):
+        await load_page("sales", history_sales_list, model.async_get_sales_page, sale_row,
+                        "Sin ventas en este período.", reset)
+
+    async def load_expenses_page(reset=False):
+        await load_page("expenses", history_expenses_list, model.async_get_expenses_page, expense_row,
+                        "Sin gastos en este período.", reset)
+
+    def set_loading(busy):
+        loading_bar.visible = busy
+        page.update()
 
     # ── Refresh principal ──────────────────────────────────────────────
-    def refresh_report(e=None):
+    async def refresh_report(e=None):
+        # Las consultas corren en el hilo de reportes (ver AsyncModel): la caja sigue
+        # operando mientras este reporte se calcula.
         s_date = start_date_ref.current.value
         e_date = end_date_ref.current.value
+        set_loading(True)
         try:
-            report  = model.get_financial_report(s_date, e_date)
+            report  = await model.async_get_financial_report(s_date, e_date)
             ventas  = report['total_ventas']
             gastos  = report['total_gastos']
             util    = report['utilidad']
@@ -177,82 +261,15 @@ def build_reports_view(page: ft.Page, model):
             f_credit.value  = f"${fiado:,.0f}"
             f_abonos.value  = f"${abonos:,.0f}"
 
-            # ── Historial ventas ───────────────────────────────────────
-            sales_history = model.get_sales_in_range(s_date, e_date)
-            m_tx_lbl.value = f"{len(sales_history)} transacciones"
-            history_sales_list.controls.clear()
-
-            if not sales_history:
-                history_sales_list.controls.append(
-                    ft.Container(ft.Text("Sin ventas en este período.", color=DIM, italic=True), padding=20)
-                )
-            else:
-                for sale in sales_history:
-                    s_id = sale[0]; s_date_val = sale[1]; s_total = sale[2]
-                    s_pago = (sale[3] if len(sale) >= 4 else None) or "EFECTIVO"
-                    dp = s_date_val.split('T')[0]
-                    tp = s_date_val.split('T')[1][:5] if 'T' in s_date_val else ""
-                    pc = {"EFECTIVO":"#4CAF50","TRANSFERENCIA":"#2196F3",
-                          "DEBITO":"#9C27B0","CREDITO":"#9C27B0","DEUDA":"#FF9800"}.get(s_pago,"#4CAF50")
-                    history_sales_list.controls.append(
-                        ft.Container(
-                            content=ft.Row([
-                                ft.Column([
-                                    ft.Text(f"Venta #{s_id}", weight="bold", color=TEXT, size=14),
-                                    ft.Text(f"{dp} {tp}", size=11, color=DIM)
-                                ], spacing=2, expand=True),
-                                ft.Column([
-                                    ft.Text(f"${s_total:,.0f}", weight="bold", color=REVENUE, size=15),
-                                    ft.Container(
-                                        ft.Text(s_pago, size=10, color=pc, weight="bold"),
-                                        bgcolor=ft.Colors.with_opacity(0.12, pc),
-                                        padding=ft.padding.symmetric(horizontal=8, vertical=2),
-                                        border_radius=10
-                                    )
-                                ], spacing=3, horizontal_alignment=ft.CrossAxisAlignment.END),
-                                ft.Icon(ft.Icons.CHEVRON_RIGHT, color="#555555", size=18)
-                            ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN, vertical_alignment=ft.CrossAxisAlignment.CENTER),
-                            padding=ft.padding.symmetric(horizontal=20, vertical=14),
-                            border=ft.border.only(bottom=ft.border.BorderSide(1, BORDER)),
-                            on_click=lambda e, sid=s_id: show_sale_details(sid), ink=True
-                        )
-                    )
-
-            # ── Historial gastos ───────────────────────────────────────
-            # Intentar filtro por rango, si no existe tomar todos
-            if hasattr(model, 'get_expenses_in_range'):
-                expenses = model.get_expenses_in_range(s_date, e_date)
-            else:
-                all_exp = model.get_expenses_report() or []
-                expenses = [ex for ex in all_exp if s_date <= (ex[3].split('T')[0] if 'T' in ex[3] else ex[3]) <= e_date]
-
-            m_exp_lbl.value = f"{len(expenses)} egresos"
-            history_expenses_list.controls.clear()
-
-            if not expenses:
-                history_expenses_list.controls.append(
-                    ft.Container(ft.Text("Sin gastos en este período.", color=DIM, italic=True), padding=20)
-                )
-            else:
-                for exp in expenses:
-                    e_id, e_desc, e_monto, e_fecha = exp[0], exp[1], exp[2], exp[3]
-                    dp = e_fecha.split('T')[0] if 'T' in e_fecha else e_fecha
-                    history_expenses_list.controls.append(
-                        ft.Container(
-                            content=ft.Row([
-                                ft.Column([
-                                    ft.Text(e_desc, weight="bold", color=TEXT, size=14),
-                                    ft.Text(dp, size=11, color=DIM)
-                                ], spacing=2, expand=True),
-                                ft.Text(f"-${e_monto:,.0f}", weight="bold", color=EXPENSE, size=15)
-                            ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
-                            padding=ft.padding.symmetric(horizontal=20, vertical=14),
-                            border=ft.border.only(bottom=ft.border.BorderSide(1, BORDER)),
-                        )
-                    )
+            # ── Historiales (paginados) ────────────────────────────────
+            m_tx_lbl.value  = f"{report.get('n_ventas', 0)} transacciones"
+            m_exp_lbl.value = f"{report.get('n_gastos', 0)} egresos"
+            _pages["range"] = (s_date, e_date)
+            await load_sales_page(reset=True)
+            await load_expenses_page(reset=True)
 
             # ── Fiados pendientes ──────────────────────────────────────
-            clients_debt = [c for c in model.get_clients_with_balance() if c['saldo_actual'] > 0]
+            clients_debt = [c for c in await model.async_get_clients_with_balance() if c['saldo_actual'] > 0]
             history_fiados_list.controls.clear()
             if not clients_debt:
                 history_fiados_list.controls.append(
@@ -275,8 +292,8 @@ def build_reports_view(page: ft.Page, model):
                     )
 
             # ── Top productos ──────────────────────────────────────────
-            def upd_top(days, col):
-                products = model.get_top_selling_products(days=days)
+            async def upd_top(days, col):
+                products = await model.async_get_top_selling_products(days=days)
                 col.controls.clear()
                 col.controls.append(ft.Row([
                     ft.Text("Producto", size=11, color=DIM, weight="bold", expand=True),
@@ -296,14 +313,16 @@ def build_reports_view(page: ft.Page, model):
                             border=ft.border.only(bottom=ft.border.BorderSide(1, BORDER))
                         ))
 
-            upd_top(7,  top_7_list)
-            upd_top(15, top_15_list)
-            upd_top(30, top_30_list)
+            await upd_top(7,  top_7_list)
+            await upd_top(15, top_15_list)
+            await upd_top(30, top_30_list)
 
             page.update()
         except Exception as ex:
             show_message(page, f"Error: {ex}", "red")
             import traceback; traceback.print_exc()
+        finally:
+            set_loading(False)
 
     # ── Helpers UI ────────────────────────────────────────────────────
     def dcard(title, val_ctrl, sub_ctrl=None):
@@ -440,7 +459,7 @@ def build_reports_view(page: ft.Page, model):
             ft.Container(expand=True),
             ft.OutlinedButton(
                 "Exportar PDF",
-                on_click=lambda e: export_pdf(),
+                on_click=lambda e: page.run_task(export_pdf),
                 style=ft.ButtonStyle(
                     side=ft.BorderSide(1, "#2196F3"), color=PRIMARY,
                     shape=ft.RoundedRectangleBorder(radius=8)
@@ -465,11 +484,16 @@ def build_reports_view(page: ft.Page, model):
                         style=ft.ButtonStyle(bgcolor=PRIMARY, color="white"), height=42)
     ], spacing=10)
 
-    refresh_report()
+    loading_bar = ft.ProgressBar(visible=False, color=PRIMARY, bgcolor=BORDER)
+
+    page.run_task(refresh_report)
 
+    # Al volver a la pestaña se reutiliza esta vista y se llama a data() (ver switch_tab en main.py)
     return ft.Container(
+        data=lambda: page.run_task(refresh_report),
         content=ft.Column([
             filter_bar,
+            loading_bar,
             ft.Container(height=12),
             ft.Row([
                 left_nav,
@@ -1,7 +1,12 @@
 import flet as ft
+import asyncio
 import os
-import subprocess
-from app.utils.helpers import show_message
+from app.utils.helpers import open_path, show_message
+from app.utils.backup import get_backup_manager
+from app.data.instrumentation import instrumentation
+from app.utils.print_spooler import print_spooler
+from app.utils.printer_helper import invalidate_ticket_template
+from app.utils.escpos import CONEXION_DISPOSITIVO, CONEXION_RED, CONEXION_SISTEMA, crear_backend, parse_destino_red
 
 def build_settings_view(page: ft.Page, model, on_theme_change=None):
     from app.utils.theme import theme_manager
@@ -39,6 +44,23 @@ def build_settings_view(page: ft.Page, model, on_theme_change=None):
         value=model.get_config("tipo_impresora", "58mm"),
         color=TEXT, border_radius=8, border_color="#555555",
     )
+    dd_conexion = ft.Dropdown(
+        label="Conexión",
+        options=[
+            ft.dropdown.Option(CONEXION_SISTEMA, text="Impresora del sistema"),
+            ft.dropdown.Option(CONEXION_RED, text="Ticketera de red (ESC/POS, puerto 9100)"),
+            ft.dropdown.Option(CONEXION_DISPOSITIVO, text="Ticketera USB/serie (ESC/POS)")
+        ],
+        value=model.get_config("impresora_conexion", CONEXION_SISTEMA),
+        color=TEXT, border_radius=8, border_color="#555555",
+    )
+    txt_destino = ft.TextField(
+        label="IP o dispositivo",
+        hint_text="192.168.1.50 o /dev/usb/lp0",
+        value=model.get_config("impresora_destino", ""),
+        bgcolor=SURFACE, color=TEXT, border_color="#555555",
+        border_radius=8, filled=True,
+    )
     txt_pie_pagina = ft.TextField(
         label="Mensaje de Pie de Página",
         value=model.get_config("ticket_mensaje", "¡Gracias por su preferencia!"),
@@ -53,16 +75,66 @@ def build_settings_view(page: ft.Page, model, on_theme_change=None):
     txt_phone   = ft.TextField(label="Teléfono",             value=model.get_config("business_phone", ""),   bgcolor=SURFACE, color=TEXT, border_color="#555555", filled=True, border_radius=8, keyboard_type=ft.KeyboardType.PHONE)
 
 
+    # ── Controles de Respaldo ─────────────────────────────────────────
+    sw_backup_auto = ft.Switch(value=model.get_config("backup_auto", "1") == "1", active_color=PRIMARY)
+    dd_compresion = ft.Dropdown(
+        label="Compresión",
+        options=[
+            ft.dropdown.Option("gzip", text="gzip"),
+            ft.dropdown.Option("zstd", text="zstd (requiere zstandard)"),
+            ft.dropdown.Option("ninguna", text="Sin comprimir")
+        ],
+        value=model.get_config("backup_compresion", "gzip"),
+        color=TEXT, border_radius=8, border_color="#555555",
+    )
+    txt_retener = ft.TextField(label="Respaldos a conservar", value=model.get_config("backup_retener", "10"),
+                               bgcolor=SURFACE, color=TEXT, border_color="#555555", filled=True, border_radius=8,
+                               keyboard_type=ft.KeyboardType.NUMBER, width=200)
+
+    # ── Controles de Diagnóstico ──────────────────────────────────────
+    sw_diag = ft.Switch(value=model.get_config("diag_activo", "0") == "1", active_color=PRIMARY)
+    txt_umbral_ms = ft.TextField(label="Milisegundos", value=str(model.get_config("diag_umbral_ms", instrumentation.SLOW_MS)),
+                                 bgcolor=SURFACE, color=TEXT, border_color="#555555", filled=True, border_radius=8,
+                                 keyboard_type=ft.KeyboardType.NUMBER, width=200)
+    txt_umbral_consultas = ft.TextField(label="Consultas", value=str(model.get_config("diag_umbral_consultas", instrumentation.SLOW_QUERIES)),
+                                        bgcolor=SURFACE, color=TEXT, border_color="#555555", filled=True, border_radius=8,
+                                        keyboard_type=ft.KeyboardType.NUMBER, width=200)
+
     # ── Guardar ───────────────────────────────────────────────────────
+    def validar_destino():
+        """Revisa el destino de la ticketera de red; marca el error en el campo si no es válido."""
+        txt_destino.error_text = None
+        if dd_conexion.value == CONEXION_RED:
+            try:
+                parse_destino_red(txt_destino.value)
+            except ValueError as ex:
+                txt_destino.error_text = str(ex)
+        return txt_destino.error_text is None
+
     def save_settings(e):
+        if not validar_destino():
+            show_message(page, "Revisa el destino de la impresora antes de guardar.", "red")
+            return
         try:
             model.set_config("theme",               dd_theme.value)
             model.set_config("tipo_impresora",      dd_impresora.value)
             model.set_config("ticket_mensaje",      txt_pie_pagina.value)
+            model.set_config("impresora_conexion",  dd_conexion.value)
+            model.set_config("impresora_destino",   txt_destino.value)
+            print_spooler.set_backend(crear_backend(model.get_config))
             model.set_config("business_name",       txt_name.value)
             model.set_config("business_rut",        txt_rut.value)
             model.set_config("business_address",    txt_address.value)
             model.set_config("business_phone",      txt_phone.value)
+            invalidate_ticket_template()  # Datos del negocio / ancho de impresora pudieron cambiar
+            model.set_config("backup_auto",         "1" if sw_backup_auto.value else "0")
+            model.set_config("backup_compresion",   dd_compresion.value)
+            model.set_config("backup_retener",      txt_retener.value or "10")
+            model.set_config("diag_activo",         "1" if sw_diag.value else "0")
+            model.set_config("diag_umbral_ms",      txt_umbral_ms.value or str(instrumentation.SLOW_MS))
+            model.set_config("diag_umbral_consultas", txt_umbral_consultas.value or str(instrumentation.SLOW_QUERIES))
+            instrumentation.apply_config(model)
+            render_diagnostics(update=False)
             show_message(page, "Configuración guardada exitosamente.", "green")
             
             if dd_theme.value != original_theme and on_theme_change:
@@ -71,6 +143,190 @@ def build_settings_view(page: ft.Page, model, on_theme_change=None):
         except Exception as ex:
             show_message(page, f"Error al guardar: {ex}", "red")
 
+    # ── Mantenimiento ─────────────────────────────────────────────────
+    async def verify_balances(e):
+        try:
+            drift = await model.async_verify_client_balances(repair=True)
+            if not drift:
+                show_message(page, "Saldos de clientes verificados: sin diferencias.", "green")
+            else:
+                total = sum(abs(d["diferencia"]) for d in drift)
+                show_message(page, f"Se corrigieron {len(drift)} saldos (diferencia total ${total:,.0f}).", "orange")
+        except Exception as ex:
+            show_message(page, f"Error al verificar saldos: {ex}", "red")
+
+    async def rebuild_rollups(e):
+        try:
+            dias = await model.async_rebuild_rollups()
+            show_message(page, f"Resúmenes de reportes reconstruidos ({dias} registros diarios).", "green")
+        except Exception as ex:
+            show_message(page, f"Error al reconstruir resúmenes: {ex}", "red")
+
+    # ── Tickets no impresos (cola de impresión) ───────────────────────
+    failed_jobs_list = ft.Column(spacing=0)
+
+    def render_failed_jobs(update=True):
+        failed_jobs_list.controls.clear()
+        jobs = print_spooler.failed_jobs()
+        if not jobs:
+            failed_jobs_list.controls.append(
+                ft.Container(ft.Text("No hay tickets pendientes.", color=DIM, italic=True, size=12), padding=20)
+            )
+        for job in jobs:
+            titulo = f"Venta #{job['venta_id']}" if job.get("venta_id") else "Ticket"
+            failed_jobs_list.controls.append(ft.Container(
+                content=ft.Row([
+                    ft.Column([
+                        ft.Text(f"{titulo} · {job['creado'].replace('T', ' ')}", color=TEXT, size=14, weight="bold"),
+                        ft.Text(job.get("error") or "", color=DIM, size=12),
+                    ], spacing=2, expand=True),
+                    ft.IconButton(ft.Icons.PRINT, tooltip="Reimprimir", icon_color=PRIMARY,
+                                  on_click=lambda e, jid=job["id"]: reprint_job(jid)),
+                    ft.IconButton(ft.Icons.DELETE_OUTLINE, tooltip="Descartar", icon_color=EXPENSE,
+                                  on_click=lambda e, jid=job["id"]: discard_job(jid)),
+                ]),
+                padding=ft.padding.symmetric(horizontal=20, vertical=8),
+                border=ft.border.only(bottom=ft.border.BorderSide(1, BORDER)),
+            ))
+        if update:
+            page.update()
+
+    async def print_test(e):
+        from app.utils.printer_helper import generar_ticket_lineas
+        ticket = generar_ticket_lineas(
+            venta_id="PRUEBA", carrito={}, total=0, medio_pago="PRUEBA",
+            nombre_local=txt_name.value or "MI NEGOCIO", tipo_impresora=dd_impresora.value,
+            mensaje_pie=txt_pie_pagina.value or "")
+        if not validar_destino():
+            page.update()
+            return
+        try:
+            # Se usa la conexión del formulario, aunque todavía no esté guardada
+            valores = {"impresora_conexion": dd_conexion.value, "impresora_destino": txt_destino.value}
+            send = crear_backend(lambda k, d=None: valores.get(k, d))
+            await asyncio.to_thread(send, ticket, timeout=5)
+            show_message(page, "Ticket de prueba enviado.", "green")
+        except Exception as ex:
+            show_message(page, f"La impresora no respondió: {ex}", "red")
+
+    def reprint_job(job_id):
+        if print_spooler.reprint(job_id):
+            show_message(page, "Ticket enviado nuevamente a la impresora.", "green")
+        render_failed_jobs()
+
+    def discard_job(job_id):
+        print_spooler.discard(job_id)
+        render_failed_jobs()
+
+    render_failed_jobs(update=False)
+
+    # ── Respaldos ─────────────────────────────────────────────────────
+    backups_list = ft.Column(spacing=0)
+    backup_progress = ft.ProgressBar(visible=False, color=PRIMARY, bgcolor=BORDER)
+
+    def render_backups(update=True):
+        backups_list.controls.clear()
+        backups = get_backup_manager(model).list_backups()
+        if not backups:
+            backups_list.controls.append(
+                ft.Container(ft.Text("Todavía no hay respaldos.", color=DIM, italic=True, size=12), padding=20)
+            )
+        for b in backups:
+            backups_list.controls.append(ft.Container(
+                content=ft.Row([
+                    ft.Column([
+                        ft.Text(b["fecha"].strftime("%d/%m/%Y %H:%M"), color=TEXT, size=14, weight="bold"),
+                        ft.Text(f"{b['nombre']} · {b['tamano'] / 1024:,.0f} KB", color=DIM, size=12),
+                    ], spacing=2, expand=True),
+                    ft.TextButton("Restaurar", icon=ft.Icons.RESTORE,
+                                  on_click=lambda e, path=b["path"]: confirm_restore(path)),
+                ]),
+                padding=ft.padding.symmetric(horizontal=20, vertical=8),
+                border=ft.border.only(bottom=ft.border.BorderSide(1, BORDER)),
+            ))
+        if update:
+            page.update()
+
+    async def run_backup_job(job, ok_msg):
+        backup_progress.visible = True
+        page.update()
+        try:
+            await asyncio.wrap_future(job)
+            show_message(page, ok_msg, "green")
+        except Exception as ex:
+            show_message(page, f"Error en el respaldo: {ex}", "red")
+        finally:
+            backup_progress.visible = False
+            render_backups()
+
+    async def backup_now(e):
+        await run_backup_job(get_backup_manager(model).submit("manual"), "Respaldo creado y verificado.")
+
+    def confirm_restore(path):
+        async def proceed(e):
+            dlg.open = False
+            page.update()
+            job = get_backup_manager(model).submit_restore(path, model)
+            await run_backup_job(job, "Respaldo restaurado. El estado anterior quedó guardado como pre-restauración.")
+
+        dlg = ft.AlertDialog(
+            title=ft.Text("¿Restaurar respaldo?"),
+            content=ft.Text("Los datos actuales se reemplazarán por los del respaldo.\n"
+                            "Antes se guardará una copia del estado actual."),
+            actions=[ft.TextButton("Cancelar", on_click=lambda e: _close(dlg)),
+                     ft.ElevatedButton("Restaurar", bgcolor=EXPENSE, color="white", on_click=proceed)]
+        )
+        page.overlay.append(dlg)
+        dlg.open = True
+        page.update()
+
+    def _close(dlg):
+        dlg.open = False
+        page.update()
+
+    # ── Diagnóstico (tiempos por operación desde el arranque) ────────
+    diagnostics_list = ft.Column(spacing=0)
+
+    def render_diagnostics(update=True):
+        diagnostics_list.controls.clear()
+        filas = instrumentation.stats()
+        if not instrumentation.enabled and not filas:
+            mensaje = "La medición está apagada. Actívala y guarda para ver los tiempos."
+        elif not filas:
+            mensaje = "Todavía no hay operaciones medidas."
+        else:
+            mensaje = None
+        if mensaje:
+            diagnostics_list.controls.append(
+                ft.Container(ft.Text(mensaje, color=DIM, italic=True, size=12), padding=20)
+            )
+        for f in filas:
+            lenta = f["p95_ms"] >= instrumentation.slow_ms
+            diagnostics_list.controls.append(ft.Container(
+                content=ft.Row([
+                    ft.Column([
+                        ft.Text(f["operacion"], color=TEXT, size=14, weight="bold"),
+                        ft.Text(f"{f['llamadas']:,} llamadas · {f['consultas_prom']:.1f} consultas promedio · máx {f['max_ms']:,.1f} ms",
+                                color=DIM, size=12),
+                    ], spacing=2, expand=True),
+                    ft.Text(f"p50 {f['p50_ms']:,.1f} ms", color=TEXT, size=13, width=120),
+                    ft.Text(f"p95 {f['p95_ms']:,.1f} ms", color=EXPENSE if lenta else TEXT, size=13,
+                            weight="bold" if lenta else None, width=120),
+                ]),
+                padding=ft.padding.symmetric(horizontal=20, vertical=8),
+                border=ft.border.only(bottom=ft.border.BorderSide(1, BORDER)),
+            ))
+        if update:
+            page.update()
+
+    def reset_diagnostics(e):
+        instrumentation.reset()
+        render_diagnostics()
+
+    def open_slow_log(e):
+        os.makedirs(instrumentation.log_dir, exist_ok=True)
+        open_path(instrumentation.log_dir)
+
     # ── Helpers de UI ─────────────────────────────────────────────────
     def setting_row(label, description, control):
         return ft.Container(
@@ -103,8 +359,19 @@ def build_settings_view(page: ft.Page, model, on_theme_change=None):
     section_impresion = ft.Column([
         section_label("Formato de Ticket"),
         setting_row("Tamaño de impresora", "Ajustar según el hardware disponible", dd_impresora),
+        setting_row("Conexión", "ESC/POS directo imprime más rápido y con formato (negrita, corte, cajón)", dd_conexion),
+        setting_row("Destino", "Solo para ticketeras ESC/POS: IP[:puerto] o ruta del dispositivo", txt_destino),
+        setting_row("Prueba", "Imprime un ticket de prueba con la conexión elegida",
+                    ft.OutlinedButton(
+                        "Imprimir prueba",
+                        icon=ft.Icons.PRINT,
+                        style=ft.ButtonStyle(side=ft.BorderSide(1, "#555555"), color=TEXT, shape=ft.RoundedRectangleBorder(radius=6)),
+                        on_click=print_test
+                    )),
         section_label("Personalización"),
         setting_row("Mensaje de pie de página", "Texto que aparece al final del ticket", txt_pie_pagina),
+        section_label("Tickets no impresos"),
+        failed_jobs_list,
     ], spacing=0, scroll=ft.ScrollMode.AUTO)
 
     section_negocio = ft.Column([
@@ -127,12 +394,65 @@ def build_settings_view(page: ft.Page, model, on_theme_change=None):
                     "Abrir carpeta de datos",
                     icon=ft.Icons.FOLDER_OPEN,
                     style=ft.ButtonStyle(side=ft.BorderSide(1, "#555555"), color=TEXT, shape=ft.RoundedRectangleBorder(radius=6)),
-                    on_click=lambda e: subprocess.Popen(["open", os.path.expanduser("~/Documents/Digital_PyME")])
+                    on_click=lambda e: open_path(os.path.expanduser("~/Documents/Digital_PyME"))
                 )
             ]),
             padding=20
-        )
-    ], spacing=0)
+        ),
+        section_label("Respaldos automáticos"),
+        setting_row("Respaldar al cerrar caja", "Copia verificada de la base al cerrar cada turno, sin detener las ventas", sw_backup_auto),
+        setting_row("Compresión", "gzip funciona en todos los equipos; zstd es más rápido si está instalado", dd_compresion),
+        setting_row("Retención", "Se borran los respaldos más antiguos que excedan esta cantidad", txt_retener),
+        setting_row("Respaldo manual", "Crea un respaldo ahora en la carpeta de respaldos",
+                    ft.OutlinedButton(
+                        "Respaldar ahora",
+                        icon=ft.Icons.BACKUP,
+                        style=ft.ButtonStyle(side=ft.BorderSide(1, "#555555"), color=TEXT, shape=ft.RoundedRectangleBorder(radius=6)),
+                        on_click=backup_now
+                    )),
+        backup_progress,
+        backups_list,
+        section_label("Mantenimiento"),
+        setting_row("Saldos de clientes",
+                    "Recalcula las deudas desde el historial de movimientos y corrige diferencias",
+                    ft.OutlinedButton(
+                        "Verificar saldos",
+                        icon=ft.Icons.FACT_CHECK,
+                        style=ft.ButtonStyle(side=ft.BorderSide(1, "#555555"), color=TEXT, shape=ft.RoundedRectangleBorder(radius=6)),
+                        on_click=verify_balances
+                    )),
+        setting_row("Resúmenes de reportes",
+                    "Recalcula los totales diarios que usan los reportes desde las ventas, gastos y abonos",
+                    ft.OutlinedButton(
+                        "Reconstruir",
+                        icon=ft.Icons.REFRESH,
+                        style=ft.ButtonStyle(side=ft.BorderSide(1, "#555555"), color=TEXT, shape=ft.RoundedRectangleBorder(radius=6)),
+                        on_click=rebuild_rollups
+                    )),
+    ], spacing=0, scroll=ft.ScrollMode.AUTO)
+
+    section_diagnostico = ft.Column([
+        section_label("Medición de rendimiento"),
+        setting_row("Medir operaciones", "Registra el tiempo y las consultas de cada operación de la base (apagado no tiene costo)", sw_diag),
+        setting_row("Umbral de lentitud", "Operaciones más lentas que esto se anotan en el registro de consultas lentas", txt_umbral_ms),
+        setting_row("Umbral de consultas", "También se anotan las operaciones que ejecutan esta cantidad de consultas o más", txt_umbral_consultas),
+        setting_row("Registro de consultas lentas", "Archivo rotativo en la carpeta de datos (logs/consultas_lentas.log)",
+                    ft.OutlinedButton(
+                        "Abrir carpeta",
+                        icon=ft.Icons.FOLDER_OPEN,
+                        style=ft.ButtonStyle(side=ft.BorderSide(1, "#555555"), color=TEXT, shape=ft.RoundedRectangleBorder(radius=6)),
+                        on_click=open_slow_log
+                    )),
+        section_label("Tiempos desde el arranque"),
+        ft.Container(
+            content=ft.Row([
+                ft.TextButton("Actualizar", icon=ft.Icons.REFRESH, on_click=lambda e: render_diagnostics()),
+                ft.TextButton("Reiniciar", icon=ft.Icons.RESTART_ALT, on_click=reset_diagnostics),
+            ], alignment=ft.MainAxisAlignment.END),
+            padding=ft.padding.symmetric(horizontal=12),
+        ),
+        diagnostics_list,
+    ], spacing=0, scroll=ft.ScrollMode.AUTO)
 
     # ── Mapa de secciones ─────────────────────────────────────────────
     sections = [
@@ -140,6 +460,7 @@ def build_settings_view(page: ft.Page, model, on_theme_change=None):
         ("Apariencia",        section_apariencia),
         ("Impresión",         section_impresion),
         ("Respaldo",          section_respaldo),
+        ("Diagnóstico",       section_diagnostico),
     ]
 
     current_idx = [0]
@@ -165,6 +486,12 @@ def build_settings_view(page: ft.Page, model, on_theme_change=None):
         for i, btn in enumerate(nav_buttons):
             btn.style = style_active if i == idx else style_inactive
         content_area.content = sections[idx][1]
+        if sections[idx][1] is section_impresion:
+            render_failed_jobs(update=False)
+        elif sections[idx][1] is section_respaldo:
+            render_backups(update=False)
+        elif sections[idx][1] is section_diagnostico:
+            render_diagnostics(update=False)
         page.update()
 
     for i, (name, _) in enumerate(sections):
@@ -216,5 +543,7 @@ def build_settings_view(page: ft.Page, model, on_theme_change=None):
                 )
             ], spacing=12, expand=True, vertical_alignment=ft.CrossAxisAlignment.START)
         ], expand=True),
-        padding=20, expand=True, bgcolor=BG
+        padding=20, expand=True, bgcolor=BG,
+        # Al volver a la pestaña: tiempos al día si está abierto Diagnóstico
+        data=lambda: render_diagnostics(update=False) if content_area.content is section_diagnostico else None,
     )
@@ -0,0 +1,222 @@
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+
+_home_dir = os.path.expanduser("~")
+_data_dir = os.path.join(_home_dir, "Documents", "Digital_PyME")
+BACKUP_DIR = os.path.join(_data_dir, "respaldos")
+
+PREFIX = "respaldo_"
+EXTENSIONS = {None: ".sqlite", "gzip": ".sqlite.gz", "zstd": ".sqlite.zst"}
+
+
+class BackupError(Exception):
+    pass
+
+
+def _zstd():
+    """zstandard es opcional: si no está instalado se usa gzip."""
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+class BackupManager:
+    """
+    Respaldos en caliente de la base de datos con la API de backup de SQLite.
+
+    - La copia se hace en un solo paso: con WAL lee de una foto de la base y no bloquea a
+      los que escriben, así las ventas siguen registrándose mientras se respalda. (Por pasos,
+      SQLite reinicia la copia con cada escritura de otra conexión y con ventas continuas
+      podría no terminar nunca.)
+    - Cada respaldo se verifica con PRAGMA integrity_check y opcionalmente se comprime
+      (gzip, o zstd si está instalado el paquete zstandard).
+    - En la carpeta administrada se conservan los últimos `keep` respaldos.
+    - submit()/submit_restore() corren en un hilo propio y retornan un Future.
+    """
+
+    def __init__(self, db_path, backup_dir=BACKUP_DIR, keep=10, compression="gzip"):
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.compression = compression
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="backup")
+        self._lock = threading.Lock() # Un respaldo/restauración a la vez
+
+    # ------------------------------------------
+    # Respaldo
+    # ------------------------------------------
+    def submit(self, label="manual", **kwargs):
+        return self._pool.submit(self.create, label, **kwargs)
+
+    def create(self, label="manual", dest_dir=None, compression="default", progress=None):
+        """
+        Crea un respaldo y retorna su ruta.
+        dest_dir: carpeta destino (por defecto la administrada, que además rota).
+        progress: función opcional (fracción 0..1).
+        """
+        if compression == "default":
+            compression = self.compression
+        if compression == "zstd" and _zstd() is None:
+            compression = "gzip"
+        rotate = dest_dir is None
+        dest_dir = dest_dir or self.backup_dir
+        os.makedirs(dest_dir, exist_ok=True)
+
+        fecha = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        nombre = f"{PREFIX}{label}_{fecha}{EXTENSIONS[compression]}"
+        final_path = os.path.join(dest_dir, nombre)
+
+        with self._lock:
+            fd, raw_path = tempfile.mkstemp(suffix=".sqlite", dir=dest_dir)
+            os.close(fd)
+            try:
+                self._copy(self.db_path, raw_path, progress)
+                self._check_integrity(raw_path)
+                self._compress(raw_path, final_path, compression)
+            finally:
+                if os.path.exists(raw_path):
+                    os.remove(raw_path)
+            if rotate:
+                self.rotate()
+        return final_path
+
+    @staticmethod
+    def _copy(src_path, dst_path, progress=None):
+        src = sqlite3.connect(src_path)
+        dst = sqlite3.connect(dst_path)
+        try:
+            src.backup(dst, pages=-1)
+            if progress:
+                progress(1.0)
+        finally:
+            dst.close()
+            src.close()
+
+    @staticmethod
+    def _check_integrity(path):
+        conn = sqlite3.connect(path)
+        try:
+            resultado = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        finally:
+            conn.close()
+        if resultado != "ok":
+            raise BackupError(f"El respaldo no pasó la verificación de integridad: {resultado}")
+
+    @staticmethod
+    def _compress(raw_path, final_path, compression):
+        tmp_path = final_path + ".tmp"
+        if compression is None:
+            shutil.copyfile(raw_path, tmp_path)
+        elif compression == "gzip":
+            with open(raw_path, "rb") as src, gzip.open(tmp_path, "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst)
+        else:
+            zstd = _zstd()
+            with open(raw_path, "rb") as src, open(tmp_path, "wb") as dst:
+                zstd.ZstdCompressor(level=10).copy_stream(src, dst)
+        os.replace(tmp_path, final_path)
+
+    # ------------------------------------------
+    # Listado y rotación
+    # ------------------------------------------
+    def list_backups(self):
+        """Respaldos de la carpeta administrada, del más reciente al más antiguo."""
+        if not os.path.isdir(self.backup_dir):
+            return []
+        backups = []
+        for nombre in os.listdir(self.backup_dir):
+            if not nombre.startswith(PREFIX) or not nombre.endswith(tuple(EXTENSIONS.values())):
+                continue
+            path = os.path.join(self.backup_dir, nombre)
+            stat = os.stat(path)
+            backups.append({"path": path, "nombre": nombre, "tamano": stat.st_size,
+                            "fecha": datetime.fromtimestamp(stat.st_mtime)})
+        backups.sort(key=lambda b: (b["fecha"], b["nombre"]), reverse=True)
+        return backups
+
+    def rotate(self):
+        """Borra los respaldos más antiguos que excedan `keep`. Retorna cuántos borró."""
+        viejos = self.list_backups()[self.keep:]
+        for b in viejos:
+            os.remove(b["path"])
+        return len(viejos)
+
+    # ------------------------------------------
+    # Restauración
+    # ------------------------------------------
+    def submit_restore(self, backup_path, model=None):
+        return self._pool.submit(self.restore, backup_path, model)
+
+    def restore(self, backup_path, model=None):
+        """
+        Restaura un respaldo sobre la base activa (sin cerrar la app).
+        Antes se guarda un respaldo "pre-restauracion" del estado actual.
+        model: InventarioModel o AsyncModel abierto sobre la base. Se esperan sus operaciones
+        en curso, se cierran todas sus conexiones antes de copiar y al terminar se reabre
+        (migraciones incluidas) con los caches descartados.
+        """
+        fd, raw_path = tempfile.mkstemp(suffix=".sqlite")
+        os.close(fd)
+        try:
+            self._decompress(backup_path, raw_path)
+            self._check_integrity(raw_path)
+            self.create("pre-restauracion")
+            # AsyncModel: las colas db/db-reports quedan en espera mientras se reemplaza la base
+            pausa = model.exclusive() if hasattr(model, "exclusive") else nullcontext()
+            with self._lock, pausa:
+                if model is not None:
+                    model.db.close()
+                self._copy(raw_path, self.db_path)
+                if model is not None:
+                    model.reload_after_restore()
+        finally:
+            os.remove(raw_path)
+        return backup_path
+
+    @staticmethod
+    def _decompress(backup_path, raw_path):
+        with open(raw_path, "wb") as dst:
+            if backup_path.endswith(".gz"):
+                with gzip.open(backup_path, "rb") as src:
+                    shutil.copyfileobj(src, dst)
+            elif backup_path.endswith(".zst"):
+                zstd = _zstd()
+                if zstd is None:
+                    raise BackupError("Para restaurar un respaldo .zst se necesita el paquete zstandard.")
+                with open(backup_path, "rb") as src:
+                    zstd.ZstdDecompressor().copy_stream(src, dst)
+            else:
+                with open(backup_path, "rb") as src:
+                    shutil.copyfileobj(src, dst)
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+
+_managers = {}
+
+
+def get_backup_manager(model):
+    """
+    Administrador de respaldos de la base del modelo (uno por base: los respaldos se
+    serializan en su hilo), con la retención y compresión de la configuración.
+    """
+    manager = _managers.get(model.db_name)
+    if manager is None:
+        manager = _managers[model.db_name] = BackupManager(model.db_name)
+    try:
+        manager.keep = max(1, int(model.get_config("backup_retener", "10")))
+    except (TypeError, ValueError):
+        manager.keep = 10
+    compresion = model.get_config("backup_compresion", "gzip")
+    manager.compression = compresion if compresion in ("gzip", "zstd") else None
+    return manager
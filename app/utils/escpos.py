@@ -0,0 +1,171 @@
+import socket
+
+from app.utils.printer_helper import (
+    ESTILO_CAJON, ESTILO_CORTE, ESTILO_NEGRITA, ESTILO_TITULO, ESTILO_TOTAL,
+    ejecutar_con_timeout, enviar_a_impresora,
+)
+
+# --- Comandos ESC/POS (subconjunto común a Epson y clones de 58/80mm) ---
+ESC = b"\x1b"
+GS = b"\x1d"
+
+INIT = ESC + b"@"
+CODEPAGE_CP850 = ESC + b"t\x02"            # Tabla PC850 (multilingüe, tiene ñ y tildes)
+BOLD_ON = ESC + b"E\x01"
+BOLD_OFF = ESC + b"E\x00"
+DOUBLE_HEIGHT_ON = GS + b"!\x01"           # Doble alto, mismo ancho: no cambia las columnas
+DOUBLE_HEIGHT_OFF = GS + b"!\x00"
+CUT = GS + b"V\x42\x00"                    # Avanza hasta la guillotina y corte parcial
+DRAWER_KICK = ESC + b"p\x00\x19\xfa"       # Pulso en el pin 2 (cajón estándar)
+
+LF = b"\n"
+
+
+class EscPosEncoder:
+    """
+    Arma los bytes ESC/POS de un ticket.
+
+    Uso: EscPosEncoder().line("TOTAL", bold=True, double=True).cut().encode()
+    """
+
+    def __init__(self, encoding="cp850"):
+        self.encoding = encoding
+        self._buffer = bytearray(INIT + CODEPAGE_CP850)
+
+    def line(self, texto, bold=False, double=False):
+        if bold:
+            self._buffer += BOLD_ON
+        if double:
+            self._buffer += DOUBLE_HEIGHT_ON
+        self._buffer += texto.encode(self.encoding, errors="replace") + LF
+        if double:
+            self._buffer += DOUBLE_HEIGHT_OFF
+        if bold:
+            self._buffer += BOLD_OFF
+        return self
+
+    def feed(self, lineas=1):
+        self._buffer += LF * lineas
+        return self
+
+    def cut(self):
+        self._buffer += CUT
+        return self
+
+    def kick_drawer(self):
+        self._buffer += DRAWER_KICK
+        return self
+
+    def encode(self):
+        return bytes(self._buffer)
+
+
+def ticket_a_escpos(ticket, encoding="cp850"):
+    """Convierte un ticket (texto o lista de [texto, estilo]) a bytes ESC/POS."""
+    if isinstance(ticket, str):
+        ticket = [[texto, None] for texto in ticket.split("\n")]
+    enc = EscPosEncoder(encoding)
+    for texto, estilo in ticket:
+        if estilo == ESTILO_CORTE:
+            enc.feed(3).cut()
+        elif estilo == ESTILO_CAJON:
+            enc.kick_drawer()
+        else:
+            grande = estilo in (ESTILO_TITULO, ESTILO_TOTAL)
+            enc.line(texto, bold=grande or estilo == ESTILO_NEGRITA, double=grande)
+    return enc.encode()
+
+
+# ------------------------------------------
+# Transportes: reciben los bytes ya codificados
+# ------------------------------------------
+class FileTransport:
+    """Dispositivo o archivo (p.ej. /dev/usb/lp0, o un puerto COM/LPT compartido en Windows)."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, data, timeout=None):
+        # Sin papel, apagada o desconectada, open()/write() pueden bloquearse para siempre
+        ejecutar_con_timeout(lambda: self._write(data), timeout, f"La impresora ({self.path})")
+
+    def _write(self, data):
+        with open(self.path, "wb") as f:
+            f.write(data)
+
+
+class NetworkTransport:
+    """Impresora de red en modo RAW (puerto 9100, JetDirect)."""
+
+    def __init__(self, host, port=9100):
+        self.host = host
+        self.port = port
+
+    def write(self, data, timeout=5):
+        with socket.create_connection((self.host, self.port), timeout=timeout) as conn:
+            conn.sendall(data)
+
+
+class LoopbackTransport:
+    """Guarda los bytes en memoria en vez de imprimir (pruebas y diagnóstico)."""
+
+    def __init__(self):
+        self.jobs = []
+
+    def write(self, data, timeout=None):
+        self.jobs.append(data)
+
+
+class EscPosPrinter:
+    """Backend de impresión: codifica el ticket a ESC/POS y lo envía por el transporte."""
+
+    def __init__(self, transport, encoding="cp850"):
+        self.transport = transport
+        self.encoding = encoding
+
+    def send(self, ticket, timeout=15):
+        self.transport.write(ticket_a_escpos(ticket, self.encoding), timeout=timeout)
+
+
+# Valores de la configuración "impresora_conexion"
+CONEXION_SISTEMA = "sistema"
+CONEXION_RED = "red"
+CONEXION_DISPOSITIVO = "dispositivo"
+
+
+def parse_destino_red(destino):
+    """
+    "host[:puerto]" -> (host, puerto). Sin puerto se usa 9100 (RAW/JetDirect).
+    Lanza ValueError con un mensaje para el usuario si el valor no es válido.
+    """
+    host, sep, port = (destino or "").strip().partition(":")
+    host, port = host.strip(), port.strip()
+    if not host:
+        raise ValueError("Indica la IP o el nombre de la impresora (ej: 192.168.1.50:9100).")
+    if not sep or not port:
+        return host, 9100
+    if not port.isdigit() or not 0 < int(port) < 65536:
+        raise ValueError(f"Puerto inválido '{port}': debe ser un número entre 1 y 65535.")
+    return host, int(port)
+
+
+def crear_backend(get_config):
+    """
+    Arma la función de envío según la configuración guardada:
+    - impresora_conexion: "sistema" (cola del sistema operativo, texto plano),
+      "red" (ESC/POS por TCP) o "dispositivo" (ESC/POS a un archivo de dispositivo);
+    - impresora_destino: "host[:puerto]" para red, ruta para dispositivo.
+    """
+    conexion = get_config("impresora_conexion", CONEXION_SISTEMA)
+    destino = (get_config("impresora_destino", "") or "").strip()
+    if conexion == CONEXION_RED and destino:
+        try:
+            host, port = parse_destino_red(destino)
+        except ValueError as e:
+            # Un valor guardado inválido no debe impedir el arranque: se imprime por el sistema
+            print(f"Destino de impresora inválido ({destino!r}): {e} Se usa la impresora del sistema.")
+            return enviar_a_impresora
+        return EscPosPrinter(NetworkTransport(host, port)).send
+    if conexion == CONEXION_DISPOSITIVO and destino:
+        return EscPosPrinter(FileTransport(destino)).send
+    return enviar_a_impresora
@@ -1,3 +1,7 @@
+import os
+import platform
+import subprocess
+
 import flet as ft
 
 def is_mobile(page: ft.Page):
@@ -9,3 +13,13 @@ def show_message(page: ft.Page, msg, color="blue"):
     snack = ft.SnackBar(ft.Text(msg, color="white"), bgcolor=color, open=True)
     page.overlay.append(snack)
     page.update()
+
+def open_path(path):
+    """Abre un archivo o carpeta con la aplicación predeterminada del sistema."""
+    sistema = platform.system()
+    if sistema == "Windows":
+        os.startfile(path)
+    elif sistema == "Darwin":
+        subprocess.Popen(["open", path])
+    else:
+        subprocess.Popen(["xdg-open", path])
@@ -9,7 +9,7 @@ from reportlab.lib.units import cm
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable
+    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable, Frame, PageTemplate
 )
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
 
@@ -26,7 +26,48 @@ BLACK  = colors.black
 
 W, H = A4  # 21 x 29.7 cm
 
-def generate_report_pdf(report_data: dict, output_path: str) -> str:
+# Filas por tabla del historial de ventas: varias tablas chicas en vez de una gigante
+# (partir una tabla enorme entre páginas es muy lento en platypus).
+SALES_CHUNK = 200
+
+
+class StreamingDocTemplate(SimpleDocTemplate):
+    """
+    SimpleDocTemplate que toma los flowables de un generador: los bloques del historial
+    se arman (y se leen de la BD) de a uno, sin tener el reporte completo en memoria.
+    Maqueta con handle_flowable() sobre una lista propia que se rellena desde el
+    generador, en vez de depender de cómo build() recorre la lista que recibe.
+    """
+
+    LOOKAHEAD = 4  # handle_keepWithNext mira los flowables siguientes
+
+    def build_stream(self, source):
+        self._calc()
+        frame = Frame(self.leftMargin, self.bottomMargin, self.width, self.height, id="normal")
+        self.addPageTemplates([PageTemplate(id="First", frames=frame, pagesize=self.pagesize),
+                               PageTemplate(id="Later", frames=frame, pagesize=self.pagesize)])
+        source = iter(source)
+        pending = []
+        self._startBuild()
+        canv = self.canv
+        canv._doctemplate = self
+        try:
+            while True:
+                while len(pending) < self.LOOKAHEAD:
+                    flowable = next(source, None)
+                    if flowable is None:
+                        break
+                    pending.append(flowable)
+                if not pending:
+                    break
+                self.clean_hanging()
+                self.handle_flowable(pending)   # Consume (o parte) el primero de la lista
+        finally:
+            del canv._doctemplate
+        self._endBuild()
+
+
+def generate_report_pdf(report_data: dict, output_path: str, progress=None) -> str:
     """
     Genera el PDF con los datos del reporte y lo guarda en output_path.
     Retorna la ruta del archivo generado.
@@ -37,19 +78,25 @@ def generate_report_pdf(report_data: dict, output_path: str) -> str:
       - flujo_entradas, total_fiado, total_abonos (float)
       - tx_count, exp_count (int)
       - top_products: list[tuple(name, qty)]
-      - sales_history: list[tuple(id, fecha, total, pago)]
-      - expenses_history: list[tuple(id, desc, monto, fecha)]
+      - sales_history: list[tuple(id, fecha, total, pago)], o bien
+        sales_pages: iterable de listas de esas tuplas (se consume por bloques)
       - clients_debt: list[dict{nombre, alias, saldo_actual}]
+
+    progress: función opcional (fracción 0..1) llamada mientras se escribe el historial.
     """
-    doc = SimpleDocTemplate(
+    doc = StreamingDocTemplate(
         output_path,
         pagesize=A4,
         leftMargin=1.5*cm, rightMargin=1.5*cm,
         topMargin=1.5*cm, bottomMargin=1.5*cm
     )
+    doc.build_stream(_story(report_data, progress))
+    return output_path
+
 
+def _story(report_data, progress=None):
+    """Genera los flowables del reporte en orden."""
     styles = getSampleStyleSheet()
-    story  = []
 
     def S(name, **kw):
         return ParagraphStyle(name, parent=styles["Normal"], **kw)
@@ -62,16 +109,16 @@ def generate_report_pdf(report_data: dict, output_path: str) -> str:
     note_style    = S("Note", fontSize=8, textColor=GRAY, italic=True, spaceBefore=8)
 
     # ── Encabezado ───────────────────────────────────────────────────────────
-    story.append(Paragraph("Digital PyME — Reporte Financiero", title_style))
-    story.append(Paragraph(
+    yield Paragraph("Digital PyME — Reporte Financiero", title_style)
+    yield (Paragraph(
         f"Período: {report_data.get('start_date','')}  →  {report_data.get('end_date','')}   |   "
         f"Generado el {datetime.date.today().strftime('%d/%m/%Y')}",
         sub_style
     ))
-    story.append(HRFlowable(width="100%", thickness=1, color=DARK, spaceAfter=8))
+    yield HRFlowable(width="100%", thickness=1, color=DARK, spaceAfter=8)
 
     # ── Métricas principales ─────────────────────────────────────────────────
-    story.append(Paragraph("Métricas generales", section_style))
+    yield Paragraph("Métricas generales", section_style)
 
     ventas  = report_data.get("total_ventas", 0)
     gastos  = report_data.get("total_gastos", 0)
@@ -109,15 +156,15 @@ def generate_report_pdf(report_data: dict, output_path: str) -> str:
     ])
     m_table = Table(m_data, colWidths=[1*cm, 9*cm, 5.5*cm])
     m_table.setStyle(m_style)
-    story.append(m_table)
-    story.append(Paragraph(f"Total transacciones: {tx}", note_style))
-    story.append(Spacer(1, 0.4*cm))
+    yield m_table
+    yield Paragraph(f"Total transacciones: {tx}", note_style)
+    yield Spacer(1, 0.4*cm)
 
     # ── Top productos ────────────────────────────────────────────────────────
     tops = report_data.get("top_products", [])
     if tops:
-        story.append(HRFlowable(width="100%", thickness=0.5, color=GRAY, spaceAfter=4))
-        story.append(Paragraph("Top productos (últimos 30 días)", section_style))
+        yield HRFlowable(width="100%", thickness=0.5, color=GRAY, spaceAfter=4)
+        yield Paragraph("Top productos (últimos 30 días)", section_style)
         tp_data = [["#", "Producto", "Unidades vendidas"]]
         for i, (name, qty) in enumerate(tops, 1):
             tp_data.append([str(i), name, str(qty)])
@@ -137,20 +184,20 @@ def generate_report_pdf(report_data: dict, output_path: str) -> str:
         ])
         tp_table = Table(tp_data, colWidths=[1*cm, 10*cm, 4.5*cm])
         tp_table.setStyle(tp_style)
-        story.append(tp_table)
-        story.append(Spacer(1, 0.4*cm))
+        yield tp_table
+        yield Spacer(1, 0.4*cm)
 
     # ── Historial de ventas ──────────────────────────────────────────────────
-    sales = report_data.get("sales_history", [])
-    if sales:
-        story.append(HRFlowable(width="100%", thickness=0.5, color=GRAY, spaceAfter=4))
-        story.append(Paragraph(f"Historial de ventas ({len(sales)} registros)", section_style))
-        sv_data = [["#Venta", "Fecha", "Total", "Método"]]
-        for s in sales:
-            s_id, s_fecha, s_total, s_pago = s[0], s[1], s[2], (s[3] if len(s) >= 4 else "EFECTIVO")
-            dp = s_fecha.split("T")[0] if "T" in s_fecha else s_fecha
-            tp_str = s_fecha.split("T")[1][:5] if "T" in s_fecha else ""
-            sv_data.append([f"#{s_id}", f"{dp} {tp_str}", f"${s_total:,.0f}", s_pago or "EFECTIVO"])
+    sales_pages = report_data.get("sales_pages")
+    if sales_pages is None:
+        sales = report_data.get("sales_history", [])
+        sales_pages = [sales[i:i + SALES_CHUNK] for i in range(0, len(sales), SALES_CHUNK)]
+        total_sales = len(sales)
+    else:
+        total_sales = report_data.get("tx_count", 0)
+    if total_sales:
+        yield HRFlowable(width="100%", thickness=0.5, color=GRAY, spaceAfter=4)
+        yield Paragraph(f"Historial de ventas ({total_sales} registros)", section_style)
         sv_style = TableStyle([
             ("BACKGROUND",  (0,0), (-1,0), DARK),
             ("TEXTCOLOR",   (0,0), (-1,0), WHITE),
@@ -164,16 +211,29 @@ def generate_report_pdf(report_data: dict, output_path: str) -> str:
             ("ALIGN",       (2,0), (2,-1), "RIGHT"),
             ("TEXTCOLOR",   (2,1), (2,-1), GREEN),
         ])
-        sv_table = Table(sv_data, colWidths=[2*cm, 4.5*cm, 4*cm, 5*cm])
-        sv_table.setStyle(sv_style)
-        story.append(sv_table)
-        story.append(Spacer(1, 0.4*cm))
+        written = 0
+        for chunk in sales_pages:
+            if not chunk:
+                continue
+            sv_data = [["#Venta", "Fecha", "Total", "Método"]]
+            for s in chunk:
+                s_id, s_fecha, s_total, s_pago = s[0], s[1], s[2], (s[3] if len(s) >= 4 else "EFECTIVO")
+                dp = s_fecha.split("T")[0] if "T" in s_fecha else s_fecha
+                tp_str = s_fecha.split("T")[1][:5] if "T" in s_fecha else ""
+                sv_data.append([f"#{s_id}", f"{dp} {tp_str}", f"${s_total:,.0f}", s_pago or "EFECTIVO"])
+            sv_table = Table(sv_data, colWidths=[2*cm, 4.5*cm, 4*cm, 5*cm], repeatRows=1)
+            sv_table.setStyle(sv_style)
+            yield sv_table
+            written += len(chunk)
+            if progress:
+                progress(min(written / total_sales, 1.0))
+        yield Spacer(1, 0.4*cm)
 
     # ── Fiados pendientes ────────────────────────────────────────────────────
     fiados = report_data.get("clients_debt", [])
     if fiados:
-        story.append(HRFlowable(width="100%", thickness=0.5, color=GRAY, spaceAfter=4))
-        story.append(Paragraph(f"Fiados pendientes ({len(fiados)} clientes)", section_style))
+        yield HRFlowable(width="100%", thickness=0.5, color=GRAY, spaceAfter=4)
+        yield Paragraph(f"Fiados pendientes ({len(fiados)} clientes)", section_style)
         fd_data = [["Cliente", "Alias", "Deuda"]]
         for c in fiados:
             fd_data.append([c.get("nombre",""), c.get("alias","") or "—", f"${c.get('saldo_actual',0):,.0f}"])
@@ -193,16 +253,14 @@ def generate_report_pdf(report_data: dict, output_path: str) -> str:
         ])
         fd_table = Table(fd_data, colWidths=[7*cm, 6*cm, 2.5*cm])
         fd_table.setStyle(fd_style)
-        story.append(fd_table)
+        yield fd_table
 
     # ── Pie de página ────────────────────────────────────────────────────────
-    story.append(Spacer(1, 0.6*cm))
-    story.append(HRFlowable(width="100%", thickness=0.5, color=GRAY))
-    story.append(Paragraph(
+    yield Spacer(1, 0.6*cm)
+    yield HRFlowable(width="100%", thickness=0.5, color=GRAY)
+    yield (Paragraph(
         'Nota: "Efectivo real en caja" considera ventas en efectivo + abonos, descontando ventas al fiado. '
         'Reporte generado automáticamente por Digital PyME.',
         note_style
     ))
 
-    doc.build(story)
-    return output_path
@@ -0,0 +1,179 @@
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from app.utils.printer_helper import ejecutar_con_timeout, enviar_a_impresora
+
+_home_dir = os.path.expanduser("~")
+_data_dir = os.path.join(_home_dir, "Documents", "Digital_PyME")
+FAILED_JOBS_FILE = os.path.join(_data_dir, "impresiones_fallidas.json")
+
+
+class PrintSpooler:
+    """
+    Cola de impresión en segundo plano.
+
+    - submit() encola el ticket y retorna al instante: la venta no espera a la impresora.
+    - Un hilo worker envía los trabajos en orden, con timeout y reintentos con
+      backoff exponencial (backoff, 2*backoff, 4*backoff...). Cada envío tiene además
+      un plazo propio (timeout + DEADLINE_MARGIN): un backend que ignore su timeout
+      no deja la cola trabada.
+    - Los trabajos que agotan los reintentos (o no caben en la cola) se guardan en
+      un JSON para reimprimirlos desde Configuración > Impresión.
+    """
+
+    MAX_QUEUE = 20
+    MAX_FAILED = 50
+    DEADLINE_MARGIN = 2.0   # segundos extra para que el timeout del backend salte primero
+
+    def __init__(self, send=None, failed_path=FAILED_JOBS_FILE, retries=3, backoff=1.0, timeout=15):
+        self.send = send or enviar_a_impresora
+        self.failed_path = failed_path
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self._queue = queue.Queue(maxsize=self.MAX_QUEUE)
+        self._lock = threading.Lock()
+        self._failed = None       # se carga del disco la primera vez que se usa
+        self._worker = None
+        self._listeners = []
+
+    # ------------------------------------------
+    # API
+    # ------------------------------------------
+    def submit(self, ticket, venta_id=None):
+        """
+        Encola un ticket (texto o lista de [texto, estilo], ver generar_ticket_lineas).
+        Retorna el trabajo (dict); si la cola está llena queda como fallido.
+        """
+        job = {"id": uuid.uuid4().hex[:8], "venta_id": venta_id, "ticket": ticket,
+               "creado": datetime.now().isoformat(timespec="seconds"), "intentos": 0, "error": None}
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self._fail(job, "Cola de impresión llena")
+        return job
+
+    def failed_jobs(self):
+        """Trabajos fallidos, del más reciente al más antiguo."""
+        with self._lock:
+            return list(reversed(self._load_failed()))
+
+    def reprint(self, job_id):
+        """Saca un trabajo de la lista de fallidos y lo vuelve a encolar."""
+        job = self._pop_failed(job_id)
+        if job is None:
+            return None
+        return self.submit(job["ticket"], venta_id=job["venta_id"])
+
+    def discard(self, job_id):
+        return self._pop_failed(job_id) is not None
+
+    def set_backend(self, send):
+        """Cambia la función de envío (ver crear_backend en app/utils/escpos.py)."""
+        self.send = send or enviar_a_impresora
+
+    def subscribe(self, callback):
+        """callback(job, ok) se llama desde el hilo worker al terminar cada trabajo."""
+        self._listeners.append(callback)
+
+    def wait_idle(self, timeout=None):
+        """Espera a que la cola se vacíe (útil en pruebas y al cerrar la app)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    # ------------------------------------------
+    # Worker
+    # ------------------------------------------
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="print-spooler", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                ok = self._print(job)
+                for callback in list(self._listeners):
+                    try:
+                        callback(job, ok)
+                    except Exception as e:
+                        print(f"[PrintSpooler] Error en listener: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _print(self, job):
+        for intento in range(self.retries):
+            job["intentos"] += 1
+            try:
+                send = self.send
+                ejecutar_con_timeout(lambda: send(job["ticket"], timeout=self.timeout),
+                                     self.timeout + self.DEADLINE_MARGIN)
+                return True
+            except Exception as e:
+                job["error"] = str(e) or type(e).__name__
+                if intento < self.retries - 1:
+                    time.sleep(self.backoff * (2 ** intento))
+        print(f"[PrintSpooler] Ticket {job['venta_id']} no impreso: {job['error']}")
+        self._fail(job, job["error"])
+        return False
+
+    # ------------------------------------------
+    # Persistencia de fallidos
+    # ------------------------------------------
+    def _fail(self, job, error):
+        job["error"] = error
+        with self._lock:
+            failed = self._load_failed()
+            failed.append(job)
+            del failed[:-self.MAX_FAILED]
+            self._save_failed()
+
+    def _pop_failed(self, job_id):
+        with self._lock:
+            failed = self._load_failed()
+            for i, job in enumerate(failed):
+                if job["id"] == job_id:
+                    del failed[i]
+                    self._save_failed()
+                    return job
+        return None
+
+    def _load_failed(self):
+        if self._failed is None:
+            self._failed = []
+            if self.failed_path and os.path.exists(self.failed_path):
+                try:
+                    with open(self.failed_path, "r", encoding="utf-8") as f:
+                        self._failed = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"[PrintSpooler] No se pudo leer {self.failed_path}: {e}")
+        return self._failed
+
+    def _save_failed(self):
+        if not self.failed_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.failed_path), exist_ok=True)
+            tmp = self.failed_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._failed, f, ensure_ascii=False)
+            os.replace(tmp, self.failed_path)
+        except OSError as e:
+            print(f"[PrintSpooler] No se pudo guardar {self.failed_path}: {e}")
+
+
+# Instancia global para fácil acceso (el hilo se inicia con el primer ticket)
+print_spooler = PrintSpooler()
@@ -1,106 +1,282 @@
 import os
 import platform
+import subprocess
+import tempfile
+import threading
+import time
 from datetime import datetime
 
+from app.data.cart import CartSnapshot
 
-def generar_ticket_texto(venta_id, carrito, total, medio_pago, descuento=0, 
-                         nombre_local="S.O.S DIGITAL PYME", 
-                         rut_local="", 
-                         direccion_local="",
-                         telefono_local="",
-                         tipo_impresora="58mm",
-                         mensaje_pie="¡Gracias por su preferencia!"):
 
+# Estilos de línea del ticket. Los backends de texto plano los ignoran;
+# el backend ESC/POS (app/utils/escpos.py) los traduce a comandos.
+ESTILO_TITULO = "titulo"   # negrita + doble alto
+ESTILO_TOTAL = "total"     # negrita + doble alto
+ESTILO_NEGRITA = "negrita"
+ESTILO_CORTE = "corte"     # avance de papel + guillotina
+ESTILO_CAJON = "cajon"     # pulso para abrir el cajón (no imprime nada)
+
+
+class TicketTemplate:
     """
-    Genera el texto formateado adaptándose a ticketeras de 58mm o 80mm.
+    Plantilla de ticket para un negocio y ancho de impresora.
+
+    El encabezado y el pie (datos del local, separadores, mensaje) se arman una sola vez;
+    render() solo formatea el número, la fecha, los ítems y los totales de cada venta.
     """
-    # Configuramos el ancho y los espacios según la impresora
-    if tipo_impresora == "80mm":
-        ancho = 48
-        largo_nombre = 26
-        formato_encabezado = "CANT   DESCRIPCION                      TOTAL"
-    else: # Por defecto 58mm
-        ancho = 32
-        largo_nombre = 14
-        formato_encabezado = "CANT  DESCRIPCION       TOTAL"
-
-    ticket = []
-    
-    # --- 1. ENCABEZADO ---
-    ticket.append("=" * ancho)
-    ticket.append(nombre_local.upper().center(ancho))
-    
-    if rut_local: ticket.append(rut_local.center(ancho))
-    if direccion_local: ticket.append(direccion_local.center(ancho))
-    if telefono_local: ticket.append(f"Tel: {telefono_local}".center(ancho))
-        
-    ticket.append("=" * ancho)
-    ticket.append("Comprobante Interno de Venta".center(ancho))
-    ticket.append(f"Ticket Nro: {venta_id}")
-    ticket.append(f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
-    ticket.append("-" * ancho)
-    
-    # --- 2. DETALLE DE PRODUCTOS ---
-    ticket.append(formato_encabezado)
-    for pid, item in carrito.items():
-        nombre = item['info'][1][:largo_nombre] # Cortamos el nombre según el ancho disponible
-        qty = item['qty']
-        precio = item['info'][2]
-        subtotal = qty * precio
-        
-        # Ajustamos los espacios dinámicamente
+
+    def __init__(self, nombre_local="S.O.S DIGITAL PYME",
+                 rut_local="",
+                 direccion_local="",
+                 telefono_local="",
+                 tipo_impresora="58mm",
+                 mensaje_pie="¡Gracias por su preferencia!"):
+        # Configuramos el ancho y los espacios según la impresora
         if tipo_impresora == "80mm":
-            linea = f"{qty:<5g} {nombre:<27} ${subtotal:>10,.0f}"
+            ancho = 48
+            self.largo_nombre = 26
+            self.formato_item = "{qty:<5g} {nombre:<27} ${subtotal:>10,.0f}"
+            formato_encabezado = "CANT   DESCRIPCION                      TOTAL"
+        else: # Por defecto 58mm
+            ancho = 32
+            self.largo_nombre = 14
+            self.formato_item = "{qty:<3g} {nombre:<15} ${subtotal:>8,.0f}"
+            formato_encabezado = "CANT  DESCRIPCION       TOTAL"
+        self.ancho = ancho
+
+        # --- 1. ENCABEZADO ---
+        cabecera = [["=" * ancho, None], [(nombre_local or "").upper().center(ancho), ESTILO_TITULO]]
+        if rut_local: cabecera.append([rut_local.center(ancho), None])
+        if direccion_local: cabecera.append([direccion_local.center(ancho), None])
+        if telefono_local: cabecera.append([f"Tel: {telefono_local}".center(ancho), None])
+        cabecera.append(["=" * ancho, None])
+        cabecera.append(["Comprobante Interno de Venta".center(ancho), None])
+        self.cabecera = cabecera
+        self.columnas = [["-" * ancho, None], [formato_encabezado, None]]
+
+        # --- 4. PIE DE PÁGINA ---
+        self.pie = [
+            ["=" * ancho, None],
+            [(mensaje_pie or "").center(ancho), None],
+            ["Vuelva pronto".center(ancho), None],
+            ["\n\n\n\n\n", ESTILO_CORTE], # Saltos de línea para la guillotina
+        ]
+
+    def render(self, venta_id, carrito, total, medio_pago, descuento=0, fecha=None):
+        """Ticket de una venta del carrito (CartSnapshot, o {id: {'info': producto, 'qty': n}})."""
+        if isinstance(carrito, CartSnapshot):
+            items = ((l.info[1], l.qty, l.info[2]) for l in carrito.lines)
         else:
-            linea = f"{qty:<3g} {nombre:<15} ${subtotal:>8,.0f}"
-            
-        ticket.append(linea)
-        
-    ticket.append("-" * ancho)
-    
-    # --- 3. TOTALES ---
-    if descuento > 0:
-        ticket.append(f"Descuento:".ljust(ancho - 10) + f"{descuento:>8}%")
-        
-    ticket.append(f"TOTAL A PAGAR:".ljust(ancho - 12) + f"${total:>10,.0f}")
-    ticket.append(f"Medio de Pago:".ljust(ancho - 12) + f"{medio_pago:>12}")
-    ticket.append("=" * ancho)
-    
-    # --- 4. PIE DE PÁGINA ---
-    ticket.append(mensaje_pie.center(ancho))
-    ticket.append("Vuelva pronto".center(ancho))
-    ticket.append("\n\n\n\n\n") # Saltos de línea para la guillotina
-    
-    return "\n".join(ticket)
+            items = ((item['info'][1], item['qty'], item['info'][2]) for item in carrito.values())
+        return self.render_items(venta_id, items, total, medio_pago, descuento, fecha)
 
+    def render_items(self, venta_id, items, total, medio_pago, descuento=0, fecha=None, cajon=True):
+        """
+        Ticket a partir de ítems (nombre, cantidad, precio_unitario).
+        fecha: datetime o ISO string; por defecto, ahora.
+        cajon: en ventas en efectivo agrega el pulso de apertura del cajón.
+        """
+        if fecha is None:
+            fecha = datetime.now()
+        elif isinstance(fecha, str):
+            fecha = datetime.fromisoformat(fecha)
+        ancho = self.ancho
+
+        ticket = list(self.cabecera)
+        ticket.append([f"Ticket Nro: {venta_id}", ESTILO_NEGRITA])
+        ticket.append([f"Fecha: {fecha.strftime('%d/%m/%Y %H:%M')}", None])
+        ticket.extend(self.columnas)
+
+        # --- 2. DETALLE DE PRODUCTOS ---
+        formato, largo = self.formato_item, self.largo_nombre
+        for nombre, qty, precio in items:
+            # Cortamos el nombre según el ancho disponible
+            ticket.append([formato.format(qty=qty, nombre=nombre[:largo], subtotal=qty * precio), None])
+        ticket.append(["-" * ancho, None])
+
+        # --- 3. TOTALES ---
+        if descuento > 0:
+            ticket.append([f"Descuento:".ljust(ancho - 10) + f"{descuento:>8g}%", None])
+        ticket.append([f"TOTAL A PAGAR:".ljust(ancho - 12) + f"${total:>10,.0f}", ESTILO_TOTAL])
+        ticket.append([f"Medio de Pago:".ljust(ancho - 12) + f"{medio_pago:>12}", None])
+        ticket.extend(self.pie)
+        if cajon and medio_pago == "EFECTIVO":
+            ticket.append(["", ESTILO_CAJON])
+        return ticket
+
+    def render_many(self, ventas):
+        """
+        Modo lote para reimprimir o exportar tickets históricos (sin abrir el cajón).
+        ventas: iterable de dicts como los de model.get_sales_for_tickets().
+        """
+        return [self.render_items(v['id'], v['items'], v['total'], v['medio_pago'],
+                                  v['descuento'], v['fecha'], cajon=False)
+                for v in ventas]
+
+
+# Claves de configuración que forman la plantilla, en el orden de TicketTemplate()
+TICKET_CONFIG_KEYS = (
+    ("business_name", "MI NEGOCIO"),
+    ("business_rut", ""),
+    ("business_address", ""),
+    ("business_phone", ""),
+    ("tipo_impresora", "58mm"),
+    ("ticket_mensaje", "¡Gracias por su preferencia!"),
+)
+_plantilla = None
+
+
+def get_ticket_template(get_config):
+    """Plantilla del negocio configurado; se compila la primera vez y queda en memoria."""
+    global _plantilla
+    if _plantilla is None:
+        _plantilla = TicketTemplate(*(get_config(key, default) for key, default in TICKET_CONFIG_KEYS))
+    return _plantilla
+
+
+def invalidate_ticket_template():
+    """Llamar al guardar cambios en los datos del negocio o de impresión."""
+    global _plantilla
+    _plantilla = None
+
+
+def generar_ticket_lineas(venta_id, carrito, total, medio_pago, descuento=0,
+                          nombre_local="S.O.S DIGITAL PYME",
+                          rut_local="",
+                          direccion_local="",
+                          telefono_local="",
+                          tipo_impresora="58mm",
+                          mensaje_pie="¡Gracias por su preferencia!"):
 
-def imprimir_ticket(texto_ticket):
     """
-    Envía el texto del ticket a la impresora predeterminada del sistema.
-    Funciona en Windows, macOS y Linux sin librerías adicionales.
+    Genera el ticket como lista de [texto, estilo] adaptándose a ticketeras de 58mm o 80mm.
+    (Arma una plantilla nueva; el POS usa get_ticket_template.)
+    """
+    plantilla = TicketTemplate(nombre_local, rut_local, direccion_local, telefono_local,
+                               tipo_impresora, mensaje_pie)
+    return plantilla.render(venta_id, carrito, total, medio_pago, descuento)
 
-    Returns:
-        True si el envío fue exitoso, False en caso de error.
+
+def generar_ticket_texto(*args, **kwargs):
+    """
+    Genera el texto plano del ticket (mismos parámetros que generar_ticket_lineas).
     """
-    ruta_archivo = "ticket_temporal.txt"
+    return ticket_a_texto(generar_ticket_lineas(*args, **kwargs))
+
+
+def ticket_a_texto(ticket):
+    """Convierte un ticket (texto o lista de [texto, estilo]) a texto plano."""
+    if isinstance(ticket, str):
+        return ticket
+    return "\n".join(texto for texto, estilo in ticket if estilo != ESTILO_CAJON)
+
+
+# Los archivos de Windows/macOS se borran cuando la cola del sistema ya los leyó
+# (startfile y `open` retornan antes). Van a una carpeta propia para poder barrer
+# los que queden de una sesión anterior (p.ej. si la app se cerró antes del borrado).
+TICKETS_TMP_DIR = os.path.join(tempfile.gettempdir(), "digital_pyme_tickets")
+BORRAR_TICKET_SEGUNDOS = 60
+
+
+def _borrar_ticket(ruta):
+    try:
+        os.remove(ruta)
+    except OSError:
+        pass
+
+
+def _barrer_tickets_viejos(edad_segundos=3600):
+    limite = time.time() - edad_segundos
     try:
-        with open(ruta_archivo, "w", encoding="utf-8") as f:
-            f.write(texto_ticket)
+        nombres = os.listdir(TICKETS_TMP_DIR)
+    except OSError:
+        return
+    for nombre in nombres:
+        ruta = os.path.join(TICKETS_TMP_DIR, nombre)
+        try:
+            if os.path.getmtime(ruta) < limite:
+                os.remove(ruta)
+        except OSError:
+            pass
 
-        sistema = platform.system()
+
+def ejecutar_con_timeout(fn, timeout, descripcion="La impresora"):
+    """
+    Corre fn() en un hilo daemon y espera como máximo `timeout` segundos (None = sin límite).
+    Si no termina lanza TimeoutError: el hilo queda bloqueado aparte y quien llamó sigue
+    (p.ej. el worker de la cola reintenta o marca el trabajo como fallido).
+    Si fn() falla, relanza su excepción; si no, retorna su resultado.
+    """
+    resultado = {}
+
+    def correr():
+        try:
+            resultado["valor"] = fn()
+        except BaseException as e:
+            resultado["error"] = e
+
+    hilo = threading.Thread(target=correr, name="impresion-timeout", daemon=True)
+    hilo.start()
+    hilo.join(timeout)
+    if hilo.is_alive():
+        raise TimeoutError(f"{descripcion} no respondió en {timeout} s")
+    if "error" in resultado:
+        raise resultado["error"]
+    return resultado.get("valor")
+
+
+def enviar_a_impresora(ticket, timeout=15):
+    """
+    Envía el ticket como texto plano a la impresora predeterminada del sistema.
+    Funciona en Windows, macOS y Linux sin librerías adicionales.
+
+    En Linux va directo por stdin de `lp` (sin archivo). En Windows/macOS cada trabajo usa
+    su propio archivo temporal, que se borra BORRAR_TICKET_SEGUNDOS después de entregarlo.
+    Lanza una excepción si el envío falla o excede `timeout`.
+    """
+    texto_ticket = ticket_a_texto(ticket)
+    sistema = platform.system()
+    if sistema not in ("Windows", "Darwin"):   # Linux: sin archivo, directo por stdin
+        subprocess.run(["lp"], input=texto_ticket.encode("utf-8"), timeout=timeout,
+                       check=True, capture_output=True)
+        return
+
+    os.makedirs(TICKETS_TMP_DIR, exist_ok=True)
+    _barrer_tickets_viejos()
+    fd, ruta_archivo = tempfile.mkstemp(prefix="ticket_", suffix=".txt", dir=TICKETS_TMP_DIR)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(texto_ticket)
+
+    try:
         if sistema == "Windows":
-            # Usa la impresora predeterminada de Windows directamente
+            # Usa la impresora predeterminada de Windows directamente.
+            # startfile no espera al spooler: el archivo se borra con retardo.
             os.startfile(ruta_archivo, "print")
-        elif sistema == "Darwin":   # macOS
+        else:                       # macOS
             # En desarrollo: abre el ticket en TextEdit para verificar el formato.
             # Cuando tengas una impresora real configurada como predeterminada,
-            # reemplazá esta línea por:  os.system(f'lpr "{ruta_archivo}"')
-            os.system(f'open -a TextEdit "{ruta_archivo}"')
-        else:                       # Linux
-            os.system(f'lp "{ruta_archivo}"')
+            # reemplazá esta línea por:  ["lpr"] con input=texto_ticket (stdin, sin archivo)
+            subprocess.run(["open", "-a", "TextEdit", ruta_archivo], timeout=timeout, check=True)
+    except BaseException:
+        _borrar_ticket(ruta_archivo)
+        raise
+    timer = threading.Timer(BORRAR_TICKET_SEGUNDOS, _borrar_ticket, (ruta_archivo,))
+    timer.daemon = True
+    timer.start()
 
-        return True
 
+def imprimir_ticket(texto_ticket):
+    """
+    Imprime en forma síncrona (sin cola ni reintentos).
+    El POS usa print_spooler (ver app/utils/print_spooler.py).
+
+    Returns:
+        True si el envío fue exitoso, False en caso de error.
+    """
+    try:
+        enviar_a_impresora(texto_ticket)
+        return True
     except Exception as e:
         print(f"[PrinterHelper] Error al imprimir: {e}")
         return False
@@ -0,0 +1,104 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+REPORTS_DIR = os.path.expanduser("~/Documents/Digital_PyME")
+
+
+def iter_sales_pages(model, start_date, end_date, page_size=None):
+    """Ventas del rango en bloques (keyset), para escribirlas al PDF sin cargarlas todas."""
+    if page_size is None:
+        from app.utils.pdf_exporter import SALES_CHUNK
+        page_size = SALES_CHUNK
+    cursor = None
+    while True:
+        rows, cursor = model.get_sales_page(cursor=cursor, page_size=page_size,
+                                            start_date=start_date, end_date=end_date)
+        if rows:
+            yield [(r.id, r.fecha, r.total, r.medio_pago) for r in rows]
+        if cursor is None:
+            return
+
+
+class ReportExporter:
+    """
+    Exportación de reportes PDF en segundo plano.
+
+    - submit() encola el trabajo en un hilo propio y retorna un Future (la UI lo espera
+      con asyncio.wrap_future); progress(fraccion, mensaje) informa el avance.
+    - El historial de ventas se lee de a bloques mientras se escribe el PDF.
+    - Los PDFs se cachean por (rango de fechas, versión de los datos): si nada cambió
+      desde la última exportación, se devuelve el mismo archivo al instante.
+    """
+
+    def __init__(self, model, out_dir=REPORTS_DIR):
+        self.model = model
+        self.out_dir = out_dir
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report-jobs")
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def submit(self, start_date, end_date, progress=None):
+        return self._pool.submit(self.export, start_date, end_date, progress)
+
+    def export(self, start_date, end_date, progress=None):
+        """Genera (o reutiliza) el PDF del rango. Retorna la ruta del archivo."""
+        progress = progress or (lambda fraccion, mensaje: None)
+        key = (start_date, end_date, self.model.get_data_version())
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached and os.path.exists(cached):
+            progress(1.0, "Reporte sin cambios")
+            return cached
+
+        progress(0.0, "Calculando métricas...")
+        # reportlab se importa recién al primer PDF (no en el arranque de la app)
+        from app.utils.pdf_exporter import generate_report_pdf
+        model = self.model
+        report = model.get_financial_report(start_date, end_date)
+        tops = model.get_top_selling_products(days=30)
+        clients_debt = [c for c in model.get_clients_with_balance() if c['saldo_actual'] > 0]
+        progress(0.1, "Escribiendo historial...")
+
+        report_data = {
+            "start_date": start_date,
+            "end_date":   end_date,
+            "total_ventas":   report.get("total_ventas", 0),
+            "total_gastos":   report.get("total_gastos", 0),
+            "utilidad":       report.get("utilidad", 0),
+            "flujo_entradas": report.get("flujo_entradas", 0),
+            "total_fiado":    report.get("total_fiado", 0),
+            "total_abonos":   report.get("total_abonos", 0),
+            "tx_count":       report.get("n_ventas", 0),
+            "exp_count":      report.get("n_gastos", 0),
+            "top_products":   tops,
+            "sales_pages":    iter_sales_pages(model, start_date, end_date),
+            "clients_debt":   clients_debt,
+        }
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        out_path = os.path.join(self.out_dir, f"reporte_{start_date}_{end_date}.pdf")
+        # Se escribe a un temporal: un PDF a medio generar nunca reemplaza al anterior
+        tmp_path = out_path + ".tmp"
+        generate_report_pdf(report_data, tmp_path,
+                            progress=lambda f: progress(0.1 + 0.85 * f, "Escribiendo historial..."))
+        os.replace(tmp_path, out_path)
+
+        with self._lock:
+            self._cache[key] = out_path
+        progress(1.0, "Listo")
+        return out_path
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+
+_exporters = {}
+
+
+def get_report_exporter(model):
+    """Un exportador por modelo, así el cache sobrevive al cambiar de vista."""
+    exporter = _exporters.get(model)
+    if exporter is None:
+        exporter = _exporters[model] = ReportExporter(model)
+    return exporter
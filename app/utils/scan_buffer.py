@@ -0,0 +1,64 @@
+import threading
+
+
+class ScanBuffer:
+    """
+    Cola de entrada del escáner de códigos de barras.
+
+    - push() encola el código y retorna al instante (el campo de búsqueda queda libre
+      para el próximo escaneo).
+    - Los códigos que llegan dentro de `window` segundos desde el primero de la ráfaga se
+      procesan juntos: los repetidos suman cantidad, cada código distinto se resuelve una
+      sola vez y on_batch(items, faltantes) recibe todo en una llamada, así el carrito se
+      redibuja una vez por ráfaga y no una vez por escaneo.
+    - items: [(producto, cantidad)] en orden de llegada, agrupados por id de producto
+      (un código alternativo y el principal suman a la misma línea).
+    - faltantes: códigos que resolve() no encontró.
+    """
+
+    WINDOW_SECONDS = 0.12
+
+    def __init__(self, resolve, on_batch, window=None):
+        self.resolve = resolve
+        self.on_batch = on_batch
+        self.window = self.WINDOW_SECONDS if window is None else window
+        self._pending = {}        # código -> veces escaneado (dict conserva el orden)
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def push(self, codigo):
+        codigo = (codigo or "").strip()
+        if not codigo:
+            return
+        with self._lock:
+            self._pending[codigo] = self._pending.get(codigo, 0) + 1
+            if self._timer is None and self.window > 0:
+                # La ventana corre desde el primer código: una ráfaga larga no posterga el refresco
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if self.window <= 0:
+            self.flush()
+
+    def flush(self):
+        """Procesa lo pendiente ya mismo. Retorna (items, faltantes), o None si no había nada."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return None
+
+        items, faltantes = {}, []
+        for codigo, veces in pending.items():
+            producto = self.resolve(codigo)
+            if producto is None:
+                faltantes.append(codigo)
+            elif producto[0] in items:
+                items[producto[0]][1] += veces
+            else:
+                items[producto[0]] = [producto, veces]
+        batch = [(producto, veces) for producto, veces in items.values()]
+        self.on_batch(batch, faltantes)
+        return batch, faltantes
@@ -0,0 +1,203 @@
+"""
+Benchmark de la capa de datos sobre una base con volumen realista.
+
+Genera (una sola vez, queda en caché en el directorio temporal) la base de
+bench/generate_data.py y mide con timeit las consultas que usan las pantallas y el cobro.
+Cada corrida trabaja sobre una copia, así register_sale y anular_venta no ensucian la base
+generada y dos versiones de la app se miden sobre los mismos datos.
+
+Uso:  python bench/bench_data_layer.py [--ventas 1000000] [--repeticiones 5]
+                                      [--output resultados.json] [--compare base.json]
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.generate_data import PRIMER_DIA, generate
+from app.data.database import InventarioModel
+
+UMBRAL_REGRESION = 0.10  # --compare marca como regresión una mediana >10% más lenta
+
+
+def _borrar_base(ruta):
+    """Borra una base SQLite junto con sus archivos -wal y -shm, si existen."""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(ruta + suffix):
+            os.remove(ruta + suffix)
+
+
+def _base_generada(params, regenerar=False):
+    """Ruta de la base generada para `params` (la crea si no existe en caché)."""
+    nombre = "digital_pyme_bench_" + "_".join(f"{k}{v}" for k, v in sorted(params.items())) + ".db"
+    ruta = os.path.join(tempfile.gettempdir(), nombre)
+    if regenerar:
+        _borrar_base(ruta)
+    if not os.path.exists(ruta):
+        print(f"Generando base de prueba en {ruta} ...")
+        parcial = ruta + ".tmp"
+        _borrar_base(parcial)
+        generate(parcial, **params)
+        os.replace(parcial, ruta)
+    return ruta
+
+
+def _copiar(origen, destino):
+    """Copia consistente con la API de backup de SQLite (incluye lo que quede en el WAL)."""
+    src, dst = sqlite3.connect(origen), sqlite3.connect(destino)
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+        dst.close()
+
+
+def _stats(tiempos):
+    ordenados = sorted(tiempos)
+    return {
+        "min_ms": round(ordenados[0], 3),
+        "median_ms": round(statistics.median(ordenados), 3),
+        "mean_ms": round(statistics.fmean(ordenados), 3),
+        "p95_ms": round(ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.95))], 3),
+        "rounds": len(ordenados),
+    }
+
+
+def _casos(model, params):
+    """
+    (nombre, función, setup) de cada medición. `setup` corre antes de cada repetición y
+    fuera del tiempo medido (p.ej. invalidar el catálogo para medir la carga en frío).
+    """
+    ultimo_dia = date.fromordinal(PRIMER_DIA.toordinal() + params["dias"] - 1)
+    # Los reportes "últimos N días" se miden sobre el último mes con datos, no sobre hoy
+    dias_top = (date.today() - ultimo_dia).days + 30
+    desde_mes = date.fromordinal(ultimo_dia.toordinal() - 29).isoformat()
+
+    productos = [p for p in model.get_all_products() if p[6] != "Promociones"][:3]
+    carrito = {p[0]: {'info': p, 'qty': 1} for p in productos}
+
+    with model.db.read() as cursor:
+        cursor.execute("SELECT id FROM ventas WHERE estado = 'Completada' ORDER BY id DESC LIMIT 10000")
+        por_anular = [row[0] for row in cursor.fetchall()]
+
+    def anular():
+        ok, msg = model.anular_venta(por_anular.pop())
+        if not ok:
+            raise RuntimeError(msg)
+
+    return [
+        ("get_all_products (catálogo en frío)", model.get_all_products, model.reload_catalog),
+        ("get_all_products (catálogo cargado)", model.get_all_products, None),
+        ("register_sale (3 líneas)", lambda: model.register_sale(carrito, medio_pago="DEBITO"), None),
+        ("anular_venta", anular, None),
+        ("get_financial_report (último mes)", lambda: model.get_financial_report(desde_mes, ultimo_dia.isoformat()), None),
+        ("get_financial_report (todo)", lambda: model.get_financial_report(PRIMER_DIA.isoformat(), ultimo_dia.isoformat()), None),
+        ("get_clients_with_balance", model.get_clients_with_balance, None),
+        ("get_top_selling_products (30 días)", lambda: model.get_top_selling_products(days=dias_top, limit=10), None),
+        ("get_all_income_events", model.get_all_income_events, None),
+    ]
+
+
+def run(params, repeticiones=5, regenerar=False):
+    """Corre todas las mediciones y retorna el resultado serializable a JSON."""
+    base = _base_generada(params, regenerar)
+    tmp = tempfile.mkdtemp()
+    copia = os.path.join(tmp, "bench_data_layer.db")
+    _copiar(base, copia)
+    resultados = {}
+    model = InventarioModel(copia)
+    try:
+        for nombre, fn, setup in _casos(model, params):
+            fn()  # Calentamiento (cachés de SQLite y del catálogo)
+            tiempos = []
+            for _ in range(repeticiones):
+                if setup:
+                    setup()
+                tiempos.append(timeit.timeit(fn, number=1) * 1000)
+            resultados[nombre] = _stats(tiempos)
+            print(f"  {nombre:<40} mediana {resultados[nombre]['median_ms']:10.3f} ms"
+                  f"   p95 {resultados[nombre]['p95_ms']:10.3f} ms")
+    finally:
+        model.close()
+        _borrar_base(copia)
+        os.rmdir(tmp)
+
+    return {
+        "version": _app_version(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "params": params,
+        "repeticiones": repeticiones,
+        "resultados": resultados,
+    }
+
+
+def _app_version():
+    """APP_VERSION de main.py sin importarlo (main importa flet y arma la UI)."""
+    with open(os.path.join(ROOT, "main.py"), encoding="utf-8") as f:
+        for linea in f:
+            if linea.startswith("APP_VERSION"):
+                return linea.split("=", 1)[1].strip().strip('"\'')
+    return "desconocida"
+
+
+def comparar(actual, base):
+    """Imprime la diferencia de medianas contra un JSON anterior. Retorna las regresiones."""
+    print(f"\nComparación con versión {base['version']} ({base['fecha']})")
+    if base["params"] != actual["params"]:
+        print("  Aviso: las bases se generaron con parámetros distintos.")
+    regresiones = []
+    for nombre, r in actual["resultados"].items():
+        anterior = base["resultados"].get(nombre)
+        if not anterior:
+            print(f"  {nombre:<40} (nuevo)")
+            continue
+        delta = (r["median_ms"] - anterior["median_ms"]) / anterior["median_ms"] if anterior["median_ms"] else 0.0
+        marca = "  <-- regresión" if delta > UMBRAL_REGRESION else ""
+        if marca:
+            regresiones.append(nombre)
+        print(f"  {nombre:<40} {anterior['median_ms']:10.3f} -> {r['median_ms']:10.3f} ms ({delta:+.0%}){marca}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--productos", type=int, default=10_000)
+    parser.add_argument("--promos", type=int, default=200)
+    parser.add_argument("--ventas", type=int, default=1_000_000)
+    parser.add_argument("--clientes", type=int, default=500)
+    parser.add_argument("--dias", type=int, default=3 * 365)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--regenerar", action="store_true", help="Vuelve a generar la base aunque esté en caché")
+    parser.add_argument("--output", help="Guarda los resultados en este archivo JSON")
+    parser.add_argument("--compare", help="JSON de una corrida anterior para comparar medianas")
+    args = parser.parse_args()
+
+    params = {k: getattr(args, k) for k in ("productos", "promos", "ventas", "clientes", "dias", "seed")}
+    resultado = run(params, args.repeticiones, args.regenerar)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"Resultados guardados en {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regresiones = comparar(resultado, json.load(f))
+        if regresiones:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
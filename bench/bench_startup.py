@@ -0,0 +1,121 @@
+"""
+Benchmark de arranque y de la ruta caliente de productos.
+
+- Importaciones: tiempo (en un proceso nuevo) de los módulos que se cargaban antes de
+  mostrar el POS (todas las vistas + reportlab) contra los que se cargan ahora.
+- Base: abrir el modelo sobre una base ya migrada (guardia de versión: sin DDL) contra
+  el esquema anterior, que recreaba tablas/ALTERs en cada arranque e intentaba un
+  ALTER TABLE fallido en cada lectura/escritura de productos.
+
+Uso:  python bench/bench_startup.py [--productos 2000] [--repeticiones 20]
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Módulos que main.py importaba antes de llegar al POS
+IMPORTS_ANTERIORES = [
+    "app.data.database", "app.data.async_model", "app.ui.pos_view", "app.ui.inventory_view",
+    "app.ui.dashboard_view", "app.ui.clients_view", "app.ui.shift_view", "app.ui.reports_view",
+    "app.ui.settings_view", "app.utils.helpers", "app.utils.activation", "app.ui.activation_view",
+    "app.ui.setup_view", "app.utils.updater", "app.utils.escpos", "app.utils.print_spooler",
+]
+# Los que se importan ahora (el resto, al abrir cada pestaña)
+IMPORTS_ACTUALES = [
+    "app.data.database", "app.data.async_model", "app.ui.pos_view", "app.utils.helpers",
+    "app.utils.activation", "app.utils.escpos", "app.utils.print_spooler",
+]
+
+from app.data.database import InventarioModel
+
+
+def _medir(fn, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        fn()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def _medir_imports(modulos, repeticiones):
+    """Mediana (ms) de importar `modulos` en un intérprete nuevo (flet incluido en ambos)."""
+    codigo = ("import time, flet; t = time.perf_counter()\n"
+              + "".join(f"import {m}\n" for m in modulos)
+              + "print((time.perf_counter() - t) * 1000)")
+    tiempos = []
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, "-c", codigo], cwd=ROOT, check=True,
+                                capture_output=True, text=True).stdout
+        tiempos.append(float(salida.strip().splitlines()[-1]))
+    return statistics.median(tiempos)
+
+
+def _ddl_anterior(model):
+    """Lo que hacía cada arranque antes de la guardia: CREATE TABLE/ALTER + lectura de versión."""
+    with model.db.transaction() as cursor:
+        model._create_tables(cursor)
+    model.run_migrations()
+
+
+def _alter_fallido(model):
+    """Lo que pagaba cada get_all_products/add_product/update_product antes de la migración v10."""
+    try:
+        with model.db.transaction() as cursor:
+            cursor.execute("ALTER TABLE productos ADD COLUMN fecha_vencimiento TEXT")
+    except sqlite3.OperationalError:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--productos", type=int, default=2000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    r_imports = max(3, args.repeticiones // 4)
+    anteriores_ms = _medir_imports(IMPORTS_ANTERIORES, r_imports)
+    actuales_ms = _medir_imports(IMPORTS_ACTUALES, r_imports)
+    print(f"Importaciones hasta el POS (mediana de {r_imports} procesos)")
+    print(f"  Antes (todas las vistas + reportlab): {anteriores_ms:8.1f} ms")
+    print(f"  Ahora (diferidas):                    {actuales_ms:8.1f} ms")
+
+    tmp = tempfile.mkdtemp()
+    db_path = os.path.join(tmp, "bench_startup.db")
+    try:
+        model = InventarioModel(db_path)
+        for i in range(args.productos):
+            model.add_product(f"Producto {i}", 100 + i, 50, 5, codigo_barras=f"780{i:010d}")
+        model.close()
+
+        def arranque():
+            InventarioModel(db_path).close()
+
+        model = InventarioModel(db_path)
+        r = args.repeticiones
+        arranque_ms = _medir(arranque, r)
+        ddl_ms = _medir(lambda: _ddl_anterior(model), r)
+        alter_ms = _medir(lambda: _alter_fallido(model), r * 10)
+        lectura_ms = _medir(model.get_all_products, r * 10)
+        model.close()
+
+        print(f"Base de prueba: {args.productos} productos, mediana de {r} repeticiones")
+        print(f"  Arranque con guardia de versión:     {arranque_ms:8.3f} ms")
+        print(f"  Arranque anterior (+ DDL de inicio): {arranque_ms + ddl_ms:8.3f} ms")
+        print(f"  get_all_products (catálogo cargado): {lectura_ms:8.3f} ms")
+        print(f"  ALTER TABLE fallido que se ahorra:   {alter_ms:8.3f} ms por llamada")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
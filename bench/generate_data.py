@@ -0,0 +1,164 @@
+"""
+Generador determinista de datos de prueba con volumen realista.
+
+Llena una base nueva con productos, promociones, turnos diarios, ventas con su detalle
+(incluye anuladas y fiadas), clientes con deudas y abonos, y gastos. Todo se carga con
+executemany en transacciones grandes y al final se recalculan los saldos de clientes y
+los resúmenes diarios, igual que dejaría la app. Misma semilla = misma base.
+
+Uso:  python bench/generate_data.py salida.db [--ventas 1000000] [--productos 10000] [--seed 42]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.data.catalog import normalize_barcode
+from app.data.database import InventarioModel
+
+CATEGORIAS = ["Almacén", "Bebidas", "Lácteos", "Fiambrería", "Aseo", "Cigarros", "Pastelería", "Verdurería"]
+PRODUCTOS_BASE = ["Arroz", "Fideos", "Aceite", "Azúcar", "Harina", "Bebida Cola", "Jugo", "Agua Mineral",
+                  "Leche", "Yogurt", "Queso", "Jamón", "Detergente", "Jabón", "Cigarrillos", "Galletas",
+                  "Chocolate", "Papas Fritas", "Tomate", "Palta", "Pan Molde", "Café", "Té", "Mantequilla"]
+MARCAS = ["Andina", "del Sur", "Premium", "Económico", "Familiar", "Gourmet", "Light", "Casero"]
+FORMATOS = ["250g", "500g", "1kg", "1L", "1.5L", "3L", "Pack 6", "Unidad"]
+MEDIOS = ["EFECTIVO"] * 6 + ["DEBITO"] * 3 + ["CREDITO", "TRANSFERENCIA"]
+
+PRIMER_DIA = date(2020, 1, 1)
+CHUNK = 50_000
+
+
+def _chunks(rows, size=CHUNK):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def generate(db_path, productos=10_000, promos=200, ventas=1_000_000, clientes=500, dias=3 * 365,
+             seed=42, log=print):
+    """Crea `db_path` desde cero. Retorna un dict con los conteos generados."""
+    if os.path.exists(db_path):
+        raise FileExistsError(f"{db_path} ya existe (el generador solo crea bases nuevas)")
+    rnd = random.Random(seed)
+    inicio = time.perf_counter()
+    model = InventarioModel(db_path)
+    db = model.db
+    primer_dia = PRIMER_DIA
+
+    # --- Productos y promociones ---
+    filas = []
+    for pid in range(1, productos + 1):
+        base = PRODUCTOS_BASE[pid % len(PRODUCTOS_BASE)]
+        nombre = f"{base} {rnd.choice(MARCAS)} {rnd.choice(FORMATOS)} #{pid}"
+        codigo = f"780{pid:010d}"
+        vence = (primer_dia + timedelta(days=dias + rnd.randint(-30, 365))).isoformat() if rnd.random() < 0.1 else None
+        filas.append((pid, nombre, rnd.randint(20, 2000) * 10, 1_000_000, rnd.randint(2, 20), codigo,
+                      rnd.choice(CATEGORIAS), vence, normalize_barcode(codigo)))
+    componentes = []
+    for n in range(promos):
+        pid = productos + n + 1
+        filas.append((pid, f"Promo Pack #{n + 1}", rnd.randint(100, 600) * 10, 0, 0, None, "Promociones", None, None))
+        for comp in rnd.sample(range(1, productos + 1), rnd.randint(2, 3)):
+            componentes.append((pid, comp, rnd.randint(1, 3)))
+    with db.transaction(immediate=True) as cursor:
+        cursor.executemany('''
+            INSERT INTO productos (id, nombre, precio, stock, stock_critico, codigo_barras, categoria,
+                                   fecha_vencimiento, codigo_norm)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', filas)
+        cursor.executemany("INSERT INTO promocion_items (promocion_id, producto_id, cantidad) VALUES (?, ?, ?)",
+                           componentes)
+        cursor.executemany("INSERT INTO clientes (id, nombre, telefono, alias, limite_credito) VALUES (?, ?, ?, ?, ?)",
+                           [(cid, f"Cliente {cid}", f"+569{cid:08d}", "", rnd.choice([0, 50_000, 100_000]))
+                            for cid in range(1, clientes + 1)])
+        cursor.executemany('''
+            INSERT INTO turnos (id, fecha_inicio, fecha_fin, monto_inicial, monto_final, usuario)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(d + 1, f"{primer_dia + timedelta(days=d)}T09:00:00", f"{primer_dia + timedelta(days=d)}T21:00:00",
+               20_000, 20_000 + rnd.randint(0, 500) * 100, "Admin") for d in range(dias)])
+        cursor.executemany("INSERT INTO gastos (descripcion, monto, fecha, categoria) VALUES (?, ?, ?, ?)",
+                           [(rnd.choice(["Proveedor", "Luz", "Agua", "Arriendo", "Flete"]), rnd.randint(5, 500) * 100,
+                             f"{primer_dia + timedelta(days=d)}T{rnd.randint(9, 20):02d}:30:00", "General")
+                            for d in range(dias) for _ in range(rnd.randint(0, 3))])
+    log(f"  {productos} productos, {promos} promociones, {clientes} clientes, {dias} turnos")
+
+    # --- Ventas, detalle y fiados (en orden cronológico, como los generaría la app) ---
+    precios = {f[0]: f[2] for f in filas}
+    vendibles = list(range(1, productos + 1)) + [productos + n + 1 for n in range(promos)]
+    populares = vendibles[:max(1, len(vendibles) // 20)]   # ~5% del catálogo concentra las ventas
+    segundos_dia = 12 * 3600
+    venta_id = detalle_n = movimiento_id = 0
+    for bloque in _chunks(range(ventas)):
+        cabeceras, detalles, movimientos = [], [], []
+        for i in bloque:
+            venta_id += 1
+            dia = primer_dia + timedelta(days=i * dias // ventas)
+            segundo = (i * 7919) % segundos_dia
+            fecha = f"{dia}T{9 + segundo // 3600:02d}:{segundo // 60 % 60:02d}:{segundo % 60:02d}"
+            total = 0
+            for _ in range(rnd.randint(1, 5)):
+                pid = rnd.choice(populares) if rnd.random() < 0.6 else rnd.choice(vendibles)
+                qty = rnd.randint(1, 3)
+                detalles.append((venta_id, pid, qty, precios[pid], qty * precios[pid]))
+                total += qty * precios[pid]
+            medio = "DEUDA" if rnd.random() < 0.05 else rnd.choice(MEDIOS)
+            descuento = 10 if rnd.random() < 0.03 else 0
+            total -= total * descuento / 100
+            estado = "Anulada" if rnd.random() < 0.02 else "Completada"
+            cabeceras.append((venta_id, fecha, total, medio, descuento, estado))
+            if medio == "DEUDA":
+                movimiento_id += 1
+                movimientos.append((movimiento_id, rnd.randint(1, clientes), fecha, "DEUDA", total,
+                                    f"Compra #{venta_id} (Fiado)", venta_id, None, estado))
+                if rnd.random() < 0.8:
+                    movimiento_id += 1
+                    movimientos.append((movimiento_id, movimientos[-1][1], fecha, "PAGO", total,
+                                        "Abono", None, rnd.choice(MEDIOS), "Completada"))
+        detalle_n += len(detalles)
+        with db.transaction(immediate=True) as cursor:
+            cursor.executemany("INSERT INTO ventas (id, fecha, total, medio_pago, descuento, estado) VALUES (?, ?, ?, ?, ?, ?)",
+                               cabeceras)
+            cursor.executemany('''
+                INSERT INTO detalle_ventas (venta_id, producto_id, cantidad, precio_unitario, subtotal)
+                VALUES (?, ?, ?, ?, ?)
+            ''', detalles)
+            cursor.executemany('''
+                INSERT INTO movimientos_cuenta (id, cliente_id, fecha, tipo, monto, descripcion, venta_id, medio_pago, estado)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', movimientos)
+        log(f"  ventas: {venta_id:,}/{ventas:,}")
+
+    # --- Derivados: saldos de clientes y resúmenes diarios ---
+    with db.transaction(immediate=True) as cursor:
+        model._rebuild_client_balances(cursor)
+        model._rebuild_rollups(cursor)
+    with db.transaction() as cursor:
+        cursor.execute("ANALYZE")
+    model.close()
+
+    resumen = {"productos": productos, "promociones": promos, "clientes": clientes, "turnos": dias,
+               "ventas": ventas, "detalles": detalle_n, "movimientos": movimiento_id,
+               "segundos": round(time.perf_counter() - inicio, 1)}
+    log(f"  listo en {resumen['segundos']} s")
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("db_path")
+    parser.add_argument("--productos", type=int, default=10_000)
+    parser.add_argument("--promos", type=int, default=200)
+    parser.add_argument("--ventas", type=int, default=1_000_000)
+    parser.add_argument("--clientes", type=int, default=500)
+    parser.add_argument("--dias", type=int, default=3 * 365)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    print(f"Generando {args.db_path} ({datetime.now():%H:%M:%S})")
+    generate(args.db_path, args.productos, args.promos, args.ventas, args.clientes, args.dias, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,18 +17,10 @@ async def original_main(page: ft.Page):
     page.bgcolor = theme_manager.get_color("bg_color")
     page.padding = 0
     
-    # LAZY IMPORTS
-    from app.data.database import InventarioModel
-    from app.ui.pos_view import build_pos_view
-    from app.ui.inventory_view import build_inventory_view
-    from app.ui.dashboard_view import build_dashboard_view
-    from app.ui.clients_view import build_clients_view
-    from app.ui.shift_view import build_shift_view
-    from app.ui.reports_view import build_reports_view
-    from app.ui.settings_view import build_settings_view
-    from app.utils.helpers import is_mobile, show_message
-    from app.utils.activation import is_activated
-    from app.ui.activation_view import build_activation_view
+    # LAZY IMPORTS: las vistas se importan al abrirlas por primera vez (ver build_view)
+    # y reportlab/webbrowser/updater recién cuando se usan
+    import asyncio
+    from app.utils.helpers import show_message
     # page.scroll = ft.ScrollMode.AUTO  <-- Eliminado para evitar conflictos con layout responsivo
 
     # Configuración responsive
@@ -46,19 +38,23 @@ async def original_main(page: ft.Page):
         expand=True
     )
     page.add(loading_view)
-    # Pequeña pausa para asegurar que Flet pinte el UI antes de bloquear el hilo en el sistema de archivos (TCC Dialog)
-    import asyncio
-    await asyncio.sleep(0.5)
-    
+
     # Usar nueva base de datos
     # DETECCION DE ENTORNO - SIEMPRE usar Documents para persistencia
     # NOTA: sys.frozen NO funciona con Flet builds, así que siempre 
     # guardamos en Documents para que la DB sobreviva reinstalaciones
-    import sys
     import os
     import shutil
-    
-    try:
+
+    def init_model():
+        """
+        Carpeta de datos, base y migraciones (acceso a disco: puede bloquear en el prompt
+        de permisos TCC de macOS). Corre en un hilo: mientras tanto Flet sigue pintando la
+        pantalla de carga, y al retornar la app está lista (sin pausas fijas).
+        """
+        from app.data.database import InventarioModel
+        from app.data.async_model import AsyncModel
+
         db_name = "sos_pyme.db"
         home_dir = os.path.expanduser("~")
         data_dir = os.path.join(home_dir, "Documents", "Digital_PyME")
@@ -88,8 +84,24 @@ async def original_main(page: ft.Page):
             except Exception as e:
                 print(f"Error migrando DB local: {e}")
         
-        model = InventarioModel(db_path)
-        print("DEBUG: Database initialized and Migrations verified (V5).")
+        # Fachada async: las vistas hacen `await model.async_<metodo>()` para no bloquear la UI
+        model = AsyncModel(InventarioModel(db_path))
+        # Tiempos por operación y registro de consultas lentas (Configuración > Diagnóstico)
+        from app.data.instrumentation import instrumentation
+        instrumentation.apply_config(model)
+        # Backend de impresión según Configuración > Impresión (sistema, red 9100 o dispositivo)
+        from app.utils.escpos import crear_backend
+        from app.utils.print_spooler import print_spooler
+        print_spooler.set_backend(crear_backend(model.get_config))
+        # La primera pantalla casi siempre es el POS: su módulo se importa aquí, fuera del event loop
+        import app.ui.pos_view  # noqa: F401
+        # Este hilo es del pool de asyncio.to_thread: su conexión no se vuelve a usar
+        model.db.release()
+        return model, db_path
+
+    try:
+        model, db_path = await asyncio.to_thread(init_model)
+        print("DEBUG: Database initialized and Migrations verified.")
     except Exception as e:
         import traceback
         err_trace = traceback.format_exc()
@@ -116,11 +128,11 @@ async def original_main(page: ft.Page):
         main_content = ft.Ref[ft.Container]()
         
         # --- UPDATE CHECK BACKGROUND TASK ---
-        from app.utils.updater import check_for_updates
         import threading
         
         def run_update_check():
-            import webbrowser
+            # El updater (urllib/ssl) se importa en este hilo, no en el arranque de la UI
+            from app.utils.updater import check_for_updates
             try:
                 has_update, new_ver, update_url = check_for_updates(APP_VERSION, page.platform)
                 print(f"Update check result: has_update={has_update}, version={new_ver}, url={update_url}")
@@ -203,6 +215,7 @@ async def original_main(page: ft.Page):
             page.overlay.clear() # Fix: Limpiar dialogos y snackbars persistentes
             page.clean()
             page.appbar = None # Ocultar barra superior en Login/Turno
+            from app.ui.shift_view import build_shift_view
             page.add(build_shift_view(page, model, on_success_callback=load_main_app))
             page.update()
         
@@ -211,16 +224,15 @@ async def original_main(page: ft.Page):
         current_view_index = [0]  # Usar lista para mutabilidad en closure
         
         # Estado Compartido de la App
-        app_state_cart = {} 
+        from app.data.cart import Cart
+        app_state_cart = Cart()  # Compartido con el POS: sobrevive a cambios de pestaña
 
         # --- LOGICA CIERRE DE CAJA GLOBAL ---
         def handle_close_turn_global(e):
-            # Obtener datos del turno actual para mostrar "Monto Esperado"
-            stats = model.get_current_shift_stats()
-            monto_esperado = stats["teorico_en_caja"] if stats else 0
-            
-            # Obtener desglose de ventas por método de pago
-            desglose = model.obtener_desglose_ventas_turno()
+            # Datos del turno actual ("Monto Esperado" y desglose por método de pago) en una consulta
+            summary = model.get_shift_close_summary()
+            monto_esperado = summary["teorico_en_caja"] if summary else 0
+            desglose = summary["desglose"] if summary else {'ventas': {}, 'pagos_deuda': {}}
             
             # Campo para ingresar monto final
             final_amount_field = ft.TextField(
@@ -343,6 +355,13 @@ async def original_main(page: ft.Page):
                     
                     # Cerrar Turno en DB
                     model.cerrar_turno(monto_final)
+
+                    # Respaldo automático al cierre (en segundo plano, con rotación)
+                    if model.get_config("backup_auto", "1") == "1":
+                        from app.utils.backup import get_backup_manager
+                        job = get_backup_manager(model).submit("cierre")
+                        job.add_done_callback(
+                            lambda f: f.exception() and print(f"Error en respaldo automático: {f.exception()}"))
                     
                     # Cerrar diálogo primero
                     dlg_close.open = False
@@ -426,22 +445,41 @@ async def original_main(page: ft.Page):
             on_click=handle_close_turn_global
         ) 
 
-        def switch_tab(index):
-            current_view_index[0] = index
-            
-            # Actualizar contenido
+        # Vistas ya construidas por pestaña: al volver se refrescan sus datos en vez de
+        # reconstruir todo el árbol. Se descarta al cambiar el modo responsive o el tema.
+        view_cache = {}
+
+        def build_view(index):
+            # Cada módulo de vista se importa la primera vez que se abre su pestaña
             if index == 0:
-                content_container.content = build_pos_view(page, model, shared_cart=app_state_cart)
+                from app.ui.pos_view import build_pos_view
+                return build_pos_view(page, model, shared_cart=app_state_cart)
             elif index == 1:
-                content_container.content = build_inventory_view(page, model)
+                from app.ui.inventory_view import build_inventory_view
+                return build_inventory_view(page, model)
             elif index == 2:
-                content_container.content = build_dashboard_view(page, model, on_logout_callback=handle_logout)
+                from app.ui.dashboard_view import build_dashboard_view
+                return build_dashboard_view(page, model, on_logout_callback=handle_logout)
             elif index == 3:
-                content_container.content = build_clients_view(page, model)
+                from app.ui.clients_view import build_clients_view
+                return build_clients_view(page, model)
             elif index == 4:
-                content_container.content = build_reports_view(page, model)
+                from app.ui.reports_view import build_reports_view
+                return build_reports_view(page, model)
             else:
-                content_container.content = build_settings_view(page, model, on_theme_change=load_main_app)
+                from app.ui.settings_view import build_settings_view
+                return build_settings_view(page, model, on_theme_change=load_main_app)
+
+        def switch_tab(index):
+            current_view_index[0] = index
+            
+            # Actualizar contenido
+            view = view_cache.get(index)
+            if view is None:
+                view = view_cache[index] = build_view(index)
+            elif callable(view.data):
+                view.data() # Refresco de la vista reutilizada
+            content_container.content = view
             
             # Actualizar colores de botones (Desktop)
             for i, btn in enumerate([btn_pos, btn_inv, btn_dash, btn_clients, btn_reports, btn_settings]):
@@ -474,11 +512,11 @@ async def original_main(page: ft.Page):
                  page.close(page.drawer)
         
         # --- BACKUP LOGIC ---
-        def show_backup_dialog(e=None):
+        async def show_backup_dialog(e=None):
             print("DEBUG: Backup button clicked!")
-            import shutil
+            import asyncio
             import os
-            import datetime
+            from app.utils.backup import get_backup_manager
             print(f"DEBUG: Platform={page.platform}, DBPath={db_path}")
             
             # Helper para mostrar alertas (Legacy compatible)
@@ -500,10 +538,7 @@ async def original_main(page: ft.Page):
 
             try:
                 # 1. Definir nombres
-                fecha = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M")
                 biz_name = model.get_config('business_name', 'MiNegocio').replace(" ", "_")
-                ruta_origen = db_path 
-                nombre_backup = f"Respaldo_Digital_{biz_name}_{fecha}.sqlite"
                 
                 # --- DETECCION PLATAFORMA ROBUSTA ---
                 # Fix: page.platform devuelve un Enum (PagePlatform.ANDROID), convertir a str para comparar
@@ -528,11 +563,13 @@ async def original_main(page: ft.Page):
                     except:
                         pass
 
-                archivo_final = os.path.join(backup_dir, nombre_backup)
-
                 if os.path.exists(db_path):
-                    shutil.copy2(db_path, archivo_final)
-                    msg = f"Archivo guardado en:\n{archivo_final}"
+                    # Copia consistente con la API de backup de SQLite, en el hilo de respaldos:
+                    # se puede seguir vendiendo mientras tanto
+                    show_message(page, "Generando respaldo...", "blue")
+                    job = get_backup_manager(model).submit(f"Digital_{biz_name}", dest_dir=backup_dir,
+                                                           compression=None)
+                    await asyncio.wrap_future(job)
                     show_message(page, "✅ Copia guardada en el escritorio", "green")
                 else:
                     show_message(page, f"❌ No se encuentra DB:\n{db_path}", "red")
@@ -559,7 +596,7 @@ async def original_main(page: ft.Page):
                     leading=ft.Icon(ft.Icons.BACKUP, color="black"), 
                     title=ft.Text("Copia de Seguridad", color="black"), 
                     subtitle=ft.Text("Guardar / Compartir DB", size=10, color="grey"),
-                    on_click=lambda e: show_backup_dialog(e)
+                    on_click=lambda e: page.run_task(show_backup_dialog, e)
                 ),
                 ft.Divider(),
                 ft.ListTile(leading=ft.Icon(ft.Icons.LOGOUT, color="black"), title=ft.Text("Cerrar Sesión", color="black"), on_click=lambda e: handle_logout_drawer()),
@@ -658,8 +695,8 @@ async def original_main(page: ft.Page):
             padding=10
         )
         
-        content_container.content = build_pos_view(page, model, shared_cart=app_state_cart)
-        
+        # El contenido inicial (POS) lo arma handle_resize -> switch_tab(0)
+
         # Contenedor para botones de desktop (referencia para ocultar/mostrar)
         top_nav_bar = ft.Container(
             content=ft.Row([
@@ -690,7 +727,7 @@ async def original_main(page: ft.Page):
                         tooltip="Copia de Seguridad",
                         icon_color="white",
                         icon_size=20,
-                        on_click=lambda e: show_backup_dialog(e)
+                        on_click=lambda e: page.run_task(show_backup_dialog, e)
                     ),
                     ft.Container(
                         content=ft.FilledButton(
@@ -751,6 +788,7 @@ async def original_main(page: ft.Page):
                     mobile_appbar.visible = False
                 
                 # Forzar reconstrucción de la vista actual para aplicar cambios responsive
+                view_cache.clear()
                 switch_tab(current_view_index[0])
                 page.update()
             
@@ -763,17 +801,19 @@ async def original_main(page: ft.Page):
     # CONTROL DE FLUJO (INICIO)
     # ---------------------------------------------------------
 
-    from app.ui.setup_view import build_setup_view
-
     def start_flow():
+        from app.utils.activation import is_activated
+
         # 1. Verificar Activación (Hardware Lock)
         if not is_activated():
+            from app.ui.activation_view import build_activation_view
             page.add(build_activation_view(page, on_success_callback=start_flow))
             return
             
         # 2. Verificar Configuración Inicial (Nombre Negocio)
         biz_name = model.get_config('business_name')
         if not biz_name:
+            from app.ui.setup_view import build_setup_view
             page.clean()
             page.add(build_setup_view(page, model, on_success_callback=start_flow))
             return
@@ -786,6 +826,7 @@ async def original_main(page: ft.Page):
             load_main_app()
         else:
             # NO hay turno, mostramos pantalla de Apertura
+            from app.ui.shift_view import build_shift_view
             page.clean()  # <--- LIMPIAR ANTES DE MOSTRAR
             page.add(build_shift_view(page, model, on_success_callback=load_main_app))
 
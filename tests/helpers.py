@@ -0,0 +1,24 @@
+import os
+import shutil
+import tempfile
+import unittest
+from app.data.database import InventarioModel
+
+class TempDBTestCase(unittest.TestCase):
+    """
+    Base para tests con base de datos: cada test usa una carpeta temporal propia
+    (self.tmp, con self.db_name adentro) que se borra al terminar, -wal/-shm incluidos.
+    open_model() abre un InventarioModel sobre esa base y lo cierra al final del test.
+    """
+
+    DB_NAME = "test.db"
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.db_name = os.path.join(self.tmp, self.DB_NAME)
+
+    def open_model(self, db_name=None):
+        model = InventarioModel(db_name or self.db_name)
+        self.addCleanup(model.close)  # Las limpiezas corren en orden inverso: antes del rmtree
+        return model
@@ -0,0 +1,50 @@
+import asyncio
+import threading
+import unittest
+from app.data.async_model import AsyncModel
+from tests.helpers import TempDBTestCase
+
+class TestAsyncModel(TempDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = AsyncModel(self.open_model())
+        self.addCleanup(self.model.close)  # Apaga también los hilos de las colas
+
+    def test_sale_flow(self):
+        """Venta completa con await; las llamadas síncronas se siguen delegando al modelo."""
+        async def flow():
+            await self.model.async_add_product("Pan", 100, 50, 5)
+            pan = self.model.search_products("Pan")[0]
+            venta_id = await self.model.async_register_sale({pan[0]: {'info': pan, 'qty': 2}})
+            report = await self.model.async_get_financial_report()
+            return pan, venta_id, report
+
+        pan, venta_id, report = asyncio.run(flow())
+        self.assertIsNotNone(venta_id)
+        self.assertEqual(report["total_ventas"], 200)
+        self.assertEqual(self.model.get_product(pan[0])[3], 48)
+
+    def test_threads_and_errors(self):
+        """Reportes por su propio hilo, el resto por el hilo de BD; las excepciones se propagan."""
+        hilo = lambda *a, **k: threading.current_thread().name
+        self.model.model.get_financial_report = hilo
+        self.model.model.add_client = hilo
+
+        def falla(*a, **k):
+            raise ValueError("stock insuficiente")
+        self.model.model.register_sale = falla
+
+        async def flow():
+            reportes = await self.model.async_get_financial_report()
+            caja = await self.model.async_add_client("Ana")
+            with self.assertRaises(ValueError):
+                await self.model.async_register_sale({})
+            return reportes, caja
+
+        reportes, caja = asyncio.run(flow())
+        self.assertTrue(reportes.startswith("db-reports"))
+        self.assertTrue(caja.startswith("db_"))
+        self.assertNotEqual(caja, threading.current_thread().name)
+
+if __name__ == '__main__':
+    unittest.main()
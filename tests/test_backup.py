@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import threading
+import unittest
+from app.data.async_model import AsyncModel
+from app.utils.backup import BackupManager, BackupError
+from app.utils.printer_helper import get_ticket_template, invalidate_ticket_template, ticket_a_texto
+from tests.helpers import TempDBTestCase
+
+class TestBackup(TempDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = self.open_model()
+        self.manager = BackupManager(self.db_name, os.path.join(self.tmp, "respaldos"), keep=2)
+        self.addCleanup(self.manager.close)
+
+    def test_create_and_rotate(self):
+        """Respaldo comprimido y verificado; la carpeta administrada conserva solo `keep`."""
+        self.model.add_product("Pan", 100, 50, 5)
+        path = self.manager.create("manual")
+        self.assertTrue(path.endswith(".sqlite.gz"))
+
+        for i in range(3):
+            self.manager.create(f"turno{i}")
+        nombres = [b["nombre"] for b in self.manager.list_backups()]
+        self.assertEqual(len(nombres), 2)
+        self.assertFalse(os.path.exists(path))
+
+    def test_backup_during_writes(self):
+        """Las ventas siguen escribiéndose mientras corre el respaldo."""
+        for i in range(200):
+            self.model.add_product(f"Producto {i}", 100, 50, 5)
+        errores = []
+
+        def escribir():
+            try:
+                for i in range(50):
+                    self.model.set_config("contador", str(i))
+            except Exception as e:
+                errores.append(e)
+
+        hilo = threading.Thread(target=escribir)
+        hilo.start()
+        path = self.manager.create("manual", compression=None)
+        hilo.join(timeout=10)
+        self.assertFalse(hilo.is_alive(), "El respaldo no debe bloquear a los que escriben")
+        self.assertEqual(errores, [])
+        conn = sqlite3.connect(path)
+        self.assertGreaterEqual(conn.execute("SELECT COUNT(*) FROM productos").fetchone()[0], 200)
+        conn.close()
+
+    def test_restore(self):
+        """Restaurar devuelve el estado del respaldo y guarda antes el estado actual."""
+        self.model.set_config("business_name", "Antes")
+        path = self.manager.create("manual")
+        self.model.set_config("business_name", "Después")
+
+        self.manager.restore(path, self.model)
+        self.assertEqual(self.model.get_config("business_name"), "Antes")
+        self.assertTrue(any("pre-restauracion" in b["nombre"] for b in self.manager.list_backups()))
+
+    def test_restore_refreshes_ticket_template(self):
+        self.model.set_config("business_name", "Almacén Antes")
+        path = self.manager.create("manual")
+        self.model.set_config("business_name", "Almacén Después")
+        invalidate_ticket_template()
+        self.assertIn("ALMACÉN DESPUÉS", ticket_a_texto(get_ticket_template(self.model.get_config).render(1, {}, 0, "EFECTIVO")))
+
+        self.manager.restore(path, self.model)
+        texto = ticket_a_texto(get_ticket_template(self.model.get_config).render(1, {}, 0, "EFECTIVO"))
+        self.assertIn("ALMACÉN ANTES", texto)
+
+    def test_restore_closes_every_thread_connection(self):
+        """Con la fachada async: se esperan las colas y se cierran las conexiones de otros hilos."""
+        async_model = AsyncModel(self.model)
+        self.model.set_config("business_name", "Antes")
+        path = self.manager.create("manual")
+        self.model.set_config("business_name", "Después")
+        viejas = [async_model._db_pool.submit(self.model.db.connection).result(),
+                  async_model._report_pool.submit(self.model.db.connection).result()]
+
+        self.manager.restore(path, async_model)
+        for conn in viejas:
+            with self.assertRaises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+        nombre = async_model._db_pool.submit(self.model.get_config, "business_name").result()
+        self.assertEqual(nombre, "Antes")
+        async_model._db_pool.shutdown(wait=True)
+        async_model._report_pool.shutdown(wait=True)
+
+    def test_corrupt_backup_is_rejected(self):
+        path = os.path.join(self.tmp, "respaldo_roto.sqlite")
+        with open(path, "wb") as f:
+            f.write(b"esto no es una base de datos" * 100)
+        with self.assertRaises((BackupError, sqlite3.DatabaseError)):
+            self.manager.restore(path, self.model)
+        self.assertIsNotNone(self.model.get_config("business_name", ""))
+
+if __name__ == '__main__':
+    unittest.main()
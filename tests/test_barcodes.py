@@ -0,0 +1,67 @@
+import sqlite3
+import timeit
+import unittest
+from tests.helpers import TempDBTestCase
+
+class TestBarcodes(TempDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = self.open_model()
+        self.model.add_product("Bebida Cola 1.5L", 1800, 20, 5, "7801234567890", "Bebidas")
+        self.pid = self.model.get_product_by_barcode("7801234567890")[0]
+
+    def test_aliases_resolve_without_sql(self):
+        self.model.set_barcode_aliases(self.pid, [" 7809999999999 ", "", "7801234567890"])
+        self.assertEqual(self.model.get_barcode_aliases(self.pid), ["7809999999999"])
+
+        queries = []
+        self.model.db.connection().set_trace_callback(queries.append)
+        self.assertEqual(self.model.resolve_barcode("7809999999999").id, self.pid)
+        self.assertEqual(self.model.resolve_barcode("7801234567890\n").id, self.pid)
+        self.assertIsNone(self.model.resolve_barcode("000"))
+        self.assertEqual(queries, [], "El escaneo no debería ejecutar SQL")
+
+        segundos = timeit.timeit(lambda: self.model.resolve_barcode("7809999999999"), number=1000)
+        self.assertLess(segundos / 1000, 0.001)
+
+    def test_codes_are_unique_across_products(self):
+        self.model.add_product("Bebida Cola 2L", 2300, 10, 5, "7800000000002", "Bebidas")
+        otro = self.model.resolve_barcode("7800000000002")
+        with self.assertRaisesRegex(Exception, "ya está asignado"):
+            self.model.add_product("Copia", 100, 1, 1, "7801234567890")
+        with self.assertRaisesRegex(Exception, "ya está asignado"):
+            self.model.set_barcode_aliases(otro.id, ["7801234567890"])
+
+        # El EAN nuevo del proveedor pasa a ser el principal y el anterior queda como alternativo
+        self.model.update_product(self.pid, "Bebida Cola 1.5L", 1800, 20, 5, "7801111111111", "Bebidas",
+                                  codigos_alternativos=["7801234567890"])
+        self.assertEqual(self.model.resolve_barcode("7801234567890").id, self.pid)
+        self.assertEqual(self.model.resolve_barcode("7801111111111").id, self.pid)
+
+        self.model.delete_product(self.pid)
+        self.assertIsNone(self.model.resolve_barcode("7801234567890"))
+        self.model.add_product("Reemplazo", 100, 1, 1, "7801234567890")
+
+    def test_migration_backfills_and_uses_index(self):
+        """Una base v10 con códigos repetidos se migra: gana el producto más antiguo."""
+        self.model.close()
+        conn = sqlite3.connect(self.db_name)
+        conn.execute("DROP INDEX idx_productos_codigo_norm")
+        conn.execute("UPDATE productos SET codigo_norm = NULL")
+        conn.execute("INSERT INTO productos (nombre, precio, stock, stock_critico, codigo_barras) "
+                     "VALUES ('Duplicado 2', 1, 1, 1, ' 7801234567890')")
+        conn.execute("UPDATE config SET value='10' WHERE key='db_version'")
+        conn.commit()
+        conn.close()
+
+        self.model = self.open_model()
+        self.assertEqual(self.model.resolve_barcode("7801234567890").id, self.pid)
+        with self.model.db.read() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM productos WHERE codigo_norm = '7801234567890'")
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute("EXPLAIN QUERY PLAN SELECT id FROM productos WHERE codigo_norm = ?", ("x",))
+            plan = " ".join(row[-1] for row in cursor.fetchall())
+        self.assertIn("idx_productos_codigo_norm", plan)
+
+if __name__ == '__main__':
+    unittest.main()
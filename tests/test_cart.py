@@ -0,0 +1,79 @@
+import random
+import unittest
+from app.data.cart import Cart, CartLine
+from app.utils.printer_helper import TicketTemplate, ticket_a_texto
+from tests.helpers import TempDBTestCase
+
+class TestCart(unittest.TestCase):
+    def setUp(self):
+        self.pan = (1, "Pan", 1500, 100, 5)
+        self.queso = (2, "Queso", 3990, 100, 5)
+        self.jamon = (3, "Jamón", 12990, 100, 5)
+
+    def test_running_totals_match_full_recount(self):
+        cart = Cart()
+        rnd = random.Random(7)
+        productos = [self.pan, self.queso, self.jamon]
+        for _ in range(500):
+            p = rnd.choice(productos)
+            accion = rnd.random()
+            if accion < 0.6:
+                cart.add(p, rnd.choice([1, 2, 0.25]))
+            elif accion < 0.9:
+                cart.change(p[0], -1)
+            else:
+                cart.remove(p[0])
+        esperado = sum(line.qty * line.price for line in cart)
+        self.assertAlmostEqual(cart.subtotal, esperado, places=6)
+        self.assertEqual(cart.line_count, len(list(cart)))
+
+    def test_discount_tax_and_snapshot(self):
+        cart = Cart()
+        cart.add(self.pan, 2)
+        cart.add(self.queso)
+        cart.discount_percent = 10
+        self.assertEqual(cart.subtotal, 6990)
+        self.assertAlmostEqual(cart.total, 6291)
+        self.assertAlmostEqual(cart.tax, 6291 - 6291 / 1.19)
+        with self.assertRaises(ValueError):
+            cart.discount_percent = 150
+
+        foto = cart.snapshot()
+        cart.add(self.pan)          # Escaneado mientras se guardaba la venta
+        cart.add(self.jamon)
+        self.assertEqual(foto.total, 6291)
+        self.assertEqual([l.qty for l in foto.lines], [2, 1])
+
+        cart.subtract(foto)
+        self.assertEqual([(l.info[1], l.qty) for l in cart], [("Pan", 1), ("Jamón", 1)])
+        self.assertEqual(cart.discount_percent, 0)
+        self.assertEqual(cart.subtotal, 1500 + 12990)
+
+    def test_lines_use_slots(self):
+        line = CartLine(1, self.pan, 1)
+        self.assertFalse(hasattr(line, "__dict__"))
+
+class TestCartCheckout(TempDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = self.open_model()
+
+    def test_stored_total_and_ticket_come_from_snapshot(self):
+        self.model.add_product("Yogurt", 333, 50, 5)
+        yogurt = self.model.search_products("Yogurt")[0]
+        cart = Cart()
+        cart.add(yogurt, 3)
+        cart.discount_percent = 15
+        foto = cart.snapshot()
+
+        venta_id = self.model.register_sale(foto, medio_pago="DEBITO")
+        venta = self.model.get_sales_for_tickets([venta_id])[0]
+        self.assertAlmostEqual(venta["total"], foto.total)
+        self.assertEqual(self.model.get_product(yogurt[0])[3], 47)
+
+        texto = ticket_a_texto(TicketTemplate().render(venta_id, foto, foto.total, "DEBITO", foto.discount_percent))
+        self.assertIn("Yogurt", texto)
+        self.assertIn("15%", texto)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from tests.helpers import TempDBTestCase
+
+class TestProductCatalog(TempDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = self.open_model()
+        self.model.add_product("Café Americano", 1500, 10, 2, "CAF1", "Bebidas")
+        self.model.add_product("Medialuna", 800, 6, 2, "MED1", "Panadería")
+
+    def test_search_and_category_are_in_memory(self):
+        self.model.get_all_products()  # Carga el catálogo
+        queries = []
+        self.model.db.connection().set_trace_callback(queries.append)
+
+        self.assertEqual([p[1] for p in self.model.search_products("cafe")], ["Café Americano"])
+        self.assertEqual([p[1] for p in self.model.search_products("med1")], ["Medialuna"])
+        self.assertEqual(len(self.model.get_products_by_category("Bebidas")), 1)
+        self.assertEqual(self.model.get_product_by_barcode("caf1")[1], "Café Americano")
+        self.assertEqual(queries, [], "Las búsquedas no deberían ejecutar SQL")
+
+    def test_expiring_products_come_from_the_catalog(self):
+        self.model.add_product("Leche", 1000, 10, 2, "LEC1", fecha_vencimiento="2000-01-01")
+        leche = self.model.get_product_by_barcode("LEC1")[0]
+        self.model.add_product("Arroz", 900, 10, 2, "ARR1", fecha_vencimiento="2999-01-01")
+        version = self.model.get_catalog_version()
+        queries = []
+        self.model.db.connection().set_trace_callback(queries.append)
+        self.assertEqual([p.nombre for p in self.model.get_expiring_products()], ["Leche"])
+        self.model.search_products("arroz")
+        self.assertEqual(queries, [], "Vencimientos y búsqueda no deberían ejecutar SQL")
+        self.assertEqual(self.model.get_catalog_version(), version)
+
+        self.model.update_product(leche, "Leche", 1000, 10, 2, "LEC1", "General", "2999-01-01")
+        self.assertNotEqual(self.model.get_catalog_version(), version)
+        self.assertEqual(self.model.get_expiring_products(), [])
+
+    def test_sale_patches_stock_and_promos(self):
+        cafe = self.model.get_product_by_barcode("CAF1")
+        medialuna = self.model.get_product_by_barcode("MED1")
+        promo_id = self.model.add_promotion("Desayuno", 2000, [(cafe[0], 1), (medialuna[0], 2)])
+        self.assertEqual(self.model.get_product(promo_id)[3], 3)
+
+        venta_id = self.model.register_sale({medialuna[0]: {'info': medialuna, 'qty': 2}})
+        self.assertEqual(self.model.get_product(medialuna[0])[3], 4)
+        self.assertEqual(self.model.get_product(promo_id)[3], 2)
+
+        self.model.anular_venta(venta_id)
+        self.assertEqual(self.model.get_product(medialuna[0])[3], 6)
+        self.assertEqual(self.model.get_product(promo_id)[3], 3)
+
+    def test_catalog_matches_database_after_writes(self):
+        cafe = self.model.get_product_by_barcode("CAF1")
+        self.model.update_product(cafe[0], "Café Americano", 1600, 20, 2, "CAF2", "Cafetería")
+        self.model.delete_product(self.model.get_product_by_barcode("MED1")[0])
+        self.assertIsNone(self.model.get_product_by_barcode("CAF1"))
+        self.assertEqual(self.model.get_product_by_barcode("CAF2")[2], 1600)
+
+        en_memoria = self.model.get_all_products()
+        self.model.reload_catalog()
+        self.assertEqual(en_memoria, self.model.get_all_products())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+from tests.helpers import TempDBTestCase
+
+class TestClientBalances(TempDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = self.open_model()
+        self.model.add_product("Pan", 100, 50, 5)
+        self.pan = self.model.search_products("Pan")[0]
+        self.ana = self.model.add_client("Ana")
+        self.beto = self.model.add_client("Beto")
+
+    def _client(self, client_id):
+        return next(c for c in self.model.get_clients_with_balance() if c["id"] == client_id)
+
+    def test_balance_follows_movements_and_voids(self):
+        venta_id = self.model.register_sale({self.pan[0]: {'info': self.pan, 'qty': 3}},
+                                            medio_pago='DEUDA', cliente_id=self.ana)
+        self.model.add_movement(self.ana, 'PAGO', 120, "Abono", medio_pago='EFECTIVO')
+        ana = self._client(self.ana)
+        self.assertEqual((ana["deuda_total"], ana["pagado_total"], ana["saldo_actual"]), (300, 120, 180))
+        self.assertEqual(self._client(self.beto)["saldo_actual"], 0)
+
+        ok, _ = self.model.anular_venta(venta_id)
+        self.assertTrue(ok)
+        ana = self._client(self.ana)
+        self.assertEqual((ana["deuda_total"], ana["saldo_actual"]), (0, -120))
+        self.assertEqual(self.model.verify_client_balances(), [])
+
+    def test_verify_reports_and_repairs_drift(self):
+        self.model.add_movement(self.beto, 'DEUDA', 500, "Fiado")
+        # Movimiento escrito por fuera del modelo: el saldo guardado queda desfasado
+        with self.model.db.transaction() as cursor:
+            cursor.execute("INSERT INTO movimientos_cuenta (cliente_id, fecha, tipo, monto) VALUES (?, '2024-01-01', 'PAGO', 200)",
+                           (self.beto,))
+        drift = self.model.verify_client_balances()
+        self.assertEqual(len(drift), 1)
+        self.assertEqual((drift[0]["id"], drift[0]["saldo_guardado"], drift[0]["saldo_real"]), (self.beto, 500, 300))
+        self.assertEqual(self._client(self.beto)["saldo_actual"], 500, "Sin repair no se modifica nada")
+
+        self.model.verify_client_balances(repair=True)
+        self.assertEqual(self._client(self.beto)["saldo_actual"], 300)
+        self.assertEqual(self.model.verify_client_balances(), [])
+
+if __name__ == '__main__':
+    unittest.main()
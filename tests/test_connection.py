@@ -0,0 +1,60 @@
+import sqlite3
+import threading
+import unittest
+from app.data.connection import ConnectionManager
+from tests.helpers import TempDBTestCase
+
+class TestConnectionManager(TempDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.db = ConnectionManager(self.db_name)
+        self.addCleanup(self.db.close)
+        with self.db.transaction() as cursor:
+            cursor.execute("CREATE TABLE t (x INTEGER)")
+
+    def _connection_from_thread(self):
+        conns = []
+        hilo = threading.Thread(target=lambda: conns.append(self.db.connection()))
+        hilo.start()
+        hilo.join()
+        return conns[0]
+
+    def test_finished_threads_connections_are_closed(self):
+        huerfana = self._connection_from_thread()
+        self._connection_from_thread()   # Abrir otra conexión barre las de hilos terminados
+        with self.assertRaises(sqlite3.ProgrammingError):
+            huerfana.execute("SELECT 1")
+
+    def test_close_closes_connections_of_every_thread(self):
+        listo, salir = threading.Event(), threading.Event()
+        conns = []
+
+        def trabajador():
+            conns.append(self.db.connection())
+            listo.set()
+            salir.wait()
+
+        hilo = threading.Thread(target=trabajador)
+        hilo.start()
+        listo.wait()
+        propia = self.db.connection()
+        self.db.close()
+        salir.set()
+        hilo.join()
+        for conn in (conns[0], propia):
+            with self.assertRaises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+
+    def test_transactions_take_the_write_lock_up_front(self):
+        otra = sqlite3.connect(self.db_name, isolation_level=None, timeout=0)
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM t")
+                with self.assertRaises(sqlite3.OperationalError):
+                    otra.execute("BEGIN IMMEDIATE")
+                cursor.execute("INSERT INTO t VALUES (1)")
+        finally:
+            otra.close()
+
+if __name__ == '__main__':
+    unittest.main()
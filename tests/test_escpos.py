@@ -0,0 +1,116 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from app.utils import printer_helper
+from app.utils.escpos import (
+    BOLD_ON, CUT, DOUBLE_HEIGHT_ON, DRAWER_KICK, INIT, EscPosPrinter, FileTransport, LoopbackTransport,
+    crear_backend, parse_destino_red,
+)
+from app.utils.print_spooler import PrintSpooler
+from app.utils.printer_helper import enviar_a_impresora, generar_ticket_lineas, generar_ticket_texto
+
+class TestEscPos(unittest.TestCase):
+    def ticket(self, medio_pago="EFECTIVO"):
+        pan = (1, "Pan amasado", 1500, 10, 2)
+        return dict(venta_id=42, carrito={1: {'info': pan, 'qty': 2}}, total=3000,
+                    medio_pago=medio_pago, nombre_local="Almacén Ñuñoa")
+
+    def test_loopback_bytes(self):
+        sink = LoopbackTransport()
+        printer = EscPosPrinter(sink)
+        inicio = time.perf_counter()
+        printer.send(generar_ticket_lineas(**self.ticket()))
+        self.assertLess(time.perf_counter() - inicio, 0.2)
+
+        data = sink.jobs[0]
+        self.assertTrue(data.startswith(INIT))
+        # Título y total en negrita + doble alto; texto en cp850
+        self.assertIn(BOLD_ON + DOUBLE_HEIGHT_ON + "ALMACÉN ÑUÑOA".center(32).encode("cp850"), data)
+        self.assertIn(BOLD_ON + DOUBLE_HEIGHT_ON + b"TOTAL A PAGAR:", data)
+        self.assertIn(CUT, data)
+        self.assertTrue(data.endswith(DRAWER_KICK), "Venta en efectivo abre el cajón")
+
+        printer.send(generar_ticket_lineas(**self.ticket("DEBITO")))
+        self.assertNotIn(DRAWER_KICK, sink.jobs[1])
+
+    def test_plain_text_unchanged(self):
+        texto = generar_ticket_texto(**self.ticket())
+        self.assertIn("TOTAL A PAGAR:", texto)
+        self.assertTrue(texto.endswith("Vuelva pronto".center(32) + "\n\n\n\n\n\n"))
+
+    def test_backend_from_config(self):
+        config = {"impresora_conexion": "red", "impresora_destino": "10.0.0.5:9101"}
+        send = crear_backend(lambda k, d=None: config.get(k, d))
+        self.assertEqual((send.__self__.transport.host, send.__self__.transport.port), ("10.0.0.5", 9101))
+        self.assertIs(crear_backend(lambda k, d=None: d), enviar_a_impresora)
+
+    def test_invalid_network_destination(self):
+        self.assertEqual(parse_destino_red(" 10.0.0.5 "), ("10.0.0.5", 9100))
+        for destino in ("10.0.0.5:abc", "10.0.0.5:70000", ":9100", ""):
+            with self.assertRaises(ValueError):
+                parse_destino_red(destino)
+        # Un valor inválido ya guardado no rompe el arranque: vuelve a la impresora del sistema
+        config = {"impresora_conexion": "red", "impresora_destino": "10.0.0.5:abc"}
+        self.assertIs(crear_backend(lambda k, d=None: config.get(k, d)), enviar_a_impresora)
+
+    def test_windows_ticket_file_is_removed(self):
+        carpeta = tempfile.mkdtemp()
+        enviados = []
+        viejo = os.path.join(carpeta, "ticket_viejo.txt")
+        open(viejo, "w").close()
+        os.utime(viejo, (0, 0))
+        with mock.patch.object(printer_helper, "TICKETS_TMP_DIR", carpeta), \
+             mock.patch.object(printer_helper, "BORRAR_TICKET_SEGUNDOS", 0.05), \
+             mock.patch.object(printer_helper.platform, "system", return_value="Windows"), \
+             mock.patch.object(printer_helper.os, "startfile", create=True,
+                               side_effect=lambda ruta, op: enviados.append(open(ruta, encoding="utf-8").read())):
+            enviar_a_impresora(generar_ticket_lineas(**self.ticket()))
+            time.sleep(0.3)
+        self.assertIn("Pan amasado", enviados[0])
+        self.assertEqual(os.listdir(carpeta), [], "Ni el ticket enviado ni los viejos quedan en disco")
+        os.rmdir(carpeta)
+
+    @unittest.skipUnless(hasattr(os, "mkfifo"), "Requiere FIFOs (POSIX)")
+    def test_blocked_device_times_out_and_spooler_recovers(self):
+        # Abrir un FIFO para escribir se bloquea hasta que aparece un lector, como un
+        # /dev/usb/lp0 sin papel o una impresora apagada
+        carpeta = tempfile.mkdtemp()
+        fifo = os.path.join(carpeta, "lp0")
+        os.mkfifo(fifo)
+        self.addCleanup(os.rmdir, carpeta)
+        self.addCleanup(os.remove, fifo)
+        self.addCleanup(self._desbloquear, fifo)
+
+        spooler = PrintSpooler(send=EscPosPrinter(FileTransport(fifo)).send, failed_path=None,
+                               retries=2, backoff=0, timeout=0.2)
+        spooler.submit(generar_ticket_lineas(**self.ticket()), venta_id=42)
+        self.assertTrue(spooler.wait_idle(timeout=5), "El worker no queda colgado en el dispositivo")
+        fallido = spooler.failed_jobs()[0]
+        self.assertEqual((fallido["venta_id"], fallido["intentos"]), (42, 2))
+        self.assertIn("no respondió", fallido["error"])
+
+        sink = LoopbackTransport()
+        spooler.set_backend(EscPosPrinter(sink).send)
+        spooler.submit(generar_ticket_lineas(**self.ticket()), venta_id=43)
+        self.assertTrue(spooler.wait_idle(timeout=5))
+        self.assertEqual(len(sink.jobs), 1, "Los tickets siguientes se imprimen")
+
+    @staticmethod
+    def _desbloquear(fifo):
+        """Abre y vacía el FIFO para que terminen los hilos que quedaron esperando."""
+        lector = os.open(fifo, os.O_RDONLY | os.O_NONBLOCK)
+        try:
+            time.sleep(0.1)
+            while True:
+                try:
+                    if not os.read(lector, 65536):
+                        break
+                except BlockingIOError:
+                    break
+        finally:
+            os.close(lector)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import sqlite3
+import unittest
+from bench.generate_data import generate
+from tests.helpers import TempDBTestCase
+
+PARAMS = dict(productos=60, promos=5, ventas=800, clientes=10, dias=20, seed=7)
+
+class TestGenerateData(TempDBTestCase):
+    def _generar(self, nombre):
+        ruta = os.path.join(self.tmp, nombre)
+        generate(ruta, log=lambda *_: None, **PARAMS)
+        return ruta
+
+    def _volcado(self, ruta):
+        conn = sqlite3.connect(ruta)
+        try:
+            return [conn.execute(f"SELECT * FROM {t} ORDER BY 1").fetchall()
+                    for t in ("productos", "ventas", "detalle_ventas", "movimientos_cuenta", "clientes")]
+        finally:
+            conn.close()
+
+    def test_same_seed_same_database(self):
+        a = self._volcado(self._generar("a.db"))
+        b = self._volcado(self._generar("b.db"))
+        self.assertEqual(a, b)
+        self.assertEqual(len(a[1]), PARAMS["ventas"])
+
+    def test_generated_data_is_consistent_with_model(self):
+        model = self.open_model(self._generar("c.db"))
+        self.assertEqual(len(model.get_all_products()), PARAMS["productos"] + PARAMS["promos"])
+        with model.db.read() as cursor:
+            cursor.execute("SELECT SUM(saldo) FROM clientes")
+            saldo = cursor.fetchone()[0]
+            cursor.execute("""
+                SELECT SUM(CASE tipo WHEN 'DEUDA' THEN monto ELSE -monto END)
+                FROM movimientos_cuenta WHERE estado = 'Completada'
+            """)
+            self.assertAlmostEqual(saldo, cursor.fetchone()[0])
+        reporte = model.get_financial_report("2020-01-01", "2020-01-20")
+        self.assertGreater(reporte["n_ventas"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
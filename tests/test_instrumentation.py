@@ -0,0 +1,62 @@
+import asyncio
+import os
+import unittest
+from app.data.async_model import AsyncModel
+from app.data.instrumentation import QueryInstrumentation
+from tests.helpers import TempDBTestCase
+
+class TestInstrumentation(TempDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = self.open_model()
+        self.model.add_product("Pan", 1500, 100, 5, codigo_barras="780001")
+        self.inst = QueryInstrumentation(log_dir=os.path.join(self.tmp, "logs"))
+
+    def tearDown(self):
+        self.inst.disable()
+        self.inst.close()
+
+    def test_disabled_leaves_model_untouched(self):
+        self.inst.enable(self.model)
+        self.inst.disable()
+        self.assertNotIn("get_all_products", vars(self.model))
+        self.assertIsNone(self.model.db.trace_callback)
+        self.model.get_all_products()
+        self.assertEqual(self.inst.stats(), [])
+
+    def test_times_and_counts_outermost_operation(self):
+        self.inst.enable(self.model)
+        pan = self.model.search_products("Pan")[0]
+        for _ in range(5):
+            self.model.register_sale({pan[0]: {'info': pan, 'qty': 1}})
+        self.model.reload_catalog()
+        self.model.get_all_products()
+
+        filas = {f["operacion"]: f for f in self.inst.stats()}
+        self.assertEqual(filas["register_sale"]["llamadas"], 5)
+        self.assertGreater(filas["register_sale"]["consultas_prom"], 1)
+        self.assertGreater(filas["get_all_products"]["consultas_prom"], 0)
+        self.assertLessEqual(filas["register_sale"]["p50_ms"], filas["register_sale"]["p95_ms"])
+        self.assertFalse(os.path.exists(self.inst.log_path), "Nada superó los umbrales")
+
+    def test_slow_operations_are_logged_with_sql(self):
+        self.inst.configure(slow_ms=0)
+        self.inst.enable(self.model)
+        self.model.reload_catalog()
+        self.model.get_all_products()
+        self.inst.close()
+        with open(self.inst.log_path, encoding="utf-8") as f:
+            registro = f.read()
+        self.assertIn("get_all_products", registro)
+        self.assertIn("FROM productos", registro)
+
+    def test_async_facade_uses_wrapped_methods(self):
+        async_model = AsyncModel(self.model)
+        async_model.async_get_clients_with_balance  # Llamada ya cacheada antes de activar
+        self.inst.enable(async_model)
+        asyncio.run(async_model.async_get_clients_with_balance())
+        async_model._db_pool.shutdown(wait=True)
+        self.assertEqual([f["operacion"] for f in self.inst.stats()], ["get_clients_with_balance"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+from tests.helpers import TempDBTestCase
+
+class TestKeysetPagination(TempDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = self.open_model()
+        self.model.add_product("Pan", 100, 1000, 5)
+        self.pan = self.model.search_products("Pan")[0]
+        self.cliente_id = self.model.add_client("Ana")
+
+    def _sell(self, n):
+        for _ in range(n):
+            self.model.register_sale({self.pan[0]: {'info': self.pan, 'qty': 1}})
+
+    def _all_pages(self, fetch, **kwargs):
+        rows, cursor, pages = [], None, 0
+        while True:
+            page_rows, cursor = fetch(cursor=cursor, **kwargs)
+            rows.extend(page_rows)
+            pages += 1
+            if cursor is None:
+                return rows, pages
+
+    def test_sales_pages_cover_all_rows_with_ties(self):
+        """Fechas repetidas: el desempate por id evita filas duplicadas u omitidas entre páginas."""
+        self._sell(12)
+        with self.model.db.transaction() as cursor:
+            cursor.execute("UPDATE ventas SET fecha = '2024-05-01T10:00:00' WHERE id % 3 = 0")
+        rows, pages = self._all_pages(self.model.get_sales_page, page_size=5)
+        self.assertEqual(pages, 3)
+        self.assertEqual(sorted(r.id for r in rows), list(range(1, 13)))
+        keys = [(r.fecha, r.id) for r in rows]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+        # Compatibles con el desempaquetado por posición de get_sales_report()
+        self.assertEqual(tuple(rows[0]), tuple(self.model.get_sales_report()[0]))
+
+    def test_sales_page_date_range(self):
+        self._sell(4)
+        with self.model.db.transaction() as cursor:
+            cursor.execute("UPDATE ventas SET fecha = '2024-01-15T12:00:00' WHERE id <= 2")
+        rows, _ = self._all_pages(self.model.get_sales_page, page_size=1,
+                                  start_date="2024-01-01", end_date="2024-01-31")
+        self.assertEqual([r.id for r in rows], [2, 1])
+
+    def test_client_movements_and_payments(self):
+        for i in range(7):
+            self.model.add_movement(self.cliente_id, 'PAGO', 10 + i, f"Abono {i}", medio_pago='EFECTIVO')
+        movs, _ = self._all_pages(self.model.get_client_movements_page, cliente_id=self.cliente_id, page_size=3)
+        self.assertEqual([m.monto for m in movs], [16, 15, 14, 13, 12, 11, 10])
+        pagos, _ = self._all_pages(self.model.get_payments_page, page_size=4)
+        self.assertEqual(len(pagos), 7)
+        self.assertEqual(pagos[0].cliente_nombre, "Ana")
+
+    def test_income_events_match_unpaginated(self):
+        """Ventas y abonos intercalados (con empates de fecha entre tablas) = get_all_income_events."""
+        self._sell(5)
+        for i in range(5):
+            self.model.add_movement(self.cliente_id, 'PAGO', 50, f"Abono {i}", medio_pago='EFECTIVO')
+        with self.model.db.transaction() as cursor:
+            cursor.execute("UPDATE ventas SET fecha = '2024-03-01T09:00:00' WHERE id IN (2, 4)")
+            cursor.execute("UPDATE movimientos_cuenta SET fecha = '2024-03-01T09:00:00' WHERE id IN (1, 3, 5)")
+        events, _ = self._all_pages(self.model.get_income_events_page, page_size=3)
+        self.assertEqual(len(events), 10)
+        self.assertEqual(len({(e.type, e.id) for e in events}), 10)
+        expected = self.model.get_all_income_events()
+        self.assertEqual(sorted((e.type, e.id, e.date, e.description) for e in events),
+                         sorted((e['type'], e['id'], e['date'], e['description']) for e in expected))
+        keys = [(e.date, e.type, e.id) for e in events]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+
+    def test_expenses_page_and_range(self):
+        for i in range(5):
+            self.model.add_expense(f"Gasto {i}", 100 + i)
+        rows, pages = self._all_pages(self.model.get_expenses_page, page_size=2)
+        self.assertEqual(pages, 3)
+        self.assertEqual([r.descripcion for r in rows], [f"Gasto {i}" for i in range(4, -1, -1)])
+        self.assertEqual(self.model.get_expenses_in_range("2000-01-01", "2000-01-31"), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import threading
+import unittest
+from app.utils.print_spooler import PrintSpooler
+
+class TestPrintSpooler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.failed_path = os.path.join(self.tmp.name, "fallidos.json")
+        self.sent = []
+        self.fail_next = 0
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def send(self, texto, timeout=None):
+        if self.fail_next:
+            self.fail_next -= 1
+            raise OSError("impresora desconectada")
+        self.sent.append(texto)
+
+    def spooler(self):
+        return PrintSpooler(send=self.send, failed_path=self.failed_path, retries=3, backoff=0)
+
+    def test_retry_then_success(self):
+        spooler = self.spooler()
+        self.fail_next = 2
+        job = spooler.submit("ticket 1", venta_id=1)
+        spooler.submit("ticket 2", venta_id=2)
+        self.assertTrue(spooler.wait_idle(timeout=5))
+        self.assertEqual(self.sent, ["ticket 1", "ticket 2"])
+        self.assertEqual(job["intentos"], 3)
+        self.assertEqual(spooler.failed_jobs(), [])
+
+    def test_failed_jobs_persist_and_reprint(self):
+        spooler = self.spooler()
+        self.fail_next = 3
+        spooler.submit("ticket 7", venta_id=7)
+        self.assertTrue(spooler.wait_idle(timeout=5))
+        self.assertEqual(self.sent, [])
+
+        # Otro proceso (p.ej. tras reiniciar la app) ve el trabajo fallido
+        reopened = self.spooler()
+        failed = reopened.failed_jobs()
+        self.assertEqual([j["venta_id"] for j in failed], [7])
+        self.assertIn("desconectada", failed[0]["error"])
+
+        self.assertIsNotNone(reopened.reprint(failed[0]["id"]))
+        self.assertTrue(reopened.wait_idle(timeout=5))
+        self.assertEqual(self.sent, ["ticket 7"])
+        self.assertEqual(self.spooler().failed_jobs(), [])
+
+    def test_backend_ignoring_its_timeout_does_not_wedge_the_queue(self):
+        colgado = threading.Event()
+        self.addCleanup(colgado.set)
+
+        def send(texto, timeout=None):
+            if texto == "ticket colgado":
+                colgado.wait()   # No respeta el timeout
+            self.send(texto, timeout)
+
+        spooler = PrintSpooler(send=send, failed_path=self.failed_path, retries=2, backoff=0, timeout=0.1)
+        spooler.DEADLINE_MARGIN = 0
+        spooler.submit("ticket colgado", venta_id=1)
+        spooler.submit("ticket 2", venta_id=2)
+        self.assertTrue(spooler.wait_idle(timeout=5))
+        self.assertEqual(self.sent, ["ticket 2"])
+        failed = spooler.failed_jobs()
+        self.assertEqual([(j["venta_id"], j["intentos"]) for j in failed], [(1, 2)])
+        self.assertIn("no respondió", failed[0]["error"])
+
+if __name__ == '__main__':
+    unittest.main()
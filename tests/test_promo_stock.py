@@ -0,0 +1,37 @@
+import unittest
+from tests.helpers import TempDBTestCase
+
+class TestPromoStock(TempDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = self.open_model()
+
+    def _id(self, nombre):
+        return next(p[0] for p in self.model.get_all_products() if p[1] == nombre)
+
+    def test_promo_stock_is_min_of_components(self):
+        """El stock de una promo es el mínimo de paquetes armables con sus componentes."""
+        self.model.add_product("Cafe", 1500, 10, 2)
+        self.model.add_product("Medialuna", 800, 7, 2)
+        cafe, medialuna = self._id("Cafe"), self._id("Medialuna")
+        promo_id = self.model.add_promotion("Desayuno", 2000, [(cafe, 1), (medialuna, 2)])
+
+        productos = {p[0]: p for p in self.model.get_all_products()}
+        self.assertEqual(len(productos[promo_id]), 8)
+        self.assertEqual(productos[promo_id][3], 3)   # 7 // 2
+        self.assertEqual(productos[cafe][3], 10)      # Productos normales sin cambios
+
+    def test_promo_without_components_has_zero_stock(self):
+        self.model.add_product("Promo Vacia", 1000, 50, 0, "777", "Promociones")
+        producto = self.model.get_product_by_barcode("777")
+        self.assertEqual(producto[3], 0)
+
+    def test_barcode_lookup_computes_promo_stock(self):
+        self.model.add_product("Bebida", 1000, 9, 2)
+        bebida = self._id("Bebida")
+        promo_id = self.model.add_promotion("Pack Bebidas", 2500, [(bebida, 3)])
+        self.model.update_product(promo_id, "Pack Bebidas", 2500, 0, 0, "PK3", "Promociones")
+        self.assertEqual(self.model.get_product_by_barcode("pk3")[3], 3)
+
+if __name__ == '__main__':
+    unittest.main()
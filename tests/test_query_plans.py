@@ -0,0 +1,89 @@
+import re
+import unittest
+from tests.helpers import TempDBTestCase
+
+# Tablas que crecen con el uso: nunca deberían recorrerse completas en los reportes
+LARGE_TABLES = {"ventas", "detalle_ventas", "movimientos_cuenta", "gastos"}
+
+class TestReportQueryPlans(TempDBTestCase):
+    """Regresión: EXPLAIN QUERY PLAN de los reportes no debe hacer SCAN de tablas grandes."""
+
+    def setUp(self):
+        super().setUp()
+        self.model = self.open_model()
+        self.model.iniciar_turno(10000)
+
+    def _captured_selects(self, fn):
+        """Ejecuta fn y devuelve los SELECT que emitió (SQL expandido por el trace callback)."""
+        conn = self.model.db.connection()
+        statements = []
+        conn.set_trace_callback(statements.append)
+        try:
+            fn()
+        finally:
+            conn.set_trace_callback(None)
+        return [s for s in statements if s.lstrip().upper().startswith(("SELECT", "WITH"))]
+
+    @staticmethod
+    def _aliases(sql):
+        aliases = {}
+        for table, alias in re.findall(r"(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", sql, re.IGNORECASE):
+            aliases[table] = table
+            if alias and alias.upper() not in ("WHERE", "ON", "JOIN", "LEFT", "GROUP", "ORDER", "INNER", "LIMIT"):
+                aliases[alias] = table
+        return aliases
+
+    def _full_scans(self, sql):
+        conn = self.model.db.connection()
+        aliases = self._aliases(sql)
+        scans = []
+        for row in conn.execute("EXPLAIN QUERY PLAN " + sql):
+            detail = row[3]
+            match = re.match(r"SCAN (\w+)", detail)
+            if match and aliases.get(match.group(1), match.group(1)) in LARGE_TABLES:
+                scans.append(detail)
+        return scans
+
+    def assertNoFullScan(self, fn):
+        statements = self._captured_selects(fn)
+        self.assertTrue(statements, "No se capturó ninguna consulta")
+        for sql in statements:
+            self.assertEqual(self._full_scans(sql), [], f"Full scan en: {' '.join(sql.split())}")
+
+    def test_financial_report(self):
+        self.assertNoFullScan(lambda: self.model.get_financial_report())
+        self.assertNoFullScan(lambda: self.model.get_financial_report("2024-01-01", "2024-12-31"))
+
+    def test_shift_breakdown(self):
+        self.assertNoFullScan(self.model.obtener_desglose_ventas_turno)
+
+    def test_current_shift_stats(self):
+        self.assertNoFullScan(self.model.get_current_shift_stats)
+
+    def test_top_selling_products(self):
+        self.assertNoFullScan(lambda: self.model.get_top_selling_products(days=30))
+
+    def test_shift_activity(self):
+        self.assertNoFullScan(lambda: self.model.get_shift_activity(limit=50))
+
+    def test_history_pages(self):
+        """Las páginas (primera y siguientes) van por índice: sin SCAN y sin ordenar en un B-tree temporal."""
+        m = self.model
+        cursor = ("2024-01-01T00:00:00", 10)
+        for fn in (lambda: m.get_sales_page(), lambda: m.get_sales_page(cursor=cursor),
+                   lambda: m.get_sales_page(cursor=cursor, start_date="2024-01-01", end_date="2024-12-31"),
+                   lambda: m.get_expenses_page(cursor=cursor),
+                   lambda: m.get_payments_page(cursor=cursor),
+                   lambda: m.get_client_movements_page(1, cursor=cursor)):
+            self.assertNoFullScan(fn)
+            for sql in self._captured_selects(fn):
+                plan = [r[3] for r in m.db.connection().execute("EXPLAIN QUERY PLAN " + sql)]
+                self.assertFalse([d for d in plan if "TEMP B-TREE" in d], " ".join(sql.split()))
+        # El UNION de ingresos solo ordena las page_size + 1 filas de cada rama
+        self.assertNoFullScan(lambda: m.get_income_events_page(cursor=("2024-01-01T00:00:00", "PAGO", 10)))
+
+    def test_clients_with_balance(self):
+        self.assertNoFullScan(self.model.get_clients_with_balance)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from tests.helpers import TempDBTestCase
+
+class TestRegisterSale(TempDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = self.open_model()
+        self.model.add_product("Pan", 100, 10, 2, "PAN")
+        self.model.add_product("Queso", 500, 3, 1, "QUE")
+        self.pan = self.model.get_product_by_barcode("PAN")
+        self.queso = self.model.get_product_by_barcode("QUE")
+        promo_id = self.model.add_promotion("Sandwich", 550, [(self.pan[0], 2), (self.queso[0], 1)])
+        self.promo = self.model.get_product(promo_id)
+        self.cliente_id = self.model.add_client("Juan")
+
+    def _count(self, table):
+        with self.model.db.read() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            return cursor.fetchone()[0]
+
+    def test_fiado_written_with_sale(self):
+        cart = {self.pan[0]: {'info': self.pan, 'qty': 2}, self.promo[0]: {'info': self.promo, 'qty': 1}}
+        venta_id = self.model.register_sale(cart, medio_pago='DEUDA', discount_percent=10, cliente_id=self.cliente_id)
+
+        movimientos = self.model.get_client_movements(self.cliente_id)
+        self.assertEqual(len(movimientos), 1)
+        self.assertAlmostEqual(movimientos[0][4], (200 + 550) * 0.9)
+        self.assertEqual(movimientos[0][6], venta_id)
+        # Pan: 2 sueltos + 2 de la promo; Queso: 1 de la promo
+        self.assertEqual(self.model.get_product(self.pan[0])[3], 6)
+        self.assertEqual(self.model.get_product(self.queso[0])[3], 2)
+
+    def test_combined_stock_is_validated_and_rolled_back(self):
+        # 4 promos piden 8 panes + 2 sueltos = 10 (ok), pero 4 quesos > 3
+        cart = {self.pan[0]: {'info': self.pan, 'qty': 2}, self.promo[0]: {'info': self.promo, 'qty': 4}}
+        with self.assertRaises(Exception) as ctx:
+            self.model.register_sale(cart, medio_pago='DEUDA', cliente_id=self.cliente_id)
+        self.assertIn("Queso", str(ctx.exception))
+
+        self.assertEqual(self._count("ventas"), 0)
+        self.assertEqual(self._count("detalle_ventas"), 0)
+        self.assertEqual(self._count("movimientos_cuenta"), 0)
+        self.assertEqual(self.model.get_product(self.pan[0])[3], 10)
+
+    def test_missing_product(self):
+        fantasma = (999, "Fantasma", 100, 1, 0, None, "General", None)
+        with self.assertRaises(Exception) as ctx:
+            self.model.register_sale({999: {'info': fantasma, 'qty': 1}})
+        self.assertIn("no existe", str(ctx.exception))
+
+if __name__ == '__main__':
+    unittest.main()
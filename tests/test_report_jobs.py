@@ -0,0 +1,60 @@
+import datetime
+import os
+import unittest
+from unittest import mock
+from app.utils.pdf_exporter import SALES_CHUNK, StreamingDocTemplate, generate_report_pdf
+from app.utils.report_jobs import ReportExporter
+from tests.helpers import TempDBTestCase
+
+class TestReportJobs(TempDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = self.open_model()
+        self.model.add_product("Pan", 100, 10000, 5)
+        self.pan = self.model.search_products("Pan")[0]
+        for _ in range(450):
+            self.model.register_sale({self.pan[0]: {'info': self.pan, 'qty': 1}})
+        self.exporter = ReportExporter(self.model, out_dir=self.tmp)
+        self.today = str(datetime.date.today())
+
+    def tearDown(self):
+        self.exporter.close()
+
+    def test_background_export_with_progress_and_cache(self):
+        steps = []
+        path = self.exporter.submit(self.today, self.today, lambda f, msg: steps.append(f)).result(timeout=60)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(4), b"%PDF")
+        self.assertEqual(steps, sorted(steps))
+        self.assertEqual(steps[-1], 1.0)
+        self.assertGreater(len(steps), 4, "El historial avanza por bloques")
+
+        # Sin cambios en los datos: mismo archivo, sin regenerar
+        mtime = os.path.getmtime(path)
+        mensajes = []
+        self.assertEqual(self.exporter.export(self.today, self.today, lambda f, msg: mensajes.append(msg)), path)
+        self.assertEqual(mensajes, ["Reporte sin cambios"])
+        self.assertEqual(os.path.getmtime(path), mtime)
+
+        # Una venta nueva invalida el cache
+        self.model.register_sale({self.pan[0]: {'info': self.pan, 'qty': 1}})
+        mensajes.clear()
+        self.exporter.export(self.today, self.today, lambda f, msg: mensajes.append(msg))
+        self.assertNotIn("Reporte sin cambios", mensajes)
+
+class TestPdfExporter(TempDBTestCase):
+    def test_streamed_story_reaches_the_last_block(self):
+        """El historial llega completo aunque tenga muchos más bloques que el lookahead."""
+        n = SALES_CHUNK * (StreamingDocTemplate.LOOKAHEAD + 2) + 1
+        ventas = [(i, "2026-01-01T10:00:00", 100, "EFECTIVO") for i in range(1, n + 1)]
+        path = os.path.join(self.tmp, "reporte.pdf")
+        with mock.patch("reportlab.rl_config.pageCompression", 0):   # Texto legible en el PDF
+            generate_report_pdf({"sales_history": ventas, "clients_debt": [{"nombre": "Rosa", "saldo_actual": 500}]},
+                                path)
+        with open(path, "rb") as f:
+            data = f.read()
+        self.assertTrue(f"(#{n})".encode() in data, "Falta el último bloque del historial")
+        self.assertTrue(b"(Rosa)" in data, "Lo que sigue al historial también se escribe")
+
+if __name__ == '__main__':
+    unittest.main()
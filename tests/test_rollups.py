@@ -0,0 +1,54 @@
+import unittest
+from tests.helpers import TempDBTestCase
+
+class TestDailyRollups(TempDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = self.open_model()
+        self.model.add_product("Pan", 100, 100, 5, "PAN")
+        self.model.add_product("Queso", 500, 100, 5, "QUE")
+        self.pan = self.model.get_product_by_barcode("PAN")
+        self.queso = self.model.get_product_by_barcode("QUE")
+        self.cliente_id = self.model.add_client("Ana")
+
+    def _rollup_rows(self):
+        with self.model.db.read() as cursor:
+            cursor.execute("SELECT * FROM resumen_diario WHERE ventas_n OR abonos_n OR gastos_n OR fiado_total ORDER BY 1, 2")
+            diario = cursor.fetchall()
+            cursor.execute("SELECT * FROM resumen_producto_diario WHERE cantidad != 0 ORDER BY 1, 2")
+            return diario, cursor.fetchall()
+
+    def _activity(self):
+        self.model.register_sale({self.pan[0]: {'info': self.pan, 'qty': 3}})
+        self.model.register_sale({self.queso[0]: {'info': self.queso, 'qty': 1}}, medio_pago='DEBITO')
+        fiado = self.model.register_sale({self.pan[0]: {'info': self.pan, 'qty': 2},
+                                          self.queso[0]: {'info': self.queso, 'qty': 2}},
+                                         medio_pago='DEUDA', discount_percent=10, cliente_id=self.cliente_id)
+        anulada = self.model.register_sale({self.queso[0]: {'info': self.queso, 'qty': 4}}, medio_pago='TRANSFERENCIA')
+        self.model.anular_venta(anulada)
+        self.model.add_movement(self.cliente_id, 'PAGO', 400, "Abono", medio_pago='EFECTIVO')
+        self.model.add_expense("Hielo", 150)
+        return fiado
+
+    def test_incremental_matches_rebuild(self):
+        self._activity()
+        incremental = self._rollup_rows()
+        self.model.rebuild_rollups()
+        self.assertEqual(self._rollup_rows(), incremental)
+
+    def test_report_from_rollups_matches_detail(self):
+        fiado = self._activity()
+        self.model.anular_venta(fiado)
+        por_dias = self.model.get_financial_report("2000-01-01", "2999-12-31")
+        # Con horas en las puntas el reporte se calcula desde el detalle
+        detalle = self.model.get_financial_report("2000-01-01T00:00:01", "2999-12-31T12:00:00")
+        self.assertEqual(por_dias, detalle)
+        self.assertEqual((por_dias["total_ventas"], por_dias["n_ventas"]), (800, 2))
+        self.assertEqual((por_dias["total_fiado"], por_dias["total_abonos"], por_dias["total_gastos"]), (0, 400, 150))
+
+    def test_top_selling_excludes_voided_sales(self):
+        self._activity()
+        self.assertEqual(self.model.get_top_selling_products(days=1), [("Pan", 5), ("Queso", 3)])
+
+if __name__ == '__main__':
+    unittest.main()
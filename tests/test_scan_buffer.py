@@ -0,0 +1,49 @@
+import threading
+import unittest
+from app.utils.scan_buffer import ScanBuffer
+
+PRODUCTOS = {
+    "780100": (1, "Yogurt Frutilla", 450, 20),
+    "780200": (2, "Leche Entera", 1100, 5),
+}
+ALIAS = {"999100": PRODUCTOS["780100"]}
+
+class TestScanBuffer(unittest.TestCase):
+    def setUp(self):
+        self.resueltos = []
+        self.lotes = []
+
+    def resolve(self, codigo):
+        self.resueltos.append(codigo)
+        return PRODUCTOS.get(codigo) or ALIAS.get(codigo)
+
+    def test_burst_is_coalesced_into_one_batch(self):
+        buffer = ScanBuffer(self.resolve, lambda items, faltantes: self.lotes.append((items, faltantes)), window=60)
+        for codigo in ["780100"] * 12 + ["780200", "999100", "000", " 780200 "]:
+            buffer.push(codigo)
+        self.assertEqual(self.lotes, [], "Nada se aplica antes de cerrar la ventana")
+
+        buffer.flush()
+        self.assertEqual(len(self.lotes), 1)
+        items, faltantes = self.lotes[0]
+        self.assertEqual([(p[1], n) for p, n in items], [("Yogurt Frutilla", 13), ("Leche Entera", 2)])
+        self.assertEqual(faltantes, ["000"])
+        self.assertEqual(sorted(self.resueltos), ["000", "780100", "780200", "999100"])
+        self.assertIsNone(buffer.flush())
+
+    def test_window_timer_flushes_once(self):
+        listo = threading.Event()
+
+        def on_batch(items, faltantes):
+            self.lotes.append(items)
+            listo.set()
+
+        buffer = ScanBuffer(self.resolve, on_batch, window=0.05)
+        for _ in range(5):
+            buffer.push("780100")
+        self.assertTrue(listo.wait(2))
+        self.assertEqual(len(self.lotes), 1)
+        self.assertEqual(self.lotes[0][0][1], 5)
+
+if __name__ == '__main__':
+    unittest.main()
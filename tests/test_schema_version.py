@@ -0,0 +1,47 @@
+import sqlite3
+import unittest
+from app.data.database import InventarioModel, SCHEMA_VERSION
+from tests.helpers import TempDBTestCase
+
+class TestSchemaVersion(TempDBTestCase):
+    def test_v9_database_gets_expiration_column(self):
+        """Una base en v9 (sin fecha_vencimiento) se migra una sola vez al abrirla."""
+        InventarioModel(self.db_name).close()
+        conn = sqlite3.connect(self.db_name)
+        conn.execute("ALTER TABLE productos DROP COLUMN fecha_vencimiento")
+        conn.execute("UPDATE config SET value='9' WHERE key='db_version'")
+        conn.commit()
+        conn.close()
+
+        model = InventarioModel(self.db_name)
+        model.add_product("Leche", 1000, 10, 2, fecha_vencimiento="2000-01-01")
+        self.assertEqual(model.get_expiring_products()[0][1], "Leche")
+        self.assertEqual(model.get_config("db_version"), str(SCHEMA_VERSION))
+        model.close()
+
+    def test_up_to_date_startup_runs_no_ddl(self):
+        """Con la base al día, abrir el modelo y usar productos no ejecuta CREATE/ALTER."""
+        InventarioModel(self.db_name).close()
+        statements = []
+        original_connect = sqlite3.connect
+
+        def connect(*args, **kwargs):
+            conn = original_connect(*args, **kwargs)
+            conn.set_trace_callback(statements.append)
+            return conn
+
+        sqlite3.connect = connect
+        try:
+            model = InventarioModel(self.db_name)
+            model.add_product("Pan", 100, 50, 5)
+            model.get_all_products()
+        finally:
+            sqlite3.connect = original_connect
+        model.close()
+
+        ddl = [s for s in statements if s.lstrip().upper().startswith(("CREATE", "ALTER"))]
+        self.assertEqual(ddl, [])
+        self.assertTrue(any("INSERT INTO productos" in s for s in statements))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import time
+import unittest
+from app.data.search_index import SearchIndex
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex()
+        self.index.add(1, "Café Americano", "7801")
+        self.index.add(2, "Cafetera Italiana", "7802")
+        self.index.add(3, "Leche con Café", "7803")
+        self.index.add(4, "Azúcar", "CAFE")
+
+    def test_accent_insensitive_and_ranked(self):
+        # Código exacto primero, luego "empieza con", luego "contiene"
+        self.assertEqual(self.index.search("cafe"), [4, 1, 2, 3])
+        self.assertEqual(self.index.search("AZUCAR"), [4])
+
+    def test_short_queries_rank_prefixes_then_substrings(self):
+        # Como la búsqueda `in` original: "ch" encuentra "Leche"; primero los prefijos de palabra
+        self.assertEqual(self.index.search("l"), [3, 2])
+        self.assertEqual(self.index.search("ch"), [3])
+        self.assertEqual(self.index.search("ch", allowed={3}), [3])
+        self.assertEqual(set(self.index.search("ca")), {1, 2, 3, 4})
+
+    def test_large_filter_with_limit_returns_full_page(self):
+        index = SearchIndex()
+        for i in range(2000):
+            index.add(i, f"Producto {i:04d} surtido", None)
+        impares = {i for i in range(2000) if i % 2}
+        self.assertGreater(len(impares), index.SMALL_FILTER)
+        pagina = index.search("urti", limit=50, allowed=impares)
+        self.assertEqual(pagina, sorted(impares)[:50])
+
+    def test_multiword_limit_and_filter(self):
+        self.assertEqual(self.index.search("leche cafe"), [3])
+        self.assertEqual(len(self.index.search("cafe", limit=2)), 2)
+        self.assertEqual(self.index.search("cafe", allowed={2, 3}), [2, 3])
+
+    def test_remove_and_update(self):
+        self.index.remove(1)
+        self.index.add(2, "Tetera", None)
+        self.assertEqual(self.index.search("cafe"), [4, 3])
+        self.assertEqual(self.index.search("7802"), [])
+
+    def test_large_catalog_keystroke(self):
+        index = SearchIndex()
+        palabras = ["tornillo", "tuerca", "clavo", "martillo", "pintura", "brocha", "lija", "cable"]
+        for i in range(10000):
+            index.add(i, f"{palabras[i % 8]} {palabras[(i // 8) % 8]} {i}", f"78{i:08d}")
+        inicio = time.perf_counter()
+        for q in ("t", "to", "tor", "torn", "tornillo mar"):
+            index.search(q, limit=50)
+        promedio = (time.perf_counter() - inicio) / 5
+        # Margen amplio para máquinas lentas de CI
+        self.assertLess(promedio, 0.05)
+
+if __name__ == '__main__':
+    unittest.main()
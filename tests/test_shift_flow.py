@@ -13,8 +13,11 @@ class TestShiftControl(unittest.TestCase):
         self.model = InventarioModel(self.db_name)
 
     def tearDown(self):
-        if os.path.exists(self.db_name):
-            os.remove(self.db_name)
+        # Cerrar conexiones persistentes antes de borrar (WAL deja -wal/-shm)
+        self.model.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_name + suffix):
+                os.remove(self.db_name + suffix)
 
     def test_database_creation(self):
         """Verifica que la DB y las tablas se creen correctamente."""
@@ -51,5 +54,69 @@ class TestShiftControl(unittest.TestCase):
         # 5. Verificar que ya no hay turno activo
         self.assertIsNone(self.model.get_active_turno(), "El turno debería estar cerrado")
 
+    def test_shift_activity(self):
+        """Verifica el feed de actividad del turno: mezcla, orden, límite y totales."""
+        self.assertIsNone(self.model.get_shift_activity(), "Sin turno no hay actividad")
+
+        # Movimientos anteriores al turno no deben aparecer
+        self.model.add_expense("Gasto de ayer", 999)
+        with self.model.db.transaction() as cursor:
+            cursor.execute("UPDATE gastos SET fecha = '2000-01-01T00:00:00'")
+
+        self.model.iniciar_turno(1000)
+        self.model.add_product("Pan", 100, 50, 5)
+        pan = self.model.search_products("Pan")[0]
+        cliente_id = self.model.add_client("Ana")
+        for _ in range(3):
+            self.model.register_sale({pan[0]: {'info': pan, 'qty': 1}})
+        self.model.add_movement(cliente_id, 'PAGO', 300, "Abono parcial", medio_pago='EFECTIVO')
+        self.model.add_expense("Hielo", 150)
+
+        shift = self.model.get_shift_activity(limit=4)
+        self.assertEqual(shift["n_ventas"], 3)
+        self.assertEqual(shift["n_abonos"], 1)
+        self.assertEqual(shift["total_ventas"], 300)
+        self.assertEqual(shift["total_abonos"], 300)
+        self.assertEqual(shift["total_gastos"], 150)
+
+        actividad = shift["actividad"]
+        self.assertEqual(len(actividad), 4)
+        self.assertEqual([a["type"] for a in actividad[:2]], ["GASTO", "ABONO"])
+        self.assertEqual(actividad[0]["description"], "Hielo")
+        fechas = [a["date"] for a in actividad]
+        self.assertEqual(fechas, sorted(fechas, reverse=True))
+
+    def test_shift_close_summary(self):
+        """Cierre de caja: teórico en efectivo y desglose salen de una sola consulta de métricas."""
+        self.assertIsNone(self.model.get_shift_close_summary())
+        self.model.iniciar_turno(1000)
+        self.model.add_product("Pan", 100, 50, 5)
+        pan = self.model.search_products("Pan")[0]
+        cliente_id = self.model.add_client("Ana")
+        self.model.register_sale({pan[0]: {'info': pan, 'qty': 2}})
+        self.model.register_sale({pan[0]: {'info': pan, 'qty': 1}}, medio_pago='DEBITO')
+        self.model.register_sale({pan[0]: {'info': pan, 'qty': 4}}, medio_pago='DEUDA', cliente_id=cliente_id)
+        self.model.add_movement(cliente_id, 'PAGO', 250, "Abono", medio_pago='EFECTIVO')
+        self.model.add_movement(cliente_id, 'PAGO', 50, "Abono", medio_pago='TRANSFERENCIA')
+        self.model.add_expense("Hielo", 30)
+
+        conn = self.model.db.connection()
+        statements = []
+        conn.set_trace_callback(statements.append)
+        try:
+            summary = self.model.get_shift_close_summary()
+        finally:
+            conn.set_trace_callback(None)
+        self.assertEqual(len(statements), 2, "Turno activo + una consulta de métricas")
+
+        self.assertEqual(summary["teorico_en_caja"], 1000 + 200 + 250 - 30)
+        self.assertEqual(summary["desglose"]["ventas"]["DEUDA"], {'cantidad': 1, 'total': 400})
+        self.assertEqual(summary["desglose"]["pagos_deuda"]["TRANSFERENCIA"], {'cantidad': 1, 'total': 50})
+        # Las vistas públicas son la misma información
+        self.assertEqual(self.model.obtener_desglose_ventas_turno(), summary["desglose"])
+        stats = self.model.get_current_shift_stats()
+        self.assertEqual(stats["teorico_en_caja"], summary["teorico_en_caja"])
+        self.assertNotIn("desglose", stats)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,62 @@
+import datetime
+import unittest
+from app.utils import printer_helper
+from app.utils.printer_helper import (
+    TicketTemplate, generar_ticket_texto, get_ticket_template, invalidate_ticket_template, ticket_a_texto,
+)
+from tests.helpers import TempDBTestCase
+
+class TestTicketTemplate(TempDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = self.open_model()
+        invalidate_ticket_template()
+
+    def tearDown(self):
+        invalidate_ticket_template()
+
+    def test_template_cached_until_invalidated(self):
+        self.model.set_config("business_name", "Almacén Rosa")
+        self.model.set_config("tipo_impresora", "80mm")
+        plantilla = get_ticket_template(self.model.get_config)
+        self.assertIs(get_ticket_template(self.model.get_config), plantilla)
+        self.assertEqual(plantilla.ancho, 48)
+
+        self.model.set_config("business_name", "Almacén Lila")
+        self.assertEqual(self.model.get_config("business_name"), "Almacén Lila")
+        self.assertIs(get_ticket_template(self.model.get_config), plantilla)
+        invalidate_ticket_template()
+        self.assertIn("ALMACÉN LILA", ticket_a_texto(get_ticket_template(self.model.get_config).cabecera))
+
+    def test_render_matches_plain_generator(self):
+        pan = (1, "Pan amasado", 1500, 10, 2)
+        carrito = {1: {'info': pan, 'qty': 2}}
+        plantilla = TicketTemplate("Almacén", rut_local="76.123.456-7", tipo_impresora="58mm")
+        texto = generar_ticket_texto(7, carrito, 2700, "DEBITO", 10, nombre_local="Almacén",
+                                     rut_local="76.123.456-7")
+        self.assertEqual(ticket_a_texto(plantilla.render(7, carrito, 2700, "DEBITO", 10)), texto)
+
+    def test_batch_reprint_from_history(self):
+        self.model.add_product("Pan", 100, 50, 5)
+        self.model.add_product("Leche", 900, 20, 2)
+        pan, leche = self.model.search_products("Pan")[0], self.model.search_products("Leche")[0]
+        v1 = self.model.register_sale({pan[0]: {'info': pan, 'qty': 3}})
+        v2 = self.model.register_sale({pan[0]: {'info': pan, 'qty': 1}, leche[0]: {'info': leche, 'qty': 2}},
+                                      medio_pago='DEBITO', discount_percent=50)
+
+        ventas = self.model.get_sales_for_tickets([v2, v1, 999])
+        self.assertEqual([v['id'] for v in ventas], [v2, v1])
+        self.assertEqual(sorted(ventas[0]['items']), [("Leche", 2, 900), ("Pan", 1, 100)])
+
+        tickets = get_ticket_template(self.model.get_config).render_many(ventas)
+        self.assertEqual(len(tickets), 2)
+        texto = ticket_a_texto(tickets[0])
+        self.assertIn(f"Ticket Nro: {v2}", texto)
+        self.assertIn("50%", texto)
+        fecha = datetime.datetime.fromisoformat(ventas[0]['fecha']).strftime('%d/%m/%Y %H:%M')
+        self.assertIn(fecha, texto)
+        # Reimpresión: no vuelve a abrir el cajón
+        self.assertNotIn(printer_helper.ESTILO_CAJON, [estilo for _, estilo in tickets[1]])
+
+if __name__ == '__main__':
+    unittest.main()